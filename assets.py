@@ -0,0 +1,180 @@
+"""Static asset pipeline: content-hashed URLs, far-future caching and compression.
+
+``init_assets(app)`` changes how ``app``'s static files are addressed and served:
+
+- ``url_for("static", filename="css/dashboard.css")`` yields
+  ``/static/css/dashboard.<hash>.css``, where the hash is taken from the file's
+  content. An edited file gets a new URL, so hashed URLs are served with
+  ``Cache-Control: public, max-age=31536000, immutable`` and browsers never
+  revalidate them. Plain names still resolve, with the normal short caching.
+- If ``build_assets`` wrote ``name.br`` / ``name.gz`` next to a file, that variant is
+  sent to clients whose Accept-Encoding allows it.
+- Dynamic text responses (HTML, JSON, ...) of at least ``min_size`` bytes are gzipped on
+  the fly. Streamed responses (the exports) are left alone; compressing them would
+  mean buffering them. A strong ETag becomes weak, because the bytes on the wire
+  are no longer the ones it was computed for.
+
+Pages load only files from static/, never from a CDN or font service, so they
+work without outside network. Brotli variants need the optional ``brotli`` package; without it only gzip ones
+are built.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+
+from flask import abort, request, send_file
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # optional: gzip variants are built either way
+    brotli = None
+
+HASH_LENGTH = 12
+HASHED_NAME = re.compile(r"^(.+)\.([0-9a-f]{%d})(\.[^./]+)$" % HASH_LENGTH)
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# Client preference is ignored beyond this order: brotli is smaller when both are accepted.
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+COMPRESSIBLE_SUFFIXES = (".css", ".js", ".svg", ".json", ".map", ".txt", ".html")
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+
+
+class AssetManifest:
+    """Content hashes of the files under ``folder``, recomputed when a file's mtime changes."""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._hashes = {}  # filename -> (mtime_ns, size, digest)
+        self._lock = threading.Lock()
+
+    def digest(self, filename):
+        path = safe_join(self.folder, filename)
+        try:
+            st = os.stat(path) if path else None
+        except OSError:
+            st = None
+        if st is None:
+            return None
+        cached = self._hashes.get(filename)
+        if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+            return cached[2]
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:HASH_LENGTH]
+        with self._lock:
+            self._hashes[filename] = (st.st_mtime_ns, st.st_size, digest)
+        return digest
+
+    def url_name(self, filename):
+        digest = self.digest(filename)
+        if digest is None:
+            return filename
+        root, ext = os.path.splitext(filename)
+        return f"{root}.{digest}{ext}"
+
+
+def accepts(encoding):
+    return request.accept_encodings[encoding] > 0
+
+
+def compressible(mimetype):
+    return bool(mimetype) and mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+def init_assets(app, compress_level=6, min_size=500):
+    manifest = AssetManifest(app.static_folder)
+
+    @app.url_defaults
+    def hashed_static_url(endpoint, values):
+        if endpoint == "static" and "filename" in values:
+            values["filename"] = manifest.url_name(values["filename"])
+
+    def static(filename):
+        match = HASHED_NAME.match(filename)
+        name = match.group(1) + match.group(3) if match else filename
+        path = safe_join(app.static_folder, name)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        served, encoding = path, None
+        for candidate, suffix in PRECOMPRESSED:
+            variant = path + suffix
+            if accepts(candidate) and os.path.isfile(variant) and os.path.getmtime(variant) >= os.path.getmtime(path):
+                served, encoding = variant, candidate
+                break
+        resp = send_file(served, mimetype=mimetypes.guess_type(name)[0] or "application/octet-stream",
+                         conditional=True, max_age=app.get_send_file_max_age(name))
+        if encoding:
+            resp.headers["Content-Encoding"] = encoding
+        if os.path.isfile(path + ".gz") or os.path.isfile(path + ".br"):
+            resp.vary.add("Accept-Encoding")
+        # Only the current content is cacheable forever under its hash. A stale hash (a page
+        # rendered before a deploy) still gets the file, but with the normal short caching.
+        if match and match.group(2) == manifest.digest(name):
+            resp.cache_control.no_cache = None
+            resp.cache_control.public = True
+            resp.cache_control.max_age = IMMUTABLE_MAX_AGE
+            resp.cache_control.immutable = True
+        return resp
+
+    app.view_functions["static"] = static
+
+    @app.after_request
+    def compress_response(resp):
+        if (resp.status_code != 200 or resp.direct_passthrough or resp.is_streamed
+                or "Content-Encoding" in resp.headers or not compressible(resp.mimetype)):
+            return resp
+        resp.vary.add("Accept-Encoding")
+        if not accepts("gzip"):
+            return resp
+        data = resp.get_data()
+        if len(data) < min_size:
+            return resp
+        resp.set_data(gzip.compress(data, compresslevel=compress_level, mtime=0))
+        resp.headers["Content-Encoding"] = "gzip"
+        tag, weak = resp.get_etag()
+        if tag and not weak:
+            resp.set_etag(tag, weak=True)
+        return resp
+
+    return manifest
+
+
+def write_file(path, data):
+    # Via a rename, so a server never sends a half-written file.
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def build_assets(folder):
+    """Write .gz/.br variants of the text assets under ``folder``.
+
+    Variants are rewritten only when missing or older than their file, and skipped when
+    compression doesn't make the file smaller. Returns the paths written.
+    """
+    written = []
+    encoders = [(".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        encoders.append((".br", lambda data: brotli.compress(data, quality=11)))
+    for root, _, files in os.walk(folder):
+        for filename in sorted(files):
+            if not filename.endswith(COMPRESSIBLE_SUFFIXES):
+                continue
+            path = os.path.join(root, filename)
+            data = None
+            for suffix, encode in encoders:
+                variant = path + suffix
+                if os.path.exists(variant) and os.path.getmtime(variant) >= os.path.getmtime(path):
+                    continue
+                if data is None:
+                    with open(path, "rb") as f:
+                        data = f.read()
+                packed = encode(data)
+                if len(packed) >= len(data):
+                    continue
+                write_file(variant, packed)
+                written.append(variant)
+    return written
@@ -0,0 +1,115 @@
+"""Helpers shared by the benchmark scripts.
+
+The apps read DATABASE_URL at import time, so ``load_variant`` points it at a
+scratch SQLite file before importing either ``budget_web`` or
+``budget_tracker.app``. The dashboard page cache is off unless
+DASHBOARD_CACHE is set, so ``GET /`` times a render rather than a cache hit;
+``page_cache`` switches it on for the passes that time cached pages.
+"""
+import importlib
+import os
+import random
+import sys
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VARIANTS = {"web": "budget_web", "tracker": "budget_tracker.app"}
+
+
+def load_variant(name, db_path):
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.abspath(db_path)
+    # The benchmarks log in from one address far more often than any person would.
+    os.environ.setdefault("LOGIN_ATTEMPTS_PER_MINUTE_IP", "0")
+    os.environ.setdefault("LOGIN_ATTEMPTS_PER_MINUTE_USER", "0")
+    os.environ.setdefault("DASHBOARD_CACHE", "off")
+    sys.path.insert(0, ROOT)
+    return importlib.import_module(VARIANTS[name])
+
+
+@contextmanager
+def page_cache(mod):
+    """Serve dashboards from a fresh in-memory page cache while the block runs."""
+    from cache import MemoryPageCache
+
+    previous = mod.dashboard_cache
+    mod.dashboard_cache = MemoryPageCache()
+    try:
+        yield
+    finally:
+        mod.dashboard_cache = previous
+
+
+def seed_user(mod, username, n_expenses, n_incomes, password="bench", chunk=50_000):
+    from sqlalchemy import insert
+    from werkzeug.security import generate_password_hash
+
+    rng = random.Random(username)
+    start = date.today() - timedelta(days=730)
+    with mod.app.app_context():
+        user = mod.User(username=username, password=generate_password_hash(password))
+        mod.db.session.add(user)
+        mod.db.session.flush()
+        uid = user.id
+        if hasattr(mod, "Category"):
+            # budget_web keeps per-user categories in their own table.
+            mod.add_default_categories(uid)
+            ids = dict(mod.db.session.execute(mod.db.select(mod.Category.name, mod.Category.id)
+                                              .filter_by(user_id=uid)).all())
+
+            def category():
+                return {"category_id": ids[rng.choice(mod.CATEGORIES)]}
+        else:
+            def category():
+                return {"category": rng.choice(mod.CATEGORIES)}
+        mod.db.session.commit()
+
+        def day():
+            return start + timedelta(days=rng.randrange(730))
+
+        def amount(low, high):
+            # budget_web stores integer cents, budget_tracker still stores float dollars.
+            value = round(rng.uniform(low, high), 2)
+            return {"amount_cents": round(value * 100)} if hasattr(mod.Expense, "amount_cents") else {"amount": value}
+
+        for model, n, make in (
+            (mod.Expense, n_expenses, lambda: {
+                **category(),
+                **amount(1, 500),
+                "description": "bench",
+                "date": day(),
+                "user_id": uid,
+            }),
+            (mod.Income, n_incomes, lambda: {
+                **amount(500, 5000),
+                "date": day(),
+                "user_id": uid,
+            }),
+        ):
+            for offset in range(0, n, chunk):
+                rows = [make() for _ in range(min(chunk, n - offset))]
+                mod.db.session.execute(insert(model), rows)
+                mod.db.session.commit()
+    return uid
+
+
+def login(mod, username, password="bench"):
+    client = mod.app.test_client()
+    client.post("/login", data={"username": username, "password": password})
+    return client
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    k = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[k]
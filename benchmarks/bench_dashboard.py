@@ -0,0 +1,48 @@
+"""Dashboard latency at increasing history sizes.
+
+    python benchmarks/bench_dashboard.py --variant web --rows 1000 100000 1000000
+
+For each size a fresh user is seeded with that many expenses (and a tenth as
+many incomes) and p50/p99 are reported for the SQL aggregation on its own, for a full ``GET /`` rendered every
+time, and (budget_web only) for ``GET /`` answered from the page cache.
+"""
+import argparse
+import os
+import tempfile
+
+from _common import load_variant, login, page_cache, percentile, seed_user, timed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--variant", choices=["web", "tracker"], default="web")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--no-page", action="store_true", help="only time the aggregation query")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    mod = load_variant(args.variant, db_path)
+
+    print(f"{'rows':>10} {'what':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for rows in args.rows:
+        username = f"bench_{rows}"
+        uid = seed_user(mod, username, rows, max(1, rows // 10))
+
+        with mod.app.app_context():
+            samples = timed(lambda: mod.dashboard_totals(uid), args.repeat)
+        print(f"{rows:>10} {'totals':>10} {percentile(samples, 50) * 1e3:>10.2f} {percentile(samples, 99) * 1e3:>10.2f}")
+
+        if not args.no_page:
+            client = login(mod, username)
+            samples = timed(lambda: client.get("/"), args.repeat)
+            print(f"{rows:>10} {'GET /':>10} {percentile(samples, 50) * 1e3:>10.2f} {percentile(samples, 99) * 1e3:>10.2f}")
+            if hasattr(mod, "dashboard_cache"):
+                with page_cache(mod):
+                    client.get("/")
+                    samples = timed(lambda: client.get("/"), args.repeat)
+                print(f"{rows:>10} {'cached':>10} {percentile(samples, 50) * 1e3:>10.2f} {percentile(samples, 99) * 1e3:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
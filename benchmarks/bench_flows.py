@@ -0,0 +1,178 @@
+"""End-to-end route benchmark of both app variants, with JSON output.
+
+    python benchmarks/bench_flows.py --users 5 --expenses 5000 --incomes 500 \\
+        --iterations 200 --output bench-flows.json
+
+Each variant runs in its own subprocess against a freshly seeded SQLite file.
+The Flask test client then cycles the seeded users through login, dashboard,
+add, edit, delete, add income and reset income. The dashboard is rendered
+every time; for budget_web, dashboard_cached times it again from a warm page
+cache. Throughput and latency
+percentiles come from a plain timing pass. Peak memory per request comes
+from a separate, shorter pass under tracemalloc, because tracing distorts
+timings. The JSON records the variant, data sizes and git revision so runs can
+be compared over time.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from _common import ROOT, load_variant, login, page_cache, percentile, seed_user
+
+ROUTES = ["login", "dashboard", "dashboard_cached", "add", "edit", "delete", "add_income", "reset_income"]
+
+
+def flow(mod, client, username, rng):
+    """Yield (route, request thunk) for one pass through the app."""
+    category = rng.choice(mod.CATEGORIES)
+    amount = f"{rng.uniform(1, 200):.2f}"
+    yield "login", lambda: client.post("/login", data={"username": username, "password": "bench"})
+    yield "dashboard", lambda: client.get("/")
+    if hasattr(mod, "dashboard_cache"):
+        with page_cache(mod):
+            client.get("/")
+            yield "dashboard_cached", lambda: client.get("/")
+    yield "add", lambda: client.post("/add", data={"category": category, "amount": amount, "description": "bench"})
+    with mod.app.app_context():
+        user_id = mod.User.query.filter_by(username=username).one().id
+        expense_id = mod.db.session.query(mod.db.func.max(mod.Expense.id)).filter_by(user_id=user_id).scalar()
+    yield "edit", lambda: client.post(f"/edit/{expense_id}", data={"category": category, "amount": "1.00"})
+    yield "delete", lambda: client.get(f"/delete/{expense_id}")
+    yield "add_income", lambda: client.post("/add_income", data={"amount": amount})
+    yield "reset_income", lambda: client.get("/reset_income")
+
+
+def run_variant(args):
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    mod = load_variant(args.variant, db_path)
+    usernames = [f"bench_{i}" for i in range(args.users)]
+    started = time.perf_counter()
+    for username in usernames:
+        seed_user(mod, username, args.expenses, args.incomes)
+    seed_seconds = time.perf_counter() - started
+    clients = {username: login(mod, username) for username in usernames}
+    rng = random.Random(0)
+
+    def run(iterations, measure):
+        samples = {route: [] for route in ROUTES}
+        for i in range(iterations):
+            username = usernames[i % len(usernames)]
+            for route, request in flow(mod, clients[username], username, rng):
+                samples[route].append(measure(request))
+        return samples
+
+    def wall_time(request):
+        t0 = time.perf_counter()
+        response = request()
+        elapsed = time.perf_counter() - t0
+        if response.status_code >= 400:
+            raise SystemExit(f"{response.request.path} returned {response.status_code}")
+        return elapsed
+
+    def peak_memory(request):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        request()
+        return tracemalloc.get_traced_memory()[1] - before
+
+    for _ in range(args.warmup):
+        run(1, lambda request: request())
+    timings = run(args.iterations, wall_time)
+    tracemalloc.start()
+    memory = run(args.memory_iterations, peak_memory)
+    tracemalloc.stop()
+
+    routes = {}
+    for route in ROUTES:
+        samples = timings[route]
+        if not samples:
+            continue
+        total = sum(samples)
+        routes[route] = {
+            "requests": len(samples),
+            "throughput_rps": round(len(samples) / total, 1) if total else None,
+            "mean_ms": round(total / len(samples) * 1000, 3),
+            "p50_ms": round(percentile(samples, 50) * 1000, 3),
+            "p90_ms": round(percentile(samples, 90) * 1000, 3),
+            "p99_ms": round(percentile(samples, 99) * 1000, 3),
+            "max_ms": round(max(samples) * 1000, 3),
+            "peak_memory_kib": round(max(memory[route]) / 1024, 1),
+        }
+    all_samples = [s for route in ROUTES for s in timings[route]]
+    return {
+        "variant": args.variant,
+        "seed_seconds": round(seed_seconds, 2),
+        "throughput_rps": round(len(all_samples) / sum(all_samples), 1),
+        "routes": routes,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--variant", choices=["web", "tracker"], action="append",
+                        help="repeatable; defaults to both")
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--expenses", type=int, default=2_000, help="per user")
+    parser.add_argument("--incomes", type=int, default=200, help="per user")
+    parser.add_argument("--iterations", type=int, default=100, help="timed passes through the flow")
+    parser.add_argument("--memory-iterations", type=int, default=5, help="passes under tracemalloc")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        args.variant = args.variant[0]
+        json.dump(run_variant(args), sys.stdout)
+        return
+
+    results = []
+    for variant in args.variant or ["web", "tracker"]:
+        # One process per variant: both apps are module-level singletons bound to DATABASE_URL.
+        command = [sys.executable, os.path.abspath(__file__), "--child", "--variant", variant]
+        for option in ("users", "expenses", "incomes", "iterations", "memory_iterations", "warmup"):
+            command += [f"--{option.replace('_', '-')}", str(getattr(args, option))]
+        print(f"running {variant}...", file=sys.stderr)
+        child = subprocess.run(command, capture_output=True, text=True, cwd=os.path.dirname(__file__))
+        if child.returncode:
+            sys.stderr.write(child.stderr)
+            raise SystemExit(f"{variant} benchmark failed")
+        results.append(json.loads(child.stdout))
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "users": args.users,
+        "expenses_per_user": args.expenses,
+        "incomes_per_user": args.incomes,
+        "iterations": args.iterations,
+        "variants": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Write throughput and tail latency with and without group commit.
+
+    python benchmarks/bench_group_commit.py --threads 32 --duration 20
+
+Starts gunicorn twice on a fresh SQLite file, once with GROUP_COMMIT unset
+and once with it on, and drives each with the load_test.py workers. Each
+run reports:
+- successful /add requests per second
+- SQLite commits per second
+- latency percentiles
+- errors such as "database is locked" 500s
+Commits come from the server's /metrics write-queue gauges with the mode on.
+With it off, each successful add is its own commit. The gauges are per
+process, so the default is one worker with --server-threads threads.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from _common import ROOT, percentile
+from load_test import register, worker
+
+
+def start_server(port, db_path, group_commit, args):
+    env = dict(os.environ, PORT=str(port), DATABASE_URL="sqlite:///" + db_path, METRICS_ENABLED="1",
+               WEB_CONCURRENCY=str(args.workers), GUNICORN_THREADS=str(args.server_threads),
+               GROUP_COMMIT="1" if group_commit else "", GROUP_COMMIT_MAX_BATCH=str(args.max_batch),
+               GROUP_COMMIT_MAX_WAIT_MS=str(args.max_wait_ms),
+               # Every client registers from 127.0.0.1 at once.
+               LOGIN_ATTEMPTS_PER_MINUTE_IP="0")
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--access-logfile", os.devnull,
+                               # No worker recycling mid-run: it would reset the /metrics counters.
+                               "--max-requests", "0", "wsgi:app"], cwd=ROOT, env=env, stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/login").read()
+            return server
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.1)
+    server.kill()
+    raise SystemExit("server did not start")
+
+
+def committed_batches(base):
+    text = urllib.request.urlopen(base + "/metrics").read().decode()
+    match = re.search(r"^budget_write_queue_batches (\d+)", text, re.M)
+    return int(match.group(1)) if match else None
+
+
+def run(group_commit, port, args):
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    server = start_server(port, db_path, group_commit, args)
+    base = f"http://127.0.0.1:{port}"
+    try:
+        results = {"add": [], "read": [], "errors": {"add": 0, "read": 0}}
+        lock = threading.Lock()
+        openers = [register(base) for _ in range(args.threads)]
+        deadline = time.monotonic() + args.duration
+        threads = [threading.Thread(target=worker, args=(opener, base, deadline, args.write_ratio, results, lock))
+                   for opener in openers]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        batches = committed_batches(base) if group_commit else None
+    finally:
+        server.terminate()
+        server.wait()
+    adds = results["add"]
+    commits = batches if group_commit else len(adds)
+    return {
+        "mode": "group commit" if group_commit else "direct",
+        "adds_per_sec": len(adds) / args.duration,
+        "commits_per_sec": commits / args.duration if commits is not None else None,
+        "p50_ms": percentile(adds, 50) * 1e3 if adds else None,
+        "p99_ms": percentile(adds, 99) * 1e3 if adds else None,
+        "p999_ms": percentile(adds, 99.9) * 1e3 if adds else None,
+        "max_ms": max(adds) * 1e3 if adds else None,
+        "errors": results["errors"]["add"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=32, help="client threads")
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--write-ratio", type=float, default=0.9)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--server-threads", type=int, default=16)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=2)
+    parser.add_argument("--port", type=int, default=10080)
+    args = parser.parse_args()
+
+    def fmt(value, spec):
+        return "-" if value is None else format(value, spec)
+
+    print(f"{'mode':<13} {'adds/s':>8} {'commits/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'p99.9 ms':>9} {'max ms':>8} {'errors':>7}")
+    for group_commit in (False, True):
+        r = run(group_commit, args.port, args)
+        print(f"{r['mode']:<13} {r['adds_per_sec']:>8.1f} {fmt(r['commits_per_sec'], '>10.1f')} "
+              f"{fmt(r['p50_ms'], '>8.1f')} {fmt(r['p99_ms'], '>8.1f')} {fmt(r['p999_ms'], '>9.1f')} "
+              f"{fmt(r['max_ms'], '>8.1f')} {r['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Bulk CSV import throughput and memory.
+
+    python benchmarks/bench_import.py --rows 1000000
+
+Writes a synthetic statement CSV, imports it through ``import_expenses`` and
+reports rows/sec and the process's peak RSS, which should stay flat as
+--rows grows.
+"""
+import argparse
+import csv
+import os
+import random
+import resource
+import tempfile
+from datetime import date, timedelta
+
+from _common import load_variant, seed_user
+
+
+def write_csv(path, rows, categories):
+    rng = random.Random(rows)
+    start = date.today() - timedelta(days=730)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["date", "category", "amount", "description"])
+        for _ in range(rows):
+            writer.writerow([
+                (start + timedelta(days=rng.randrange(730))).isoformat(),
+                rng.choice(categories),
+                f"{rng.uniform(1, 500):.2f}",
+                "imported",
+            ])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    mod = load_variant("web", os.path.join(tmp, "bench.db"))
+    uid = seed_user(mod, "bench", 0, 0)
+    csv_path = os.path.join(tmp, "statement.csv")
+    write_csv(csv_path, args.rows, mod.CATEGORIES)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    with mod.app.app_context(), open(csv_path, newline="") as stream:
+        kwargs = {"batch_size": args.batch_size} if args.batch_size else {}
+        report = mod.import_expenses(uid, mod.statement_rows(stream, "csv"), **kwargs)
+
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"rows:        {report['inserted']} ({report['error_count']} errors)")
+    print(f"seconds:     {report['seconds']}")
+    print(f"rows/sec:    {report['rows_per_sec']}")
+    print(f"peak RSS:    {rss_after / 1024:.1f} MiB (+{(rss_after - rss_before) / 1024:.1f} MiB during import)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Dashboard latency while a flood of logins hits the same server.
+
+    python benchmarks/bench_login_flood.py --flood 32 --readers 4 --duration 15
+
+Starts gunicorn once per mode on a fresh SQLite file. In each mode, --readers
+logged-in clients load the dashboard in a loop, while --flood clients POST
+correct logins as fast as they are answered. The modes:
+- idle: no flood, for reference
+- inline: PASSWORD_HASH_WORKERS=0, the KDF runs in the request threads
+- pool: the KDF runs in the hashing process pool
+- pool + throttle: the pool plus the per-address/username login limits
+Only the last mode has the limits on. The flood comes from one address, so
+there most of it is answered 429 without hashing. Each mode reports
+dashboard throughput and latency, and logins per second by status.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter
+
+from _common import ROOT, percentile
+from load_test import client
+
+MODES = [
+    ("idle", {"PASSWORD_HASH_WORKERS": "1"}, False),
+    ("inline", {"PASSWORD_HASH_WORKERS": "0"}, True),
+    ("pool", {"PASSWORD_HASH_WORKERS": "1"}, True),
+    ("pool + throttle", {"PASSWORD_HASH_WORKERS": "1", "LOGIN_ATTEMPTS_PER_MINUTE_IP": "30"}, True),
+]
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    # A successful login answers 302 to the dashboard; the flood shouldn't load it too.
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def start_server(port, db_path, extra_env, args):
+    env = dict(os.environ, PORT=str(port), DATABASE_URL="sqlite:///" + db_path, WEB_CONCURRENCY="1",
+               GUNICORN_THREADS=str(args.server_threads), DASHBOARD_CACHE="off",
+               LOGIN_ATTEMPTS_PER_MINUTE_IP="0", LOGIN_ATTEMPTS_PER_MINUTE_USER="0")
+    env.update(extra_env)
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--access-logfile", os.devnull,
+                               "--max-requests", "0", "wsgi:app"], cwd=ROOT, env=env, stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/login").read()
+            return server
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.1)
+    server.kill()
+    raise SystemExit("server did not start")
+
+
+def signed_in(base, username, password, new=False):
+    opener = client()
+    form = urllib.parse.urlencode({"username": username, "password": password}).encode()
+    opener.open(base + ("/register" if new else "/login"), form).read()
+    return opener
+
+
+def reader(opener, base, deadline, samples, errors):
+    while time.monotonic() < deadline:
+        t0 = time.perf_counter()
+        try:
+            opener.open(base + "/").read()
+            samples.append(time.perf_counter() - t0)
+        except (urllib.error.URLError, ConnectionError):
+            errors.append(1)
+
+
+def flooder(base, form, deadline, statuses):
+    opener = urllib.request.build_opener(NoRedirect)
+    while time.monotonic() < deadline:
+        try:
+            opener.open(base + "/login", form).read()
+            statuses["200"] += 1
+        except urllib.error.HTTPError as exc:
+            statuses[str(exc.code)] += 1
+        except (urllib.error.URLError, ConnectionError):
+            statuses["error"] += 1
+
+
+def run(mode, extra_env, flood, port, args):
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    server = start_server(port, db_path, extra_env, args)
+    base = f"http://127.0.0.1:{port}"
+    try:
+        readers = [signed_in(base, f"reader{i}", "bench", new=True) for i in range(args.readers)]
+        signed_in(base, "flood", "bench", new=True)
+        form = urllib.parse.urlencode({"username": "flood", "password": "bench"}).encode()
+        samples, errors, statuses = [], [], Counter()
+        deadline = time.monotonic() + args.duration
+        threads = [threading.Thread(target=reader, args=(opener, base, deadline, samples, errors)) for opener in readers]
+        if flood:
+            threads += [threading.Thread(target=flooder, args=(base, form, deadline, statuses))
+                        for _ in range(args.flood)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        "mode": mode,
+        "dashboard_per_sec": len(samples) / args.duration,
+        "p50_ms": percentile(samples, 50) * 1e3 if samples else None,
+        "p99_ms": percentile(samples, 99) * 1e3 if samples else None,
+        "dashboard_errors": len(errors),
+        "logins": {key: count / args.duration for key, count in statuses.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--flood", type=int, default=32, help="login flood client threads")
+    parser.add_argument("--readers", type=int, default=4, help="dashboard client threads")
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--server-threads", type=int, default=8)
+    parser.add_argument("--port", type=int, default=10081)
+    args = parser.parse_args()
+
+    def fmt(value, spec):
+        return "-" if value is None else format(value, spec)
+
+    print(f"{'mode':<16} {'dash/s':>8} {'p50 ms':>8} {'p99 ms':>9} {'errors':>7}  logins/s by status")
+    for mode, extra_env, flood in MODES:
+        r = run(mode, extra_env, flood, args.port, args)
+        logins = ", ".join(f"{key}: {rate:.1f}" for key, rate in sorted(r["logins"].items())) or "-"
+        print(f"{r['mode']:<16} {r['dashboard_per_sec']:>8.1f} {fmt(r['p50_ms'], '>8.1f')} {fmt(r['p99_ms'], '>9.1f')} "
+              f"{r['dashboard_errors']:>7}  {logins}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Recurring-rule materialization throughput.
+
+    python benchmarks/bench_recurring.py --rules 100000 --users 1000
+
+Seeds --rules rules over --users users. Each rule is monthly, bi-weekly,
+weekly or daily, and its start date is up to --behind days in the past, so
+the first run has to catch up every missed period. The script then times
+three runs of ``materialize_recurring``:
+- the catch-up
+- an immediate rerun, which must insert nothing
+- the next day's run
+It also checks that no occurrence was inserted twice.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import func, insert, select
+
+from _common import load_variant
+
+SCHEDULES = [(1, "month"), (2, "week"), (1, "week"), (1, "day")]
+
+
+def seed(mod, n_users, n_rules, behind):
+    rng = random.Random(n_rules)
+    today = date.today()
+    with mod.app.app_context():
+        # Password hashing would dominate the setup, and the scheduler never logs anyone in.
+        mod.db.session.execute(insert(mod.User), [{"username": f"bench_{i}", "password": "-"} for i in range(n_users)])
+        user_ids = mod.db.session.scalars(select(mod.User.id)).all()
+        for uid in user_ids:
+            mod.add_default_categories(uid)
+        categories = {}
+        for uid, cid in mod.db.session.execute(select(mod.Category.user_id, mod.Category.id)):
+            categories.setdefault(uid, []).append(cid)
+        rules = []
+        for i in range(n_rules):
+            uid = user_ids[i % n_users]
+            every, unit = rng.choice(SCHEDULES)
+            start = today - timedelta(days=rng.randrange(behind + 1))
+            income = rng.random() < 0.2
+            rules.append({
+                "user_id": uid,
+                "kind": "income" if income else "expense",
+                "category_id": None if income else rng.choice(categories[uid]),
+                "amount_cents": rng.randrange(100, 500_000),
+                "description": "bench",
+                "every": every,
+                "unit": unit,
+                "start_date": start,
+                "occurrences": 0,
+                "next_date": start,
+            })
+        mod.db.session.execute(insert(mod.RecurringRule), rules)
+        mod.db.session.commit()
+
+
+def run(mod, label, today=None):
+    with mod.app.app_context():
+        report = mod.materialize_recurring(today)
+    rows = report["expenses"] + report["incomes"]
+    seconds = report["seconds"] or 1e-9
+    print(f"{label:<12} {report['rules']:>8} rules {rows:>9} rows {report['seconds']:>8.2f}s"
+          f" {report['rules'] / seconds:>10.0f} rules/sec {rows / seconds:>10.0f} rows/sec")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rules", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--behind", type=int, default=30, help="max days since a rule's start date")
+    args = parser.parse_args()
+
+    mod = load_variant("web", os.path.join(tempfile.mkdtemp(), "bench.db"))
+    t0 = time.perf_counter()
+    seed(mod, args.users, args.rules, args.behind)
+    print(f"seeded {args.rules} rules for {args.users} users in {time.perf_counter() - t0:.1f}s")
+
+    run(mod, "catch-up")
+    run(mod, "rerun")
+    run(mod, "next day", date.today() + timedelta(days=1))
+
+    with mod.app.app_context():
+        duplicates = 0
+        for model in (mod.Expense, mod.Income):
+            duplicates += mod.db.session.scalar(
+                select(func.count()).select_from(
+                    select(model.recurring_rule_id).where(model.recurring_rule_id.is_not(None))
+                    .group_by(model.recurring_rule_id, model.date).having(func.count() > 1).subquery()))
+    print(f"duplicate occurrences: {duplicates}")
+
+
+if __name__ == "__main__":
+    main()
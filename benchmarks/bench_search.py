@@ -0,0 +1,87 @@
+"""Full-text search latency against a LIKE scan.
+
+    python benchmarks/bench_search.py --expenses 1000000 --users 1000
+
+Seeds --expenses expenses spread over --users users. Descriptions are drawn
+from a skewed merchant vocabulary, so some words are rare and others match a
+large share of rows. With --users 1 a single user owns every row.
+The search index is filled by the triggers as the rows go in. The script
+then times ``search_expenses`` (first page, ranked by bm25) for each query
+next to the ``LIKE '%word%'`` scan it replaces. Queries match descriptions
+and category names ("groceries", "bills"). Common words cost more than rare
+ones with many users, since bm25 counts each word's rows across all of them.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import insert, select
+
+from _common import load_variant, percentile, timed
+
+MERCHANTS = ["grocer", "coffee", "fuel", "pharmacy", "bakery", "cinema", "hardware", "bookshop", "florist",
+             "locksmith", "veterinary", "zoo"]
+WORDS = ["store", "market", "online", "weekly", "downtown", "card", "refund", "order", "delivery", "monthly"]
+QUERIES = ["zoo", "coffee", "groceries", "coffee downtown", "coffee bills", "online order", "nonexistent"]
+
+
+def seed(mod, n_users, n, chunk=50_000):
+    rng = random.Random(n)
+    # Zipf-like weights: the first merchants are common, the last rare.
+    weights = [1 / (i + 1) ** 1.5 for i in range(len(MERCHANTS))]
+    start = date.today() - timedelta(days=730)
+    with mod.app.app_context():
+        # Password hashing would dominate the setup, and nobody logs in.
+        mod.db.session.execute(insert(mod.User), [{"username": f"bench_{i}", "password": "-"} for i in range(n_users)])
+        user_ids = mod.db.session.scalars(select(mod.User.id)).all()
+        for uid in user_ids:
+            mod.add_default_categories(uid)
+        categories = {}
+        for uid, cid in mod.db.session.execute(select(mod.Category.user_id, mod.Category.id)):
+            categories.setdefault(uid, []).append(cid)
+        for offset in range(0, n, chunk):
+            rows = []
+            for _ in range(min(chunk, n - offset)):
+                uid = rng.choice(user_ids)
+                rows.append({
+                    "category_id": rng.choice(categories[uid]),
+                    "amount_cents": rng.randrange(100, 50_000),
+                    "description": f"{rng.choices(MERCHANTS, weights)[0]} {rng.choice(WORDS)} {rng.randrange(1000)}",
+                    "date": start + timedelta(days=rng.randrange(730)),
+                    "user_id": uid,
+                })
+            mod.db.session.execute(insert(mod.Expense), rows)
+            mod.db.session.commit()
+        mod.db.session.commit()
+        return user_ids[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--expenses", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    mod = load_variant("web", os.path.join(tempfile.mkdtemp(), "bench.db"))
+    t0 = time.perf_counter()
+    uid = seed(mod, args.users, args.expenses)
+    print(f"seeded {args.expenses} expenses for {args.users} users (with index) in {time.perf_counter() - t0:.1f}s")
+
+    print(f"{'query':<16} {'matches':>8} {'fts p50':>9} {'fts p99':>9} {'LIKE p50':>9}")
+    with mod.app.app_context():
+        for query in QUERIES:
+            matches = len(mod.search_expenses(uid, query, limit=args.expenses)[0])
+            fts = timed(lambda: mod.search_expenses(uid, query), args.repeat)
+            like = mod.Expense.query.filter(mod.Expense.user_id == uid,
+                                            mod.Expense.description.like(f"%{query.split()[0]}%")).limit(mod.PAGE_SIZE)
+            scan = timed(lambda: like.all(), max(1, args.repeat // 10))
+            print(f"{query:<16} {matches:>8} {percentile(fts, 50) * 1e3:>8.2f}ms {percentile(fts, 99) * 1e3:>8.2f}ms"
+                  f" {percentile(scan, 50) * 1e3:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Render time and response size per page.
+
+    python benchmarks/bench_templates.py --variant web --repeat 200
+
+Seeds one user with a dashboard's worth of rows, then times each GET route
+through the Flask test client. For budget_web, ``/ (cached)`` times the
+dashboard again with the page cache on.
+"""
+import argparse
+import os
+import tempfile
+
+from _common import load_variant, login, page_cache, percentile, seed_user, timed
+
+ROUTES = ["/login", "/register", "/forgot_password", "/", "/edit/1", "/reset_password"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--variant", choices=["web", "tracker"], default="web")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    mod = load_variant(args.variant, os.path.join(tempfile.mkdtemp(), "bench.db"))
+    seed_user(mod, "bench", 500, 50)
+    client = login(mod, "bench")
+
+    print(f"{'route':<18} {'p50 ms':>8} {'p99 ms':>8} {'bytes':>8}")
+    for route in ROUTES:
+        size = len(client.get(route).data)
+        samples = timed(lambda: client.get(route), args.repeat)
+        print(f"{route:<18} {percentile(samples, 50) * 1e3:>8.2f} {percentile(samples, 99) * 1e3:>8.2f} {size:>8}")
+    if hasattr(mod, "dashboard_cache"):
+        with page_cache(mod):
+            size = len(client.get("/").data)
+            samples = timed(lambda: client.get("/"), args.repeat)
+        print(f"{'/ (cached)':<18} {percentile(samples, 50) * 1e3:>8.2f} {percentile(samples, 99) * 1e3:>8.2f} {size:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Concurrent add/read load against a running server.
+
+    python budget_web.py                                  # development server
+    gunicorn -c gunicorn.conf.py wsgi:app                 # production server
+    python benchmarks/load_test.py --url http://127.0.0.1:10000 --threads 16 --duration 20
+
+Start the server with LOGIN_ATTEMPTS_PER_MINUTE_IP=0 when using more --threads than the
+per-address limit (30), since every thread registers from the same address.
+Every thread registers its own user before the clock starts, then loops: with probability
+--write-ratio it POSTs /add, otherwise it GETs /api/summary. Reports
+throughput, latency percentiles and errors (e.g. 500s from "database is
+locked") per operation.
+"""
+import argparse
+import http.cookiejar
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+
+from _common import percentile
+
+
+def client():
+    return urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+
+def register(base):
+    """A logged-in client for a new user."""
+    opener = client()
+    name = f"load-{uuid.uuid4().hex[:12]}"
+    form = urllib.parse.urlencode({"username": name, "password": "load"}).encode()
+    opener.open(base + "/register", form).read()
+    return opener
+
+
+def worker(opener, base, deadline, write_ratio, results, lock):
+    rng = random.Random()
+    local = {"add": [], "read": [], "errors": {"add": 0, "read": 0}}
+    while time.monotonic() < deadline:
+        if rng.random() < write_ratio:
+            op, url = "add", base + "/add"
+            data = urllib.parse.urlencode({
+                "category": "Fun", "amount": f"{rng.uniform(1, 100):.2f}", "description": "load",
+            }).encode()
+        else:
+            op, url, data = "read", base + "/api/summary", None
+        t0 = time.perf_counter()
+        try:
+            opener.open(url, data).read()
+            local[op].append(time.perf_counter() - t0)
+        except (urllib.error.URLError, ConnectionError):
+            local["errors"][op] += 1
+    with lock:
+        for op in ("add", "read"):
+            results[op].extend(local[op])
+            results["errors"][op] += local["errors"][op]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:10000")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--write-ratio", type=float, default=0.3)
+    args = parser.parse_args()
+
+    results = {"add": [], "read": [], "errors": {"add": 0, "read": 0}}
+    lock = threading.Lock()
+    base = args.url.rstrip("/")
+    openers = [register(base) for _ in range(args.threads)]
+    deadline = time.monotonic() + args.duration
+    threads = [threading.Thread(target=worker, args=(opener, base, deadline, args.write_ratio, results, lock))
+               for opener in openers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    print(f"{'op':<6} {'ok':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for op in ("add", "read"):
+        samples = results[op]
+        if not samples:
+            print(f"{op:<6} {0:>8} {'-':>8} {'-':>8} {'-':>8} {results['errors'][op]:>7}")
+            continue
+        print(f"{op:<6} {len(samples):>8} {len(samples) / args.duration:>8.1f} "
+              f"{percentile(samples, 50) * 1e3:>8.1f} {percentile(samples, 99) * 1e3:>8.1f} "
+              f"{results['errors'][op]:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+"""The original budget tracker app, kept alongside budget_web for comparison.
+
+It shares instrumentation.py and queryplans.py with budget_web, so run it from
+the repository root as a package module::
+
+    flask --app budget_tracker.app run
+    python -m budget_tracker.app
+
+Its live dashboard updates are fanned out inside one process, so serve it with
+a single worker process (see EventBroker)::
+
+    gunicorn -w 1 -k gthread --threads 32 budget_tracker.app:app
+"""
@@ -1,15 +1,28 @@
-from flask import Flask, render_template, request, redirect, url_for
+from flask import Blueprint, Flask, Response, render_template, request, redirect, url_for, jsonify, abort
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import (
     LoginManager, UserMixin, login_user,
     login_required, logout_user, current_user
 )
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
-
-app = Flask(__name__)
+from sqlalchemy import func, null, select, union_all
+from collections import OrderedDict, deque
+from datetime import date, datetime, timedelta
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+
+from instrumentation import init_instrumentation
+from queryplans import explain, init_query_plans
+
+# Kept in budget_tracker/instance: the default instance folder of a package module is the
+# repository root's, which holds budget_web's database.
+app = Flask(__name__, instance_path=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance'))
 app.config['SECRET_KEY'] = 'your_secret_key'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///expenses.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///expenses.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db = SQLAlchemy(app)
@@ -17,6 +30,19 @@ login_manager = LoginManager(app)
 login_manager.login_view = 'login'
 
 CATEGORIES = ["Bills", "Debt", "Savings", "Fun", "Emergency Fund", "Groceries"]
+PAGE_SIZE = 50
+# Live dashboard updates (see EventBroker): events kept per user for reconnecting tabs,
+# open streams allowed per user, the keep-alive interval that also detects closed tabs, and
+# how long one stream may hold a server thread before the browser is told to reconnect.
+EVENT_BACKLOG = 100
+MAX_STREAMS_PER_USER = 8
+SSE_KEEPALIVE_SECONDS = 15
+SSE_STREAM_SECONDS = int(os.environ.get('SSE_STREAM_SECONDS', 300))
+
+# budget_web's static/ at the repository root, for the chart script both apps draw with.
+shared = Blueprint('shared', __name__, static_folder=os.path.join(os.path.dirname(app.root_path), 'static'),
+                   static_url_path='/shared')
+app.register_blueprint(shared)
 
 
 class User(UserMixin, db.Model):
@@ -30,20 +56,155 @@ class Expense(db.Model):
     category = db.Column(db.String(50), nullable=False)
     amount = db.Column(db.Float, nullable=False)
     description = db.Column(db.String(100))
-    date = db.Column(db.String(10), default=lambda: datetime.now().strftime("%m-%d-%Y"))
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    date = db.Column(db.Date, default=lambda: datetime.now().date())
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    __table_args__ = (
+        # Covers the per-category SUM so the dashboard never touches the table itself.
+        db.Index('ix_expense_user_category', 'user_id', 'category', 'amount'),
+        db.Index('ix_expense_user_date', 'user_id', 'date'),
+    )
 
 
 class Income(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     amount = db.Column(db.Float, nullable=False)
-    date = db.Column(db.String(10), default=lambda: datetime.now().strftime("%m-%d-%Y"))
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-
-
-# Create database tables once at startup
+    date = db.Column(db.Date, default=lambda: datetime.now().date())
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    __table_args__ = (db.Index('ix_income_user_date', 'user_id', 'date'),)
+
+
+# Schema migrations, applied in order and tracked in SQLite's PRAGMA user_version.
+# create_all() only adds missing tables, so anything that changes an existing table
+# (indexes, column conversions, backfills) goes here. Each entry is a description and
+# a list of SQL strings or callables taking the connection.
+MIGRATIONS = [
+    ('index expense/income by user, category and date', [
+        'CREATE INDEX IF NOT EXISTS ix_expense_user_id ON expense (user_id)',
+        'CREATE INDEX IF NOT EXISTS ix_expense_user_category ON expense (user_id, category, amount)',
+        'CREATE INDEX IF NOT EXISTS ix_expense_user_date ON expense (user_id, date)',
+        'CREATE INDEX IF NOT EXISTS ix_income_user_id ON income (user_id)',
+        'CREATE INDEX IF NOT EXISTS ix_income_user_date ON income (user_id, date)',
+    ]),
+    # Dates used to be stored as "%m-%d-%Y" text, which neither sorts nor range-filters.
+    # Rewrite them as ISO "YYYY-MM-DD" (what db.Date stores on SQLite); the old VARCHAR
+    # declaration can stay since SQLite keeps the text as-is either way.
+    ('store expense/income dates as ISO dates', [
+        "UPDATE expense SET date = substr(date, 7, 4) || '-' || substr(date, 1, 2) || '-' || substr(date, 4, 2)"
+        " WHERE date LIKE '__-__-____'",
+        "UPDATE income SET date = substr(date, 7, 4) || '-' || substr(date, 1, 2) || '-' || substr(date, 4, 2)"
+        " WHERE date LIKE '__-__-____'",
+    ]),
+]
+
+
+def migrate_db():
+    with db.engine.begin() as conn:
+        # IMMEDIATE takes the write lock up front, so concurrently starting workers
+        # apply each migration once and read user_version only after the winner commits.
+        conn.exec_driver_sql('BEGIN IMMEDIATE')
+        db.metadata.create_all(conn)
+        version = conn.exec_driver_sql('PRAGMA user_version').scalar()
+        for number, (description, steps) in enumerate(MIGRATIONS[version:], start=version + 1):
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.exec_driver_sql(step)
+            conn.exec_driver_sql(f'PRAGMA user_version = {number}')
+            app.logger.info('Applied migration %d: %s', number, description)
+
+
+# Create and upgrade database tables once at startup
 with app.app_context():
-    db.create_all()
+    migrate_db()
+
+
+class EventBroker:
+    """Fans a user's dashboard events out to the SSE streams of their open tabs.
+
+    Each event is a JSON object whose ``id`` is ``<boot>-<seq>``. The last ``backlog``
+    events per user are kept, so a stream that reconnects with Last-Event-ID (or a page
+    that connects with the id it was rendered at) first gets what it missed. If those
+    events are gone, or the id is from another process or an earlier run, it gets a
+    ``reload`` event instead. Everything is per process, so with several server
+    processes a tab only hears about writes served by the process holding its stream:
+    run the tracker as one process with enough threads for the open streams, e.g.
+    ``gunicorn -w 1 -k gthread --threads 32 budget_tracker.app:app``.
+
+    ``user_lock(user_id)`` is held around a write's commit and publish, and around the
+    reads of a page render. So the id a page is rendered at covers exactly the writes
+    its data includes.
+    """
+
+    def __init__(self, backlog=EVENT_BACKLOG, max_users=1024):
+        self.boot = uuid.uuid4().hex[:8]
+        self.backlog = backlog
+        self.max_users = max_users
+        self._seq = 0
+        self._evicted = 0  # newest seq among the backlogs dropped whole
+        self._backlogs = OrderedDict()  # user_id -> [newest dropped seq, deque of (seq, name, data)]
+        self._streams = {}  # user_id -> set of queues
+        self._lock = threading.Lock()
+        self._user_locks = [threading.Lock() for _ in range(64)]
+
+    def user_lock(self, user_id):
+        return self._user_locks[user_id % len(self._user_locks)]
+
+    def last_id(self):
+        with self._lock:
+            return f'{self.boot}-{self._seq}'
+
+    def streams(self, user_id):
+        with self._lock:
+            return len(self._streams.get(user_id, ()))
+
+    def publish(self, user_id, name, data):
+        """Send ``data`` as event ``name`` to the user's streams; returns it with its id."""
+        with self._lock:
+            self._seq += 1
+            data = dict(data, id=f'{self.boot}-{self._seq}')
+            event = (self._seq, name, json.dumps(data))
+            entry = self._backlogs.get(user_id)
+            if entry is None:
+                entry = self._backlogs[user_id] = [self._evicted, deque(maxlen=self.backlog)]
+            self._backlogs.move_to_end(user_id)
+            if len(entry[1]) == self.backlog:
+                entry[0] = entry[1][0][0]
+            entry[1].append(event)
+            while len(self._backlogs) > self.max_users:
+                _, (dropped, events) = self._backlogs.popitem(last=False)
+                self._evicted = max(self._evicted, events[-1][0] if events else dropped)
+            for stream in self._streams.get(user_id, ()):
+                stream.put(event)
+        return data
+
+    def subscribe(self, user_id, last_event_id=None):
+        """A new queue of the user's events, and the backlog after ``last_event_id``
+        (None if it can't be replayed)."""
+        stream = queue.SimpleQueue()
+        with self._lock:
+            self._streams.setdefault(user_id, set()).add(stream)
+            if last_event_id is None:
+                return stream, []
+            boot, _, seq = last_event_id.partition('-')
+            entry = self._backlogs.get(user_id)
+            dropped = entry[0] if entry else self._evicted
+            if boot != self.boot or not seq.isdigit() or int(seq) < dropped:
+                return stream, None
+            return stream, [event for event in (entry[1] if entry else ()) if event[0] > int(seq)]
+
+    def unsubscribe(self, user_id, stream):
+        """Stop filling ``stream``; returns the id that every event put in it is at or before."""
+        with self._lock:
+            streams = self._streams.get(user_id)
+            if streams is not None:
+                streams.discard(stream)
+                if not streams:
+                    del self._streams[user_id]
+            return f'{self.boot}-{self._seq}'
+
+
+broker = EventBroker()
 
 
 @login_manager.user_loader
@@ -51,6 +212,105 @@ def load_user(user_id):
     return db.session.get(User, int(user_id))
 
 
+@app.template_filter('mdy')
+def format_mdy(value):
+    return value.strftime('%m-%d-%Y') if value else ''
+
+
+def date_range_args():
+    # ?month=YYYY-MM, or ?from=YYYY-MM-DD&to=YYYY-MM-DD (either end optional, both inclusive).
+    try:
+        if request.args.get('month'):
+            start = datetime.strptime(request.args['month'], '%Y-%m').date()
+            end = (start + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+            return start, end
+        start, end = (request.args.get(k) for k in ('from', 'to'))
+        return (datetime.strptime(start, '%Y-%m-%d').date() if start else None,
+                datetime.strptime(end, '%Y-%m-%d').date() if end else None)
+    except ValueError:
+        abort(400)
+
+
+def in_period(model, start, end):
+    conditions = []
+    if start:
+        conditions.append(model.date >= start)
+    if end:
+        conditions.append(model.date <= end)
+    return conditions
+
+
+def dashboard_totals_query(user_id, start=None, end=None):
+    # One round trip: per-category expense sums plus the income sum under a NULL category
+    # (expense.category is NOT NULL, so the NULL key can only be the income row).
+    return union_all(
+        select(Expense.category, func.sum(Expense.amount))
+        .where(Expense.user_id == user_id, *in_period(Expense, start, end))
+        .group_by(Expense.category),
+        select(null(), func.sum(Income.amount))
+        .where(Income.user_id == user_id, *in_period(Income, start, end)),
+    )
+
+
+def dashboard_totals(user_id, start=None, end=None):
+    sums = dict(db.session.execute(dashboard_totals_query(user_id, start, end)).all())
+    total_income = sums.pop(None, None) or 0
+    total_spent = sum(sums.values())
+    totals_by_category = {cat: sums.get(cat, 0) for cat in CATEGORIES}
+    return total_income, total_spent, totals_by_category
+
+
+def keyset_query(model, user_id, before=None, start=None, end=None, limit=PAGE_SIZE):
+    # WHERE id < :before ORDER BY id DESC LIMIT n -- cost doesn't depend on how deep the page is.
+    query = model.query.filter_by(user_id=user_id).filter(*in_period(model, start, end))
+    if before is not None:
+        query = query.filter(model.id < before)
+    return query.order_by(model.id.desc()).limit(limit + 1)
+
+
+def keyset_page(model, user_id, before=None, start=None, end=None, limit=PAGE_SIZE):
+    rows = keyset_query(model, user_id, before, start, end, limit).all()
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def expense_to_dict(e):
+    return {
+        'id': e.id, 'date': e.date.isoformat() if e.date else None, 'category': e.category,
+        'amount': e.amount, 'description': e.description or '',
+    }
+
+
+def income_to_dict(i):
+    return {'id': i.id, 'date': i.date.isoformat() if i.date else None, 'amount': i.amount}
+
+
+def wants_json():
+    # The live dashboard submits with fetch() and asks for JSON; plain form posts keep the redirect.
+    return request.accept_mimetypes.best == 'application/json'
+
+
+def commit_and_publish(name, data):
+    # Commit the request's write, push the change to the user's open dashboards, and answer
+    # the request with the same delta.
+    with broker.user_lock(current_user.id):
+        db.session.commit()
+        event = broker.publish(current_user.id, name, data)
+    if wants_json():
+        return jsonify(event)
+    return redirect(url_for('home'))
+
+
+def page_response(model, template, name, to_dict):
+    start, end = date_range_args()
+    rows, next_cursor = keyset_page(model, current_user.id, request.args.get('before', type=int), start, end)
+    if request.args.get('format') == 'json':
+        return jsonify(items=[to_dict(r) for r in rows], next_cursor=next_cursor)
+    resp = app.make_response(render_template(template, **{name: rows}))
+    resp.headers['X-Next-Cursor'] = '' if next_cursor is None else str(next_cursor)
+    return resp
+
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     error = None
@@ -129,45 +389,107 @@ def logout():
 @app.route('/', methods=['GET'])
 @login_required
 def home():
-    expenses = Expense.query.filter_by(user_id=current_user.id).order_by(Expense.id.desc()).all()
-    incomes = Income.query.filter_by(user_id=current_user.id).order_by(Income.id.desc()).all()
-    total_income = sum(i.amount for i in incomes)
-    total_spent = sum(e.amount for e in expenses)
+    start, end = date_range_args()
+    period_args = {k: v for k, v in request.args.items() if k in ('month', 'from', 'to') and v}
+    with broker.user_lock(current_user.id):
+        last_event_id = broker.last_id()
+        expenses, next_expense_cursor = keyset_page(Expense, current_user.id, start=start, end=end)
+        incomes, next_income_cursor = keyset_page(Income, current_user.id, start=start, end=end)
+        total_income, total_spent, totals_by_category = dashboard_totals(current_user.id, start, end)
     remaining = total_income - total_spent
 
-    totals_by_category = {
-        cat: sum(e.amount for e in expenses if e.category == cat)
-        for cat in CATEGORIES
-    }
-    chart_labels = list(totals_by_category.keys())
-    chart_data = list(totals_by_category.values())
-
     return render_template(
         'dashboard.html',
         expenses=expenses,
         incomes=incomes,
+        next_expense_cursor=next_expense_cursor,
+        next_income_cursor=next_income_cursor,
+        start=start,
+        end=end,
+        period_args=period_args,
         total_income=total_income,
         total_spent=total_spent,
         remaining=remaining,
         totals_by_category=totals_by_category,
-        chart_labels=chart_labels,
-        chart_data=chart_data,
-        categories=CATEGORIES
+        categories=CATEGORIES,
+        # Live updates patch all-time totals; a page limited to a period keeps plain form posts.
+        live=not period_args,
+        last_event_id=last_event_id,
     )
 
 
+@app.route('/expenses')
+@login_required
+def list_expenses():
+    return page_response(Expense, '_expense_rows.html', 'expenses', expense_to_dict)
+
+
+@app.route('/incomes')
+@login_required
+def list_incomes():
+    return page_response(Income, '_income_rows.html', 'incomes', income_to_dict)
+
+
+@app.route('/events')
+@login_required
+def events():
+    # Server-sent events for this user's open dashboards: expense/income deltas as they are
+    # written, or ``reload`` when missed events can't be replayed (see EventBroker). After
+    # SSE_STREAM_SECONDS the stream ends with the id it got to, so its thread is freed and
+    # the browser reconnects from there with Last-Event-ID.
+    if broker.streams(current_user.id) >= MAX_STREAMS_PER_USER:
+        abort(429)
+    user_id = current_user.id
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+
+    def stream():
+        # Subscribed on the first read, so a response that is never sent leaves nothing behind.
+        events, replay = broker.subscribe(user_id, last_event_id)
+        try:
+            yield 'retry: 3000\n\n'
+            if replay is None:
+                yield 'event: reload\ndata: {}\n\n'
+                return
+            for seq, name, data in replay:
+                yield f'id: {broker.boot}-{seq}\nevent: {name}\ndata: {data}\n\n'
+            deadline = time.monotonic() + SSE_STREAM_SECONDS
+            while (left := deadline - time.monotonic()) > 0:
+                try:
+                    seq, name, data = events.get(timeout=min(SSE_KEEPALIVE_SECONDS, left))
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield f'id: {broker.boot}-{seq}\nevent: {name}\ndata: {data}\n\n'
+            position = broker.unsubscribe(user_id, events)
+            while True:
+                try:
+                    seq, name, data = events.get_nowait()
+                except queue.Empty:
+                    break
+                yield f'id: {broker.boot}-{seq}\nevent: {name}\ndata: {data}\n\n'
+            # An id with no data only moves the browser's Last-Event-ID, past events of other users.
+            yield f'id: {position}\n\n'
+        finally:
+            broker.unsubscribe(user_id, events)
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 @app.route('/add', methods=['POST'])
 @login_required
 def add_expense():
     cat = request.form['category']
     amt = float(request.form['amount'])
     desc = request.form.get('description', '')
-    dt = datetime.now().strftime("%m-%d-%Y")
-    db.session.add(Expense(
-        category=cat, amount=amt, description=desc, date=dt, user_id=current_user.id
-    ))
-    db.session.commit()
-    return redirect(url_for('home'))
+    dt = datetime.now().date()
+    e = Expense(category=cat, amount=amt, description=desc, date=dt, user_id=current_user.id)
+    db.session.add(e)
+    db.session.flush()
+    return commit_and_publish('expense', {
+        'op': 'add', 'expense': expense_to_dict(e), 'html': render_template('_expense_rows.html', expenses=[e]),
+        'totals': {'spent': amt, 'categories': {cat: amt}},
+    })
 
 
 @app.route('/edit/<int:expense_id>', methods=['GET', 'POST'])
@@ -177,12 +499,18 @@ def edit_expense(expense_id):
     if e.user_id != current_user.id:
         return 'Unauthorized', 403
     if request.method == 'POST':
+        categories = {e.category: -e.amount}
+        spent = -e.amount
         e.category = request.form['category']
         e.amount = float(request.form['amount'])
         e.description = request.form.get('description', '')
-        e.date = datetime.now().strftime("%m-%d-%Y")
-        db.session.commit()
-        return redirect(url_for('home'))
+        e.date = datetime.now().date()
+        db.session.flush()
+        categories[e.category] = categories.get(e.category, 0) + e.amount
+        return commit_and_publish('expense', {
+            'op': 'update', 'expense': expense_to_dict(e), 'html': render_template('_expense_rows.html', expenses=[e]),
+            'totals': {'spent': spent + e.amount, 'categories': categories},
+        })
     return render_template('edit_expense.html', expense=e, categories=CATEGORIES)
 
 
@@ -192,27 +520,46 @@ def delete_expense(expense_id):
     e = Expense.query.get_or_404(expense_id)
     if e.user_id != current_user.id:
         return 'Unauthorized', 403
+    delta = {'op': 'delete', 'expense': {'id': e.id}, 'totals': {'spent': -e.amount, 'categories': {e.category: -e.amount}}}
     db.session.delete(e)
-    db.session.commit()
-    return redirect(url_for('home'))
+    return commit_and_publish('expense', delta)
 
 
 @app.route('/add_income', methods=['POST'])
 @login_required
 def add_income():
     amt = float(request.form['amount'])
-    dt = datetime.now().strftime("%m-%d-%Y")
-    db.session.add(Income(amount=amt, date=dt, user_id=current_user.id))
-    db.session.commit()
-    return redirect(url_for('home'))
+    dt = datetime.now().date()
+    i = Income(amount=amt, date=dt, user_id=current_user.id)
+    db.session.add(i)
+    db.session.flush()
+    return commit_and_publish('income', {
+        'op': 'add', 'income': income_to_dict(i), 'html': render_template('_income_rows.html', incomes=[i]),
+        'totals': {'income': amt},
+    })
 
 
 @app.route('/reset_income')
 @login_required
 def reset_income():
     Income.query.filter_by(user_id=current_user.id).delete()
-    db.session.commit()
-    return redirect(url_for('home'))
+    return commit_and_publish('income', {'op': 'reset'})
+
+
+def query_plans():
+    # EXPLAIN QUERY PLAN steps of each dashboard query, by name; see check-query-plans.
+    return explain(db, {
+        'dashboard totals': dashboard_totals_query(1),
+        'monthly totals': dashboard_totals_query(1, date(2026, 1, 1), date(2026, 1, 31)),
+        'expense page': keyset_query(Expense, 1, before=1000).statement,
+        'income page': keyset_query(Income, 1, before=1000).statement,
+    })
+
+
+init_query_plans(app, query_plans)
+
+# Off unless METRICS_ENABLED is set; see instrumentation.py.
+init_instrumentation(app)
 
 
 if __name__ == '__main__':
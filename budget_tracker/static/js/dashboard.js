@@ -0,0 +1,135 @@
+let sidebarOpen = false;
+function toggleSidebar() {
+    sidebarOpen = !sidebarOpen;
+    document.getElementById('sidebar').classList.toggle('open', sidebarOpen);
+}
+let lastScroll = 0;
+window.addEventListener('scroll', function() {
+    let navbar = document.getElementById('navbar');
+    let currScroll = window.scrollY;
+    if (currScroll > lastScroll && currScroll > 60) { navbar.style.top = "-80px"; }
+    else { navbar.style.top = "0"; }
+    lastScroll = currScroll;
+});
+// Totals as rendered; live updates adjust them in place (see applyEvent)
+const state = JSON.parse(document.getElementById('dashboardState').textContent);
+const categoryNames = Object.keys(state.categories);
+function categoryTotals() {
+    return categoryNames.map(function(cat) { return state.categories[cat]; });
+}
+// Charts (static/js/charts.js at the repository root, served under /shared)
+const chartColors = ['#444ce7','#fb6868','#44d964','#ffd95a','#565af7','#ffe37a'];
+function barOptions() {
+    return {labels: categoryNames, series: [{label: "Total", data: categoryTotals(), color: "#444ce7"}]};
+}
+function pieOptions() {
+    return {labels: categoryNames, data: categoryTotals(), colors: chartColors};
+}
+const barChart = Charts.bar(document.getElementById('barChart'), barOptions());
+const pieChart = Charts.pie(document.getElementById('pieChart'), pieOptions());
+// Remove up/down on number inputs (income/expense)
+document.querySelectorAll('input[type=number]').forEach(input => {
+    input.addEventListener('wheel', function(e){ e.preventDefault(); });
+    input.style.appearance = 'textfield';
+});
+// Reset income confirmation
+function confirmResetIncome() {
+    if (confirm("Reset income to $0 and delete all income history?")) {
+        if (state.live) { send("/reset_income"); } else { window.location.href = "/reset_income"; }
+    }
+}
+// Keyset pagination: append the next page of rows, drop the button on the last page
+function loadMore(btn) {
+    const url = new URL(btn.dataset.url, window.location.href);
+    url.searchParams.set("before", btn.dataset.cursor);
+    fetch(url).then(function(r) {
+        const next = r.headers.get("X-Next-Cursor");
+        return r.text().then(function(rows) {
+            document.getElementById(btn.dataset.table).tBodies[0].insertAdjacentHTML("beforeend", rows);
+            if (next) { btn.dataset.cursor = next; } else { btn.remove(); }
+        });
+    });
+}
+
+// Live updates: writes go through fetch() and come back as JSON deltas, and /events pushes the
+// same deltas from this user's other tabs. Each event is applied once, whichever copy arrives
+// first; only the new row and the affected totals are touched.
+function money(value) {
+    return "$" + value.toLocaleString("en-US", {minimumFractionDigits: 2, maximumFractionDigits: 2});
+}
+function cents(value) {
+    return Math.round(value * 100) / 100;
+}
+function renderTotals() {
+    document.getElementById('totalIncome').textContent = money(state.income);
+    document.getElementById('totalSpent').textContent = money(state.spent);
+    document.getElementById('remaining').textContent = money(cents(state.income - state.spent));
+    document.querySelectorAll('#categoryTable tr[data-category]').forEach(function(row) {
+        row.cells[1].textContent = money(state.categories[row.dataset.category]);
+    });
+    barChart.update(barOptions());
+    pieChart.update(pieOptions());
+}
+function tableRow(tableId, id) {
+    return document.querySelector('#' + tableId + ' tr[data-id="' + id + '"]');
+}
+function insertRow(tableId, html) {
+    // Newest first: right under the header row
+    document.getElementById(tableId).rows[0].insertAdjacentHTML("afterend", html);
+}
+const applied = new Set();
+function applyEvent(event) {
+    if (applied.has(event.id)) { return; }
+    applied.add(event.id);
+    const totals = event.totals || {};
+    if (event.expense) {
+        const row = tableRow('expenseTable', event.expense.id);
+        if (event.op === "add") { insertRow('expenseTable', event.html); }
+        else if (event.op === "update" && row) { row.outerHTML = event.html; }
+        else if (event.op === "delete" && row) { row.remove(); }
+    } else if (event.op === "add") {
+        insertRow('incomeTable', event.html);
+    } else if (event.op === "reset") {
+        const table = document.getElementById('incomeTable');
+        while (table.rows.length > 1) { table.deleteRow(1); }
+        const more = document.querySelector('.load-more[data-table="incomeTable"]');
+        if (more) { more.remove(); }
+        state.income = 0;
+    }
+    state.income = cents(state.income + (totals.income || 0));
+    state.spent = cents(state.spent + (totals.spent || 0));
+    Object.entries(totals.categories || {}).forEach(function([cat, delta]) {
+        if (cat in state.categories) { state.categories[cat] = cents(state.categories[cat] + delta); }
+    });
+    renderTotals();
+}
+function send(url, body) {
+    const options = {headers: {"Accept": "application/json"}};
+    if (body) { options.method = "POST"; options.body = body; }
+    return fetch(url, options).then(function(r) {
+        if (!r.ok) { throw new Error(r.status); }
+        return r.json();
+    }).then(applyEvent).catch(function() { window.location.reload(); });
+}
+if (state.live) {
+    ['expenseForm', 'incomeForm'].forEach(function(id) {
+        const form = document.getElementById(id);
+        form.addEventListener('submit', function(e) {
+            e.preventDefault();
+            send(form.action, new FormData(form)).then(function() { form.reset(); });
+        });
+    });
+    document.getElementById('expenseTable').addEventListener('click', function(e) {
+        const link = e.target.closest('.delete-link');
+        if (link) {
+            e.preventDefault();
+            send(link.href);
+        }
+    });
+    const source = new EventSource(state.events_url);
+    ['expense', 'income'].forEach(function(name) {
+        source.addEventListener(name, function(e) { applyEvent(JSON.parse(e.data)); });
+    });
+    // Sent when events were missed and can't be replayed (e.g. the server restarted)
+    source.addEventListener('reload', function() { window.location.reload(); });
+}
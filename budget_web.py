@@ -1,454 +1,1196 @@
-from flask import Flask, render_template_string, request, redirect, url_for
+from flask import Flask, render_template, request, redirect, url_for, jsonify, abort, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
+from sqlalchemy import DDL, and_, bindparam, event, func, insert, inspect, null, select, union_all, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import make_transient_to_detached
+from datetime import date, datetime, timedelta, timezone
+from functools import wraps
+from assets import accepts, build_assets, init_assets
+from cache import TTLCache, page_cache_from_url, source_fingerprint
+from importers import iter_csv, iter_ofx
+from instrumentation import init_instrumentation
+from money import divide_cents, dollars, parse_cents, project_balances, scale_cents, sum_by_key
+from passwords import HasherBusy, LoginThrottle, PasswordHasher
+from queryplans import explain, init_query_plans
+from writequeue import GroupCommitQueue
+import calendar
+import click
+import csv
+import gzip
+import io
+import json
+import math
+import os
+import re
+import threading
+import time
 
 app = Flask(__name__)
-app.config["SECRET_KEY"] = "your_secret_key"
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///expenses.db"
+app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "your_secret_key")
+app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///expenses.db")
+# One pooled connection per server thread (see gunicorn.conf.py); pysqlite connections are
+# opened with check_same_thread=False so a connection can be checked out by any thread.
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+    "pool_size": int(os.environ.get("DB_POOL_SIZE", 8)),
+    "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 4)),
+    "pool_timeout": 30,
+}
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
 db = SQLAlchemy(app)
 
+@event.listens_for(Engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers run alongside the single writer, busy_timeout makes writers queue for
+    # the lock instead of failing with "database is locked", and synchronous=NORMAL is
+    # durable under WAL while skipping the fsync on every commit.
+    if type(dbapi_connection).__module__ != "sqlite3":
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = "login"
 
+# Every new user starts with these; they can add and rename their own (see Category).
 CATEGORIES = ["Bills", "Debt", "Savings", "Fun", "Emergency Fund", "Groceries"]
+PAGE_SIZE = 50
+IMPORT_BATCH_SIZE = 5000
+IMPORT_MAX_ERRORS = 100
+EXPORT_CHUNK_ROWS = 1000
+EXPORT_FIELDS = ["type", "id", "date", "category", "amount", "description"]
+MAX_BULK_IDS = 10000
+SEARCH_MAX_WORDS = 8
+# OFFSET paging re-ranks the skipped matches, so deep pages are capped.
+SEARCH_MAX_PAGE = 100
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", 1024))
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", 300))
+# "memory" (per worker), "sqlite:///path" (shared by the workers on one host) or "off".
+DASHBOARD_CACHE = os.environ.get("DASHBOARD_CACHE", "memory")
+DASHBOARD_CACHE_BYTES = int(os.environ.get("DASHBOARD_CACHE_BYTES", 32 * 1024 * 1024))
+RECURRING_UNITS = ("day", "week", "month")
+RECURRING_BATCH_SIZE = int(os.environ.get("RECURRING_BATCH_SIZE", 5000))
+# How far back a new rule may start. Its past occurrences are inserted inside the request that
+# creates it, so a start decades ago would hold the write lock for tens of thousands of rows.
+RECURRING_MAX_BACKFILL_DAYS = int(os.environ.get("RECURRING_MAX_BACKFILL_DAYS", 366))
+# Seconds between in-process scheduler runs; 0 leaves it to `flask materialize-recurring` (cron).
+RECURRING_INTERVAL = float(os.environ.get("RECURRING_INTERVAL", 0))
+# Opt-in group commit for single-row writes from requests; see writequeue.py.
+GROUP_COMMIT = os.environ.get("GROUP_COMMIT", "").lower() in ("1", "true", "yes", "on")
+GROUP_COMMIT_MAX_BATCH = int(os.environ.get("GROUP_COMMIT_MAX_BATCH", 64))
+GROUP_COMMIT_MAX_WAIT_MS = float(os.environ.get("GROUP_COMMIT_MAX_WAIT_MS", 2))
+GROUP_COMMIT_TIMEOUT = 30
+# On-the-fly gzip of HTML/JSON responses (dashboard pages are cached gzipped); static files are
+# compressed ahead by `flask build-assets`, which gunicorn.conf.py runs at startup.
+COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL", 6))
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", 500))
+# werkzeug method string, e.g. "pbkdf2:sha256:600000" or "scrypt:32768:8:1"; existing hashes
+# made with other parameters are replaced at the user's next login. See passwords.py.
+PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "pbkdf2:sha256")
+# Hashing processes per server process; 0 hashes in the request thread. Use 0 for
+# `python budget_web.py`: the pool's processes would import this script again as their main
+# module, scheduler and write queue included (gunicorn and `flask run` are unaffected).
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 1))
+# Logins/password changes hashing or queued at once per server process; more get a 503. Keep it
+# below GUNICORN_THREADS so a login burst leaves threads free for other pages.
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", 4))
+# Password attempts (login, register, password changes) per minute; 0 disables the limit.
+LOGIN_ATTEMPTS_PER_MINUTE_IP = int(os.environ.get("LOGIN_ATTEMPTS_PER_MINUTE_IP", 30))
+LOGIN_ATTEMPTS_PER_MINUTE_USER = int(os.environ.get("LOGIN_ATTEMPTS_PER_MINUTE_USER", 10))
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(100), unique=True, nullable=False)
     password = db.Column(db.String(200), nullable=False)
 
+class Category(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    name = db.Column(db.String(50), nullable=False)
+    __table_args__ = (db.UniqueConstraint("user_id", "name", name="uq_category_user_name"),)
+
 class Expense(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    category = db.Column(db.String(50), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey("category.id"), nullable=False)
+    # Integer cents, so sums are exact; see money.py.
+    amount_cents = db.Column(db.Integer, nullable=False)
     description = db.Column(db.String(100))
-    date = db.Column(db.String(50), default=lambda: datetime.now().strftime("%m-%d-%Y"))
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    date = db.Column(db.Date, default=lambda: datetime.now().date())
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
+    # Set on rows materialized from a RecurringRule; unique per date, see materialize_recurring().
+    # Cleared when the row is edited, since an edit also moves its date.
+    recurring_rule_id = db.Column(db.Integer, db.ForeignKey("recurring_rule.id"))
+    # Many-to-one, so the join adds one primary-key lookup per row and never multiplies rows.
+    category = db.relationship(Category, lazy="joined", innerjoin=True)
+    __table_args__ = (
+        # Covers the per-category SUM so the dashboard never touches the table itself.
+        db.Index("ix_expense_user_category", "user_id", "category_id", "amount_cents"),
+        db.Index("ix_expense_user_date", "user_id", "date"),
+        db.Index("ux_expense_rule_date", "recurring_rule_id", "date", unique=True,
+                 sqlite_where=db.text("recurring_rule_id IS NOT NULL")),
+    )
+
+    @property
+    def amount(self):
+        return dollars(self.amount_cents)
 
 class Income(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    amount = db.Column(db.Float, nullable=False)
-    date = db.Column(db.String(50), default=lambda: datetime.now().strftime("%m-%d-%Y"))
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    amount_cents = db.Column(db.Integer, nullable=False)
+    date = db.Column(db.Date, default=lambda: datetime.now().date())
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
+    recurring_rule_id = db.Column(db.Integer, db.ForeignKey("recurring_rule.id"))
+    __table_args__ = (
+        db.Index("ix_income_user_date", "user_id", "date"),
+        db.Index("ux_income_rule_date", "recurring_rule_id", "date", unique=True,
+                 sqlite_where=db.text("recurring_rule_id IS NOT NULL")),
+    )
+
+    @property
+    def amount(self):
+        return dollars(self.amount_cents)
+
+# Running totals kept current by TRIGGERS, so the all-time dashboard
+# reads a handful of rows per user instead of summing the whole history.
+class UserTotals(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    income_cents = db.Column(db.Integer, nullable=False, default=0)
+    # Bumped on every expense/income write; drives the API's ETag and Last-Modified.
+    version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    updated_at = db.Column(db.DateTime)
+
+class CategoryTotal(db.Model):
+    category_id = db.Column(db.Integer, db.ForeignKey("category.id"), primary_key=True)
+    total_cents = db.Column(db.Integer, nullable=False, default=0)
+
+# Per-month spend by category ("YYYY-MM"), also kept current by TRIGGERS, so a budget check
+# reads one row per category instead of summing the month's expenses.
+class MonthlyCategoryTotal(db.Model):
+    category_id = db.Column(db.Integer, db.ForeignKey("category.id"), primary_key=True)
+    month = db.Column(db.String(7), primary_key=True)
+    total_cents = db.Column(db.Integer, nullable=False, default=0)
+
+# Per-month income ("YYYY-MM"), the income side of whole-month dashboard periods.
+class MonthlyIncomeTotal(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    month = db.Column(db.String(7), primary_key=True)
+    total_cents = db.Column(db.Integer, nullable=False, default=0)
+
+# Per-day spend by category, the finest bucket behind /api/trends (weeks are grouped from it
+# in SQL, months come from monthly_category_total).
+class DailyCategoryTotal(db.Model):
+    category_id = db.Column(db.Integer, db.ForeignKey("category.id"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    total_cents = db.Column(db.Integer, nullable=False, default=0)
+
+# A monthly spending limit for one category. It applies from `month` onwards until a later
+# row for the same category replaces it; a NULL limit removes the budget from that month on.
+class Budget(db.Model):
+    category_id = db.Column(db.Integer, db.ForeignKey("category.id"), primary_key=True)
+    month = db.Column(db.String(7), primary_key=True)
+    limit_cents = db.Column(db.Integer)
+
+# A repeating expense or income (rent, a bi-weekly paycheck): occurrence n falls on
+# start_date + n * every units. materialize_recurring() inserts the due ones and advances
+# `occurrences`/`next_date`; next_date is NULL once the schedule passes end_date.
+class RecurringRule(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
+    kind = db.Column(db.String(7), nullable=False)  # "expense" or "income"
+    category_id = db.Column(db.Integer, db.ForeignKey("category.id"))  # expense rules only
+    amount_cents = db.Column(db.Integer, nullable=False)
+    description = db.Column(db.String(100))
+    every = db.Column(db.Integer, nullable=False, default=1)
+    unit = db.Column(db.String(5), nullable=False)  # one of RECURRING_UNITS
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date)
+    occurrences = db.Column(db.Integer, nullable=False, default=0)
+    next_date = db.Column(db.Date, index=True)
+    category = db.relationship(Category, lazy="joined")
+
+# Full-text index for search_expenses(), kept in step by the expense_fts_* triggers. Not a
+# model, so create_all() creates it through this hook. It holds each expense's description
+# and category name under rowid user_id * 2**32 + expense.id, so one user's rows are a
+# contiguous rowid range the index can seek to.
+SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS expense_fts USING fts5("
+    "description, category, tokenize = 'porter unicode61 remove_diacritics 2')",
+]
+SEARCH_FILL = [
+    "INSERT INTO expense_fts (rowid, description, category) SELECT expense.user_id * 4294967296 + expense.id,"
+    " description, category.name FROM expense JOIN category ON category.id = expense.category_id",
+]
+for statement in SEARCH_DDL:
+    event.listen(db.metadata, "after_create", DDL(statement))
+
+def add_column(table, column, ddl):
+    # ALTER TABLE has no IF NOT EXISTS.
+    def step(conn):
+        if column not in {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}:
+            conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+    return step
+
+def touch_user_sql(user_ref):
+    return (f"INSERT INTO user_totals (user_id, income_cents, version, updated_at) VALUES ({user_ref}, 0, 1, CURRENT_TIMESTAMP)"
+            " ON CONFLICT (user_id) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at;")
+
+# Triggers rather than route code, so every write path (including set-based UPDATE/DELETE
+# statements) keeps the running totals and the per-user write version in step. They always
+# match the current models: migrate_db() drops them before running migrations and
+# reinstalls this list afterwards, so migrations only ever see plain tables.
+TRIGGERS = [
+    """CREATE TRIGGER expense_totals_insert AFTER INSERT ON expense BEGIN
+        INSERT INTO category_total (category_id, total_cents) VALUES (NEW.category_id, NEW.amount_cents)
+            ON CONFLICT (category_id) DO UPDATE SET total_cents = total_cents + excluded.total_cents;
+    END""",
+    """CREATE TRIGGER expense_totals_delete AFTER DELETE ON expense BEGIN
+        UPDATE category_total SET total_cents = total_cents - OLD.amount_cents WHERE category_id = OLD.category_id;
+    END""",
+    """CREATE TRIGGER expense_totals_update AFTER UPDATE OF amount_cents, category_id ON expense BEGIN
+        UPDATE category_total SET total_cents = total_cents - OLD.amount_cents WHERE category_id = OLD.category_id;
+        INSERT INTO category_total (category_id, total_cents) VALUES (NEW.category_id, NEW.amount_cents)
+            ON CONFLICT (category_id) DO UPDATE SET total_cents = total_cents + excluded.total_cents;
+    END""",
+    """CREATE TRIGGER income_totals_insert AFTER INSERT ON income BEGIN
+        INSERT INTO user_totals (user_id, income_cents) VALUES (NEW.user_id, NEW.amount_cents)
+            ON CONFLICT (user_id) DO UPDATE SET income_cents = income_cents + excluded.income_cents;
+    END""",
+    """CREATE TRIGGER income_totals_delete AFTER DELETE ON income BEGIN
+        UPDATE user_totals SET income_cents = income_cents - OLD.amount_cents WHERE user_id = OLD.user_id;
+    END""",
+    """CREATE TRIGGER income_totals_update AFTER UPDATE OF amount_cents, user_id ON income BEGIN
+        UPDATE user_totals SET income_cents = income_cents - OLD.amount_cents WHERE user_id = OLD.user_id;
+        INSERT INTO user_totals (user_id, income_cents) VALUES (NEW.user_id, NEW.amount_cents)
+            ON CONFLICT (user_id) DO UPDATE SET income_cents = income_cents + excluded.income_cents;
+    END""",
+] + [
+    # Category names appear in the summary too, so adding or renaming one is a write.
+    f"""CREATE TRIGGER {table}_touch_{event.lower()} AFTER {event} ON {table} BEGIN
+        {touch_user_sql("OLD.user_id" if event == "DELETE" else "NEW.user_id")}
+    END"""
+    for table in ("expense", "income", "category") for event in ("INSERT", "UPDATE", "DELETE")
+] + [
+    # A row moved to another user changes both users' data.
+    f"""CREATE TRIGGER {table}_touch_move AFTER UPDATE OF user_id ON {table}
+        WHEN OLD.user_id IS NOT NEW.user_id BEGIN
+        {touch_user_sql("OLD.user_id")}
+    END"""
+    for table in ("expense", "income")
+] + [
+    # INSERT ... SELECT ... WHERE so expenses without a date are left out.
+    """CREATE TRIGGER expense_monthly_insert AFTER INSERT ON expense BEGIN
+        INSERT INTO monthly_category_total (category_id, month, total_cents)
+            SELECT NEW.category_id, substr(NEW.date, 1, 7), NEW.amount_cents WHERE NEW.date IS NOT NULL
+            ON CONFLICT (category_id, month) DO UPDATE SET total_cents = total_cents + excluded.total_cents;
+    END""",
+    """CREATE TRIGGER expense_monthly_delete AFTER DELETE ON expense BEGIN
+        UPDATE monthly_category_total SET total_cents = total_cents - OLD.amount_cents
+            WHERE category_id = OLD.category_id AND month = substr(OLD.date, 1, 7);
+    END""",
+    """CREATE TRIGGER expense_monthly_update AFTER UPDATE OF amount_cents, category_id, date ON expense BEGIN
+        UPDATE monthly_category_total SET total_cents = total_cents - OLD.amount_cents
+            WHERE category_id = OLD.category_id AND month = substr(OLD.date, 1, 7);
+        INSERT INTO monthly_category_total (category_id, month, total_cents)
+            SELECT NEW.category_id, substr(NEW.date, 1, 7), NEW.amount_cents WHERE NEW.date IS NOT NULL
+            ON CONFLICT (category_id, month) DO UPDATE SET total_cents = total_cents + excluded.total_cents;
+    END""",
+    """CREATE TRIGGER income_monthly_insert AFTER INSERT ON income BEGIN
+        INSERT INTO monthly_income_total (user_id, month, total_cents)
+            SELECT NEW.user_id, substr(NEW.date, 1, 7), NEW.amount_cents WHERE NEW.date IS NOT NULL
+            ON CONFLICT (user_id, month) DO UPDATE SET total_cents = total_cents + excluded.total_cents;
+    END""",
+    """CREATE TRIGGER income_monthly_delete AFTER DELETE ON income BEGIN
+        UPDATE monthly_income_total SET total_cents = total_cents - OLD.amount_cents
+            WHERE user_id = OLD.user_id AND month = substr(OLD.date, 1, 7);
+    END""",
+    """CREATE TRIGGER income_monthly_update AFTER UPDATE OF amount_cents, user_id, date ON income BEGIN
+        UPDATE monthly_income_total SET total_cents = total_cents - OLD.amount_cents
+            WHERE user_id = OLD.user_id AND month = substr(OLD.date, 1, 7);
+        INSERT INTO monthly_income_total (user_id, month, total_cents)
+            SELECT NEW.user_id, substr(NEW.date, 1, 7), NEW.amount_cents WHERE NEW.date IS NOT NULL
+            ON CONFLICT (user_id, month) DO UPDATE SET total_cents = total_cents + excluded.total_cents;
+    END""",
+    """CREATE TRIGGER expense_daily_insert AFTER INSERT ON expense BEGIN
+        INSERT INTO daily_category_total (category_id, day, total_cents)
+            SELECT NEW.category_id, NEW.date, NEW.amount_cents WHERE NEW.date IS NOT NULL
+            ON CONFLICT (category_id, day) DO UPDATE SET total_cents = total_cents + excluded.total_cents;
+    END""",
+    """CREATE TRIGGER expense_daily_delete AFTER DELETE ON expense BEGIN
+        UPDATE daily_category_total SET total_cents = total_cents - OLD.amount_cents
+            WHERE category_id = OLD.category_id AND day = OLD.date;
+    END""",
+    """CREATE TRIGGER expense_daily_update AFTER UPDATE OF amount_cents, category_id, date ON expense BEGIN
+        UPDATE daily_category_total SET total_cents = total_cents - OLD.amount_cents
+            WHERE category_id = OLD.category_id AND day = OLD.date;
+        INSERT INTO daily_category_total (category_id, day, total_cents)
+            SELECT NEW.category_id, NEW.date, NEW.amount_cents WHERE NEW.date IS NOT NULL
+            ON CONFLICT (category_id, day) DO UPDATE SET total_cents = total_cents + excluded.total_cents;
+    END""",
+    """CREATE TRIGGER expense_fts_insert AFTER INSERT ON expense BEGIN
+        INSERT INTO expense_fts (rowid, description, category) VALUES (NEW.user_id * 4294967296 + NEW.id,
+            NEW.description, (SELECT name FROM category WHERE id = NEW.category_id));
+    END""",
+    """CREATE TRIGGER expense_fts_delete AFTER DELETE ON expense BEGIN
+        DELETE FROM expense_fts WHERE rowid = OLD.user_id * 4294967296 + OLD.id;
+    END""",
+    """CREATE TRIGGER expense_fts_update AFTER UPDATE OF description, category_id, user_id ON expense BEGIN
+        DELETE FROM expense_fts WHERE rowid = OLD.user_id * 4294967296 + OLD.id;
+        INSERT INTO expense_fts (rowid, description, category) VALUES (NEW.user_id * 4294967296 + NEW.id,
+            NEW.description, (SELECT name FROM category WHERE id = NEW.category_id));
+    END""",
+    """CREATE TRIGGER expense_fts_category_rename AFTER UPDATE OF name ON category BEGIN
+        UPDATE expense_fts SET category = NEW.name WHERE rowid IN (
+            SELECT NEW.user_id * 4294967296 + id FROM expense WHERE user_id = NEW.user_id AND category_id = NEW.id);
+    END""",
+]
+
+# The trigger-maintained summaries, each with a query recomputing it from the raw rows under
+# the same column names: (table, key columns, total column, query). See check-totals.
+SUMMARIES = [
+    ("category_total", ("category_id",), "total_cents",
+     "SELECT category_id, SUM(amount_cents) AS total FROM expense GROUP BY category_id"),
+    ("user_totals", ("user_id",), "income_cents",
+     "SELECT user_id, SUM(amount_cents) AS total FROM income GROUP BY user_id"),
+    ("monthly_category_total", ("category_id", "month"), "total_cents",
+     "SELECT category_id, substr(date, 1, 7) AS month, SUM(amount_cents) AS total FROM expense"
+     " WHERE date IS NOT NULL GROUP BY category_id, substr(date, 1, 7)"),
+    ("monthly_income_total", ("user_id", "month"), "total_cents",
+     "SELECT user_id, substr(date, 1, 7) AS month, SUM(amount_cents) AS total FROM income"
+     " WHERE date IS NOT NULL GROUP BY user_id, substr(date, 1, 7)"),
+    ("daily_category_total", ("category_id", "day"), "total_cents",
+     "SELECT category_id, date AS day, SUM(amount_cents) AS total FROM expense"
+     " WHERE date IS NOT NULL GROUP BY category_id, date"),
+]
+
+# Schema migrations for existing databases, applied in order and tracked in SQLite's
+# PRAGMA user_version. A new database is created straight from the models and stamped
+# with the latest version, so each migration works against the schema as it stood at
+# the time (hence the literal DDL) and may assume the tables it touches exist. Each entry
+# is a description and a list of SQL strings or callables taking the connection.
+MIGRATIONS = [
+    ("index expense/income by user, category and date", [
+        "CREATE INDEX IF NOT EXISTS ix_expense_user_id ON expense (user_id)",
+        "CREATE INDEX IF NOT EXISTS ix_expense_user_category ON expense (user_id, category, amount)",
+        "CREATE INDEX IF NOT EXISTS ix_expense_user_date ON expense (user_id, date)",
+        "CREATE INDEX IF NOT EXISTS ix_income_user_id ON income (user_id)",
+        "CREATE INDEX IF NOT EXISTS ix_income_user_date ON income (user_id, date)",
+    ]),
+    # Dates used to be stored as "%m-%d-%Y" text, which neither sorts nor range-filters.
+    # Rewrite them as ISO "YYYY-MM-DD" (what db.Date stores on SQLite); the old VARCHAR
+    # declaration can stay since SQLite keeps the text as-is either way.
+    ("store expense/income dates as ISO dates", [
+        "UPDATE expense SET date = substr(date, 7, 4) || '-' || substr(date, 1, 2) || '-' || substr(date, 4, 2)"
+        " WHERE date LIKE '__-__-____'",
+        "UPDATE income SET date = substr(date, 7, 4) || '-' || substr(date, 1, 2) || '-' || substr(date, 4, 2)"
+        " WHERE date LIKE '__-__-____'",
+    ]),
+    ("maintain per-user running totals on write", [
+        """CREATE TABLE IF NOT EXISTS category_total (
+            user_id INTEGER NOT NULL, category VARCHAR(50) NOT NULL, total FLOAT NOT NULL,
+            PRIMARY KEY (user_id, category), FOREIGN KEY(user_id) REFERENCES user (id))""",
+        """CREATE TABLE IF NOT EXISTS user_totals (
+            user_id INTEGER NOT NULL, income FLOAT NOT NULL,
+            PRIMARY KEY (user_id), FOREIGN KEY(user_id) REFERENCES user (id))""",
+        "DELETE FROM category_total",
+        "DELETE FROM user_totals",
+        "INSERT INTO category_total (user_id, category, total)"
+        " SELECT user_id, category, SUM(amount) FROM expense WHERE user_id IS NOT NULL GROUP BY user_id, category",
+        "INSERT INTO user_totals (user_id, income)"
+        " SELECT user_id, SUM(amount) FROM income WHERE user_id IS NOT NULL GROUP BY user_id",
+    ]),
+    ("track a per-user write version for conditional GETs", [
+        add_column("user_totals", "version", "INTEGER NOT NULL DEFAULT 0"),
+        add_column("user_totals", "updated_at", "DATETIME"),
+        "INSERT OR IGNORE INTO user_totals (user_id, income) SELECT id, 0 FROM user",
+        "UPDATE user_totals SET updated_at = CURRENT_TIMESTAMP",
+    ]),
+    # SQLite can't change a column's type in place, so each table is rebuilt the documented
+    # way: create, copy, drop, rename. Amounts are rounded to the nearest cent; the running
+    # totals are recomputed from the converted rows rather than carrying over float drift.
+    # Rows with no user_id were never reachable from any account and are not carried over.
+    ("store amounts and totals as integer cents", [
+        """CREATE TABLE expense_new (
+            id INTEGER NOT NULL, category VARCHAR(50) NOT NULL, amount_cents INTEGER NOT NULL,
+            description VARCHAR(100), date DATE, user_id INTEGER NOT NULL,
+            PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES user (id))""",
+        "INSERT INTO expense_new (id, category, amount_cents, description, date, user_id)"
+        " SELECT id, category, CAST(round(amount * 100) AS INTEGER), description, date, user_id"
+        " FROM expense WHERE user_id IS NOT NULL",
+        """CREATE TABLE income_new (
+            id INTEGER NOT NULL, amount_cents INTEGER NOT NULL, date DATE, user_id INTEGER NOT NULL,
+            PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES user (id))""",
+        "INSERT INTO income_new (id, amount_cents, date, user_id)"
+        " SELECT id, CAST(round(amount * 100) AS INTEGER), date, user_id FROM income WHERE user_id IS NOT NULL",
+        """CREATE TABLE category_total_new (
+            user_id INTEGER NOT NULL, category VARCHAR(50) NOT NULL, total_cents INTEGER NOT NULL,
+            PRIMARY KEY (user_id, category), FOREIGN KEY(user_id) REFERENCES user (id))""",
+        "INSERT INTO category_total_new (user_id, category, total_cents)"
+        " SELECT user_id, category, SUM(amount_cents) FROM expense_new GROUP BY user_id, category",
+        """CREATE TABLE user_totals_new (
+            user_id INTEGER NOT NULL, income_cents INTEGER NOT NULL, version INTEGER DEFAULT '0' NOT NULL,
+            updated_at DATETIME, PRIMARY KEY (user_id), FOREIGN KEY(user_id) REFERENCES user (id))""",
+        "INSERT INTO user_totals_new (user_id, income_cents, version, updated_at)"
+        " SELECT user_id, (SELECT COALESCE(SUM(amount_cents), 0) FROM income_new WHERE income_new.user_id = t.user_id),"
+        " version + 1, CURRENT_TIMESTAMP FROM user_totals AS t",
+    ] + [
+        statement
+        for table in ("expense", "income", "category_total", "user_totals")
+        for statement in (f"DROP TABLE {table}", f"ALTER TABLE {table}_new RENAME TO {table}")
+    ] + [
+        "CREATE INDEX ix_expense_user_id ON expense (user_id)",
+        "CREATE INDEX ix_expense_user_category ON expense (user_id, category, amount_cents)",
+        "CREATE INDEX ix_expense_user_date ON expense (user_id, date)",
+        "CREATE INDEX ix_income_user_id ON income (user_id)",
+        "CREATE INDEX ix_income_user_date ON income (user_id, date)",
+    ]),
+    ("monthly category totals and per-category budgets", [
+        """CREATE TABLE IF NOT EXISTS monthly_category_total (
+            user_id INTEGER NOT NULL, month VARCHAR(7) NOT NULL, category VARCHAR(50) NOT NULL,
+            total_cents INTEGER NOT NULL,
+            PRIMARY KEY (user_id, month, category), FOREIGN KEY(user_id) REFERENCES user (id))""",
+        "INSERT INTO monthly_category_total (user_id, month, category, total_cents)"
+        " SELECT user_id, substr(date, 1, 7), category, SUM(amount_cents) FROM expense"
+        " WHERE date IS NOT NULL GROUP BY user_id, substr(date, 1, 7), category",
+        """CREATE TABLE IF NOT EXISTS budget (
+            user_id INTEGER NOT NULL, category VARCHAR(50) NOT NULL, month VARCHAR(7) NOT NULL,
+            limit_cents INTEGER,
+            PRIMARY KEY (user_id, category, month), FOREIGN KEY(user_id) REFERENCES user (id))""",
+    ]),
+    # Category names move to their own table and everything else refers to them by id. Every
+    # user gets the six original categories (in their original order), plus any other name
+    # their expenses or budgets already use.
+    ("per-user category table referenced by id", [
+        """CREATE TABLE category (
+            id INTEGER NOT NULL, user_id INTEGER NOT NULL, name VARCHAR(50) NOT NULL,
+            PRIMARY KEY (id), CONSTRAINT uq_category_user_name UNIQUE (user_id, name),
+            FOREIGN KEY(user_id) REFERENCES user (id))""",
+        "INSERT INTO category (user_id, name) SELECT user.id, defaults.name FROM user, ("
+        " SELECT 1 AS position, 'Bills' AS name UNION ALL SELECT 2, 'Debt' UNION ALL SELECT 3, 'Savings'"
+        " UNION ALL SELECT 4, 'Fun' UNION ALL SELECT 5, 'Emergency Fund' UNION ALL SELECT 6, 'Groceries'"
+        ") AS defaults ORDER BY user.id, defaults.position",
+        "INSERT OR IGNORE INTO category (user_id, name)"
+        " SELECT user_id, category FROM expense UNION SELECT user_id, category FROM budget",
+        """CREATE TABLE expense_new (
+            id INTEGER NOT NULL, category_id INTEGER NOT NULL, amount_cents INTEGER NOT NULL,
+            description VARCHAR(100), date DATE, user_id INTEGER NOT NULL,
+            PRIMARY KEY (id), FOREIGN KEY(category_id) REFERENCES category (id),
+            FOREIGN KEY(user_id) REFERENCES user (id))""",
+        "INSERT INTO expense_new (id, category_id, amount_cents, description, date, user_id)"
+        " SELECT expense.id, category.id, amount_cents, description, date, expense.user_id FROM expense"
+        " JOIN category ON category.user_id = expense.user_id AND category.name = expense.category",
+        "DROP TABLE expense",
+        "ALTER TABLE expense_new RENAME TO expense",
+        "CREATE INDEX ix_expense_user_id ON expense (user_id)",
+        "CREATE INDEX ix_expense_user_category ON expense (user_id, category_id, amount_cents)",
+        "CREATE INDEX ix_expense_user_date ON expense (user_id, date)",
+        "DROP TABLE category_total",
+        """CREATE TABLE category_total (
+            category_id INTEGER NOT NULL, total_cents INTEGER NOT NULL,
+            PRIMARY KEY (category_id), FOREIGN KEY(category_id) REFERENCES category (id))""",
+        "INSERT INTO category_total (category_id, total_cents)"
+        " SELECT category_id, SUM(amount_cents) FROM expense GROUP BY category_id",
+        "DROP TABLE monthly_category_total",
+        """CREATE TABLE monthly_category_total (
+            category_id INTEGER NOT NULL, month VARCHAR(7) NOT NULL, total_cents INTEGER NOT NULL,
+            PRIMARY KEY (category_id, month), FOREIGN KEY(category_id) REFERENCES category (id))""",
+        "INSERT INTO monthly_category_total (category_id, month, total_cents)"
+        " SELECT category_id, substr(date, 1, 7), SUM(amount_cents) FROM expense"
+        " WHERE date IS NOT NULL GROUP BY category_id, substr(date, 1, 7)",
+        """CREATE TABLE budget_new (
+            category_id INTEGER NOT NULL, month VARCHAR(7) NOT NULL, limit_cents INTEGER,
+            PRIMARY KEY (category_id, month), FOREIGN KEY(category_id) REFERENCES category (id))""",
+        "INSERT INTO budget_new (category_id, month, limit_cents)"
+        " SELECT category.id, month, limit_cents FROM budget"
+        " JOIN category ON category.user_id = budget.user_id AND category.name = budget.category",
+        "DROP TABLE budget",
+        "ALTER TABLE budget_new RENAME TO budget",
+    ]),
+    ("daily category totals for trend charts", [
+        """CREATE TABLE IF NOT EXISTS daily_category_total (
+            category_id INTEGER NOT NULL, day DATE NOT NULL, total_cents INTEGER NOT NULL,
+            PRIMARY KEY (category_id, day), FOREIGN KEY(category_id) REFERENCES category (id))""",
+        "INSERT INTO daily_category_total (category_id, day, total_cents)"
+        " SELECT category_id, date, SUM(amount_cents) FROM expense WHERE date IS NOT NULL GROUP BY category_id, date",
+    ]),
+    ("recurring expense/income rules", [
+        """CREATE TABLE IF NOT EXISTS recurring_rule (
+            id INTEGER NOT NULL, user_id INTEGER NOT NULL, kind VARCHAR(7) NOT NULL, category_id INTEGER,
+            amount_cents INTEGER NOT NULL, description VARCHAR(100), every INTEGER NOT NULL,
+            unit VARCHAR(5) NOT NULL, start_date DATE NOT NULL, end_date DATE,
+            occurrences INTEGER NOT NULL, next_date DATE,
+            PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES user (id),
+            FOREIGN KEY(category_id) REFERENCES category (id))""",
+        "CREATE INDEX IF NOT EXISTS ix_recurring_rule_user_id ON recurring_rule (user_id)",
+        "CREATE INDEX IF NOT EXISTS ix_recurring_rule_next_date ON recurring_rule (next_date)",
+        add_column("expense", "recurring_rule_id", "INTEGER REFERENCES recurring_rule (id)"),
+        add_column("income", "recurring_rule_id", "INTEGER REFERENCES recurring_rule (id)"),
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_expense_rule_date ON expense (recurring_rule_id, date)"
+        " WHERE recurring_rule_id IS NOT NULL",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_income_rule_date ON income (recurring_rule_id, date)"
+        " WHERE recurring_rule_id IS NOT NULL",
+    ]),
+    ("full-text indexes of expense descriptions and category names", [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS expense_fts USING fts5("
+        "description, tokenize = 'porter unicode61 remove_diacritics 2')",
+        "CREATE VIRTUAL TABLE IF NOT EXISTS category_fts USING fts5("
+        "name, tokenize = 'porter unicode61 remove_diacritics 2')",
+        "INSERT INTO expense_fts (rowid, description) SELECT user_id * 4294967296 + id, description FROM expense",
+        "INSERT INTO category_fts (rowid, name) SELECT id, name FROM category",
+    ]),
+    ("monthly income totals for whole-month dashboard periods", [
+        """CREATE TABLE IF NOT EXISTS monthly_income_total (
+            user_id INTEGER NOT NULL, month VARCHAR(7) NOT NULL, total_cents INTEGER NOT NULL,
+            PRIMARY KEY (user_id, month), FOREIGN KEY(user_id) REFERENCES user (id))""",
+        "INSERT INTO monthly_income_total (user_id, month, total_cents)"
+        " SELECT user_id, substr(date, 1, 7), SUM(amount_cents) FROM income"
+        " WHERE date IS NOT NULL GROUP BY user_id, substr(date, 1, 7)",
+    ]),
+    # Category names join the descriptions in expense_fts, so one MATCH covers both and bm25()
+    # can rank the matches.
+    ("category names in the expense full-text index", [
+        "DROP TABLE IF EXISTS category_fts",
+        "DROP TABLE IF EXISTS expense_fts",
+    ] + SEARCH_DDL + SEARCH_FILL),
+]
+
+def install_triggers(conn):
+    installed = {sql for (sql,) in conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE type = 'trigger'")}
+    if installed == set(TRIGGERS):
+        return
+    drop_triggers(conn)
+    for statement in TRIGGERS:
+        conn.exec_driver_sql(statement)
+
+def drop_triggers(conn):
+    for (name,) in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'trigger'").all():
+        conn.exec_driver_sql(f'DROP TRIGGER "{name}"')
+
+def migrate_db():
+    with db.engine.begin() as conn:
+        # IMMEDIATE takes the write lock up front, so concurrently starting workers
+        # apply each migration once and read user_version only after the winner commits.
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        if not inspect(conn).has_table("user"):
+            db.metadata.create_all(conn)
+            conn.exec_driver_sql(f"PRAGMA user_version = {len(MIGRATIONS)}")
+        else:
+            version = conn.exec_driver_sql("PRAGMA user_version").scalar()
+            if version < len(MIGRATIONS):
+                drop_triggers(conn)
+            for number, (description, steps) in enumerate(MIGRATIONS[version:], start=version + 1):
+                for step in steps:
+                    if callable(step):
+                        step(conn)
+                    else:
+                        conn.exec_driver_sql(step)
+                conn.exec_driver_sql(f"PRAGMA user_version = {number}")
+                app.logger.info("Applied migration %d: %s", number, description)
+            db.metadata.create_all(conn)
+        install_triggers(conn)
 
 with app.app_context():
-    db.create_all()
+    migrate_db()
+    write_queue = GroupCommitQueue(db.engine, GROUP_COMMIT_MAX_BATCH, GROUP_COMMIT_MAX_WAIT_MS / 1000) if GROUP_COMMIT else None
+
+def commit_write(statement):
+    # Commits one INSERT/UPDATE from a request and returns its rowcount. With GROUP_COMMIT on,
+    # the writer thread commits it in one transaction with other requests' writes; either way
+    # it is durable when this returns.
+    if write_queue is not None:
+        return write_queue.execute(statement, timeout=GROUP_COMMIT_TIMEOUT)
+    rowcount = db.session.execute(statement).rowcount
+    db.session.commit()
+    return rowcount
+
+# Column values of recently seen users, so an authenticated request doesn't have to select
+# its User row. Per worker process: password changes made here evict the entry, and the TTL
+# bounds how long another worker can keep serving a stale copy.
+user_cache = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
 
 @login_manager.user_loader
 def load_user(user_id):
-    # LegacyAPIWarning workaround: Use db.session.get for SQLAlchemy 2.0+
-    return db.session.get(User, int(user_id))
+    user_id = int(user_id)
+    columns = user_cache.get(user_id)
+    if columns is None:
+        # LegacyAPIWarning workaround: Use db.session.get for SQLAlchemy 2.0+
+        user = db.session.get(User, user_id)
+        if user is not None:
+            user_cache.set(user_id, {c.key: getattr(user, c.key) for c in User.__table__.columns})
+        return user
+    # Attach the cached copy to this request's session without a SELECT, so routes can
+    # still modify and commit it.
+    user = User(**columns)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+@app.template_filter("mdy")
+def format_mdy(value):
+    return value.strftime("%m-%d-%Y") if value else ""
+
+def date_range_args(args=None):
+    # ?month=YYYY-MM, or ?from=YYYY-MM-DD&to=YYYY-MM-DD (either end optional, both inclusive).
+    args = request.args if args is None else args
+    try:
+        if args.get("month"):
+            start = datetime.strptime(args["month"], "%Y-%m").date()
+            end = (start + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+            return start, end
+        start, end = (args.get(k) for k in ("from", "to"))
+        return (datetime.strptime(start, "%Y-%m-%d").date() if start else None,
+                datetime.strptime(end, "%Y-%m-%d").date() if end else None)
+    except (TypeError, ValueError):
+        # TypeError: a JSON body (bulk_selection_args) can carry numbers or lists instead of strings.
+        abort(400)
+
+def in_period(model, start, end):
+    conditions = []
+    if start:
+        conditions.append(model.date >= start)
+    if end:
+        conditions.append(model.date <= end)
+    return conditions
+
+def add_default_categories(user_id):
+    db.session.execute(insert(Category), [{"user_id": user_id, "name": name} for name in CATEGORIES])
+
+def category_names(user_id):
+    return db.session.scalars(select(Category.name).where(Category.user_id == user_id).order_by(Category.id)).all()
+
+def category_id_for(user_id, name):
+    # The id of one of the user's categories by name (uq_category_user_name); 400 if unknown.
+    found = db.session.scalar(select(Category.id).where(Category.user_id == user_id, Category.name == name))
+    if found is None:
+        abort(400)
+    return found
+
+def dashboard_totals_query(user_id, start=None, end=None):
+    # One round trip: every one of the user's categories LEFT JOINed to its expenses and
+    # grouped (so new categories show up with a zero), plus the income sum under a NULL
+    # category id (category.id is never NULL, so that can only be the income row).
+    return union_all(
+        select(Category.id, Category.name, func.sum(Expense.amount_cents))
+        .select_from(Category)
+        .outerjoin(Expense, and_(Expense.user_id == user_id, Expense.category_id == Category.id,
+                                 *in_period(Expense, start, end)))
+        .where(Category.user_id == user_id)
+        .group_by(Category.id),
+        select(null(), null(), func.sum(Income.amount_cents))
+        .where(Income.user_id == user_id, *in_period(Income, start, end)),
+    )
+
+def running_totals_query(user_id):
+    # Same shape as dashboard_totals_query, read from the trigger-maintained totals.
+    return union_all(
+        select(Category.id, Category.name, CategoryTotal.total_cents)
+        .select_from(Category)
+        .outerjoin(CategoryTotal, CategoryTotal.category_id == Category.id)
+        .where(Category.user_id == user_id),
+        select(null(), null(), UserTotals.income_cents).where(UserTotals.user_id == user_id),
+    )
+
+def monthly_totals_query(user_id, first_month, last_month):
+    # Same shape again, for a run of whole months ("YYYY-MM", inclusive): one summary row per
+    # category and month instead of the period's expenses and incomes.
+    return union_all(
+        select(Category.id, Category.name, func.sum(MonthlyCategoryTotal.total_cents))
+        .select_from(Category)
+        .outerjoin(MonthlyCategoryTotal, and_(MonthlyCategoryTotal.category_id == Category.id,
+                                              MonthlyCategoryTotal.month.between(first_month, last_month)))
+        .where(Category.user_id == user_id)
+        .group_by(Category.id),
+        select(null(), null(), func.sum(MonthlyIncomeTotal.total_cents))
+        .where(MonthlyIncomeTotal.user_id == user_id, MonthlyIncomeTotal.month.between(first_month, last_month)),
+    )
+
+def whole_months(start, end):
+    # True if start..end is the first through the last day of one or more months.
+    return bool(start and end) and start <= end and start.day == 1 and (end + timedelta(days=1)).day == 1
+
+def dashboard_totals(user_id, start=None, end=None):
+    # All in integer cents; categories in the order they were created.
+    if not start and not end:
+        query = running_totals_query(user_id)
+    elif whole_months(start, end):
+        query = monthly_totals_query(user_id, start.strftime("%Y-%m"), end.strftime("%Y-%m"))
+    else:
+        query = dashboard_totals_query(user_id, start, end)
+    total_income = 0
+    totals_by_category = {}
+    for category_id, name, total in sorted(db.session.execute(query), key=lambda row: row[0] or 0):
+        if category_id is None:
+            total_income = total or 0
+        else:
+            totals_by_category[name] = total or 0
+    return total_income, sum(totals_by_category.values()), totals_by_category
+
+def dashboard_summary(user_id, start=None, end=None):
+    total_income, total_spent, totals_by_category = dashboard_totals(user_id, start, end)
+    return {
+        "total_income": dollars(total_income),
+        "total_spent": dollars(total_spent),
+        "remaining": dollars(total_income - total_spent),
+        "totals_by_category": {cat: dollars(cents) for cat, cents in totals_by_category.items()},
+        "chart_labels": list(totals_by_category.keys()),
+        "chart_data": [dollars(cents) for cents in totals_by_category.values()],
+    }
+
+def keyset_query(model, user_id, before=None, start=None, end=None, limit=PAGE_SIZE):
+    # WHERE id < :before ORDER BY id DESC LIMIT n -- cost doesn't depend on how deep the page is.
+    query = model.query.filter_by(user_id=user_id).filter(*in_period(model, start, end))
+    if before is not None:
+        query = query.filter(model.id < before)
+    return query.order_by(model.id.desc()).limit(limit + 1)
+
+def keyset_page(model, user_id, before=None, start=None, end=None, limit=PAGE_SIZE):
+    rows = keyset_query(model, user_id, before, start, end, limit).all()
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+def expense_to_dict(e):
+    return {"id": e.id, "date": e.date.isoformat() if e.date else None, "category": e.category.name, "amount": e.amount, "description": e.description or ""}
+
+def income_to_dict(i):
+    return {"id": i.id, "date": i.date.isoformat() if i.date else None, "amount": i.amount}
+
+# Rendered dashboards per user and period, keyed by the user's write version (user_totals,
+# bumped by the triggers on every expense/income/category write). Every server process, CLI
+# command and scheduler run shares it, so a write anywhere retires the older pages; the
+# invalidate(user_id) calls after local writes only free their memory sooner. The key also
+# carries a fingerprint of the code, templates and static files, so pages rendered by an
+# earlier deploy are not served from a shared cache after it.
+dashboard_cache = page_cache_from_url(DASHBOARD_CACHE, DASHBOARD_CACHE_BYTES)
+PAGE_FINGERPRINT = source_fingerprint([os.path.join(app.root_path, app.template_folder), app.static_folder] +
+                                      [os.path.join(app.root_path, name) for name in ("budget_web.py", "money.py", "assets.py")])
 
 @app.route("/", methods=["GET"])
 @login_required
 def home():
-    expenses = Expense.query.filter_by(user_id=current_user.id).order_by(Expense.id.desc()).all()
-    incomes = Income.query.filter_by(user_id=current_user.id).order_by(Income.id.desc()).all()
-    total_income = sum(i.amount for i in incomes)
-    total_spent = sum(e.amount for e in expenses)
-    remaining = total_income - total_spent
+    start, end = date_range_args()
+    period_args = {k: v for k, v in request.args.items() if k in ("month", "from", "to") and v}
+    # Read before the rows, so a page stored under a version never predates it.
+    state = db.session.get(UserTotals, current_user.id)
+    key = f"{PAGE_FINGERPRINT}:{state.version if state else 0}:{sorted(period_args.items())}"
+    # Pages are cached gzipped, so a hit is sent as stored instead of compressed again.
+    page = dashboard_cache.get(current_user.id, key)
+    html = None
+    if page is None:
+        expenses, next_expense_cursor = keyset_page(Expense, current_user.id, start=start, end=end)
+        incomes, next_income_cursor = keyset_page(Income, current_user.id, start=start, end=end)
+        html = render_template("dashboard.html", expenses=expenses, incomes=incomes,
+                               next_expense_cursor=next_expense_cursor, next_income_cursor=next_income_cursor,
+                               start=start, end=end, period_args=period_args,
+                               categories=category_names(current_user.id),
+                               **dashboard_summary(current_user.id, start, end)).encode()
+        page = gzip.compress(html, compresslevel=COMPRESS_LEVEL, mtime=0)
+        dashboard_cache.set(current_user.id, key, page)
+    if accepts("gzip"):
+        resp = Response(page, mimetype="text/html", headers={"Content-Encoding": "gzip"})
+    else:
+        resp = Response(html if html is not None else gzip.decompress(page), mimetype="text/html")
+    resp.vary.add("Accept-Encoding")
+    return resp
 
-    totals_by_category = {}
-    for cat in CATEGORIES:
-        totals_by_category[cat] = sum(e.amount for e in expenses if e.category == cat)
-
-    chart_labels = list(totals_by_category.keys())
-    chart_data = list(totals_by_category.values())
-
-    html = """<!DOCTYPE html>
-    <html>
-    <head>
-        <title>Dashboard</title>
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;700&display=swap" rel="stylesheet">
-        <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-        <style>
-            body {
-                background: #232529;
-                color: #e2e4ea;
-                font-family: 'Inter', Arial, sans-serif;
-                margin: 0;
-                min-height: 100vh;
-                overflow-x: hidden;
-            }
-            .navbar {
-                width: 100vw;
-                background: #22232a;
-                display: flex;
-                align-items: center;
-                padding: 0 1.5rem 0 0;
-                height: 64px;
-                box-shadow: 0 1px 8px rgba(0,0,0,.08);
-                position: fixed;
-                top: 0; left: 0; z-index: 100;
-                transition: top 0.4s;
-            }
-            .menu-btn {
-                margin-left: 2.2rem;
-                margin-top: .3rem;
-                background: #26282c;
-                border-radius: 18px;
-                width: 68px;
-                height: 68px;
-                border: none;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                cursor: pointer;
-                z-index: 102;
-                box-shadow: 0 2px 12px rgba(0,0,0,0.10);
-                font-size: 2.5rem;
-                transition: box-shadow .2s;
-            }
-            .menu-btn:focus { outline: 2px solid #444ce7; }
-            .menu-icon {
-                color: #fff;
-                font-size: 2.2rem;
-                pointer-events: none;
-                margin-top: 4px;
-            }
-            .nav-title {
-                font-size: 3.1rem;
-                font-weight: 700;
-                margin-left: 1.3rem;
-                letter-spacing: 0.5px;
-                color: #e2e4ea;
-                flex: 1;
-            }
-            .sidebar {
-                position: fixed;
-                top: 0;
-                left: -255px;
-                width: 240px;
-                height: 100vh;
-                background: #22232a;
-                box-shadow: 4px 0 32px rgba(0,0,0,.12);
-                z-index: 120;
-                transition: left .33s;
-                padding-top: 80px;
-                display: flex;
-                flex-direction: column;
-            }
-            .sidebar.open { left: 0; }
-            .sidebar .slogo {
-                font-size: 1.3rem;
-                font-weight: bold;
-                color: #ffe37a;
-                margin-bottom: 2.2rem;
-                display: flex;
-                align-items: center;
-                gap: .5rem;
-            }
-            .sidebar .username {
-                font-size: 1.1rem;
-                margin-bottom: .9rem;
-                color: #fff6b2;
-                font-weight: 700;
-            }
-            .sidebar a, .sidebar .slink {
-                display: block;
-                color: #e2e4ea;
-                padding: 15px 26px 15px 26px;
-                text-decoration: none;
-                font-size: 1.19rem;
-                border-radius: 8px;
-                margin: 3px 0;
-                transition: background .17s;
-            }
-            .sidebar a.active, .sidebar a:hover { background: #565af7; color: #fff; }
-            .sidebar .logout { color: #ff8282 !important; }
-            .sidebar .logout:hover { background: #2d1212; }
-            .sidebar .resetpw { color: #ffe37a !important; }
-            .sidebar .resetpw:hover { background: #3d3d20; color: #fff; }
-            .main-content {
-                margin-left: 0;
-                margin-top: 72px;
-                padding: 16px 32px;
-                transition: margin-left .34s;
-            }
-            @media (min-width: 700px) {
-                .main-content { padding-left: 70px; padding-right: 70px; }
-            }
-            .card {
-                background: #28292c;
-                border-radius: 16px;
-                box-shadow: 0 4px 32px rgba(0,0,0,.16);
-                padding: 2.2rem 2.2rem 1.3rem 2.2rem;
-                margin-bottom: 24px;
-            }
-            .card.slim { padding: 1.1rem 1.3rem; }
-            .row { display: flex; flex-wrap: wrap; gap: 28px; }
-            .col2 { flex: 1 1 350px; }
-            .col1 { flex: 1 1 600px; }
-            .dashboard-section { margin-bottom: 1.9rem; }
-            h2 { font-size: 2.1rem; margin-bottom: 1.4rem; }
-            .input-dark {
-                background: #18191b;
-                color: #fff;
-                border: 1.5px solid #444ce7;
-                border-radius: 10px;
-                padding: 0.65rem 1.1rem;
-                font-size: 1.06rem;
-                outline: none;
-                transition: border .22s;
-                margin-right: 1.2rem;
-                margin-bottom: .7rem;
-                width: 240px;
-            }
-            .input-dark:focus { border: 1.5px solid #44d964; }
-            .input-dark[type="number"]::-webkit-outer-spin-button,
-            .input-dark[type="number"]::-webkit-inner-spin-button {
-                -webkit-appearance: none;
-                margin: 0;
-            }
-            .input-dark[type="number"] { -moz-appearance: textfield; }
-            .btn-main {
-                background: #444ce7;
-                color: #fff;
-                border: none;
-                padding: 0.7rem 1.4rem;
-                border-radius: 8px;
-                font-size: 1.14rem;
-                cursor: pointer;
-                margin-left: 0.8rem;
-                margin-top: 2px;
-                transition: background .2s;
-            }
-            .btn-main:hover { background: #393fb3; }
-            .btn-red {
-                background: #fb6868;
-                color: #fff;
-                border: none;
-                padding: 0.49rem 1.15rem;
-                border-radius: 7px;
-                font-size: 1.05rem;
-                cursor: pointer;
-                margin-left: .75rem;
-                transition: background .2s;
-            }
-            .btn-red:hover { background: #d64242; }
-            .category-select { width: 170px; }
-            table { width: 100%; border-collapse: collapse; font-size: 1.02rem; }
-            th, td { padding: 8px 12px; text-align: left; }
-            th { background: #232529; color: #ffe37a; }
-            tr:nth-child(even) { background: #26282c; }
-            tr:nth-child(odd) { background: #232529; }
-            td, th { border-bottom: 1px solid #202126; }
-            .chart-box { background: #232529; border-radius: 14px; padding: 1.1rem 1.5rem; margin-top: 15px;}
-            .spending { color: #44d964; font-size: 2.35rem; margin: 0.2rem 0; }
-            .spending-total { color: #ffd95a; font-size: 2.1rem; font-weight: 700;}
-            .pie-box, .bar-box { min-width: 240px; }
-            @media (max-width: 1100px) {
-                .row { flex-direction: column; }
-                .main-content { padding: 16px 5vw; }
-                .col2, .col1 { flex: 1 1 100%; }
-            }
-            @media (max-width: 700px) {
-                .navbar { font-size: 1.7rem; }
-                .menu-btn { width: 48px; height: 48px; font-size: 1.5rem; }
-                .nav-title { font-size: 2.1rem; }
-                .sidebar { width: 85vw; min-width: 175px; }
-                .main-content { margin-top: 58px; padding: 10px 2vw; }
-                .card, .chart-box { padding: 1rem 7vw 1.1rem 7vw; }
-            }
-        </style>
-    </head>
-    <body>
-        <div class="navbar" id="navbar">
-            <button class="menu-btn" id="menuBtn" onclick="toggleSidebar()" aria-label="Menu">
-                <span class="menu-icon">&#9776;</span>
-            </button>
-            <span class="nav-title">Dashboard</span>
-        </div>
-        <nav class="sidebar" id="sidebar" aria-label="Sidebar">
-            <div class="slogo">💰 Tracker</div>
-            <div class="username">Logged in as:<br>{{current_user.username}}</div>
-            <a href="/" class="active slink">Dashboard</a>
-            <a href="/reset_password" class="slink resetpw">Reset Password</a>
-            <a href="/logout" class="logout slink">Logout</a>
-        </nav>
-        <div class="main-content" id="main-content">
-            <div class="dashboard-section row">
-                <div class="card col2">
-                    <h2>Add/Update Income</h2>
-                    <form method="POST" action="/add_income" style="display:flex;flex-wrap:wrap;align-items:center;">
-                        <input name="amount" class="input-dark" type="number" step="0.01" min="0" placeholder="Income Amount" required autocomplete="off">
-                        <button type="submit" class="btn-main">Add/Update</button>
-                        <button type="button" class="btn-red" onclick="confirmResetIncome()">Reset Income</button>
-                    </form>
-                    <div style="margin-top:0.8rem;">Current Total Income: <span style="color:#44d964;font-weight:700;">${{ '{:,.2f}'.format(total_income) }}</span></div>
-                </div>
-                <div class="card col2 slim">
-                    <h2 style="margin-bottom:.8rem;">Remaining Balance</h2>
-                    <div class="spending">${{ '{:,.2f}'.format(remaining) }}</div>
-                    <div style="font-size:1rem;color:#aaa;">Income minus all expenses</div>
-                </div>
-            </div>
-            <div class="dashboard-section card">
-                <h2>Add Expense</h2>
-                <form method="POST" action="/add" style="display:flex;flex-wrap:wrap;align-items:center;">
-                    <select name="category" class="input-dark category-select" required>
-                        <option value="">Select Category</option>
-                        {% for cat in categories %}
-                        <option value="{{cat}}">{{cat}}</option>
-                        {% endfor %}
-                    </select>
-                    <input name="amount" class="input-dark" type="number" step="0.01" min="0" placeholder="Amount" required autocomplete="off">
-                    <input name="description" class="input-dark" type="text" maxlength="100" placeholder="Description (memo)">
-                    <button type="submit" class="btn-main">Add</button>
-                </form>
-            </div>
-            <div class="dashboard-section row">
-                <div class="card col1">
-                    <h2>All Expenses</h2>
-                    <table>
-                        <tr>
-                            <th>Date</th>
-                            <th>Category</th>
-                            <th>Amount ($)</th>
-                            <th>Description</th>
-                            <th>Actions</th>
-                        </tr>
-                        {% for e in expenses %}
-                        <tr>
-                            <td>{{e.date}}</td>
-                            <td>{{e.category}}</td>
-                            <td>${{ '{:,.2f}'.format(e.amount) }}</td>
-                            <td>{{e.description or ""}}</td>
-                            <td>
-                                <a href="/edit/{{e.id}}" style="color:#44d964;">Edit</a>
-                                <a href="/delete/{{e.id}}" style="color:#ff6464;margin-left:8px;">Delete</a>
-                            </td>
-                        </tr>
-                        {% endfor %}
-                    </table>
-                </div>
-                <div class="col2">
-                    <div class="card slim" style="margin-bottom:16px;">
-                        <h2>Totals by Category</h2>
-                        <table>
-                            <tr><th>Category</th><th>Total ($)</th></tr>
-                            {% for cat, total in totals_by_category.items() %}
-                            <tr>
-                                <td>{{cat}}</td>
-                                <td>${{ '{:,.2f}'.format(total) }}</td>
-                            </tr>
-                            {% endfor %}
-                        </table>
-                    </div>
-                    <div class="card slim" style="margin-bottom:16px;">
-                        <h2>Overall Total Spending</h2>
-                        <div class="spending-total">${{ '{:,.2f}'.format(total_spent) }}</div>
-                    </div>
-                    <div class="row">
-                        <div class="chart-box pie-box col2">
-                            <h3>Spending Pie Chart</h3>
-                            <canvas id="pieChart" height="230"></canvas>
-                        </div>
-                        <div class="chart-box bar-box col2">
-                            <h3>Bar Chart by Category</h3>
-                            <canvas id="barChart" height="230"></canvas>
-                        </div>
-                    </div>
-                    <div class="card slim" style="margin-top:16px;">
-                        <h2>Income History</h2>
-                        <table>
-                            <tr><th>Date</th><th>Amount</th></tr>
-                            {% for i in incomes %}
-                            <tr>
-                                <td>{{i.date}}</td>
-                                <td>${{ '{:,.2f}'.format(i.amount) }}</td>
-                            </tr>
-                            {% endfor %}
-                        </table>
-                    </div>
-                </div>
-            </div>
-        </div>
-        <script>
-            let sidebarOpen = false;
-            function toggleSidebar() {
-                sidebarOpen = !sidebarOpen;
-                document.getElementById('sidebar').classList.toggle('open', sidebarOpen);
-            }
-            // Hide navbar when scrolling down, show when up/top
-            let lastScroll = 0;
-            window.addEventListener('scroll', function() {
-                let navbar = document.getElementById('navbar');
-                let currScroll = window.scrollY;
-                if (currScroll > lastScroll && currScroll > 60) { navbar.style.top = "-80px"; }
-                else { navbar.style.top = "0"; }
-                lastScroll = currScroll;
-            });
-            // Chart.js
-            const chartLabels = {{ chart_labels|tojson }};
-            const chartData = {{ chart_data|tojson }};
-            new Chart(document.getElementById('barChart'), {
-                type: 'bar',
-                data: {
-                    labels: chartLabels,
-                    datasets: [{
-                        label: "Total",
-                        data: chartData,
-                        backgroundColor: "#444ce7",
-                        borderRadius: 7,
-                        borderSkipped: false,
-                        barThickness: 38,
-                        maxBarThickness: 52
-                    }]
-                },
-                options: {
-                    responsive: true,
-                    plugins: {legend:{labels:{color:'#e2e4ea'}}},
-                    scales: {x:{ticks:{color:'#e2e4ea'}},y:{ticks:{color:'#e2e4ea'}}}
-                }
-            });
-            new Chart(document.getElementById('pieChart'), {
-                type: 'pie',
-                data: {
-                    labels: chartLabels,
-                    datasets: [{
-                        data: chartData,
-                        backgroundColor: [
-                            '#444ce7','#fb6868','#44d964','#ffd95a','#565af7','#ffe37a'
-                        ]
-                    }]
-                },
-                options: {responsive:true, plugins:{legend:{labels:{color:'#e2e4ea'}}}}
-            });
-            // Remove up/down on number inputs (income/expense)
-            document.querySelectorAll('input[type=number]').forEach(input => {
-                input.addEventListener('wheel', function(e){ e.preventDefault(); });
-                input.style.appearance = 'textfield';
-            });
-            // Reset income confirmation
-            function confirmResetIncome() {
-                if (confirm("Reset income to $0 and delete all income history?")) {
-                    window.location.href = "/reset_income";
-                }
-            }
-        </script>
-    </body>
-    </html>
-    """
-    return render_template_string(html, expenses=expenses, incomes=incomes, total_income=total_income,
-                                 total_spent=total_spent, remaining=remaining,
-                                 totals_by_category=totals_by_category, categories=CATEGORIES,
-                                 chart_labels=chart_labels, chart_data=chart_data, current_user=current_user)
+def page_response(model, rows_template, name, to_dict):
+    start, end = date_range_args()
+    rows, next_cursor = keyset_page(model, current_user.id, request.args.get("before", type=int), start, end)
+    return rows_response(rows, next_cursor, rows_template, name, to_dict)
+
+def rows_response(rows, next_cursor, rows_template, name, to_dict):
+    if request.args.get("format") == "json":
+        return jsonify(items=[to_dict(r) for r in rows], next_cursor=next_cursor)
+    resp = app.make_response(render_template(rows_template, **{name: rows}))
+    resp.headers["X-Next-Cursor"] = "" if next_cursor is None else str(next_cursor)
+    return resp
+
+def search_words(text):
+    # The words of the user's text as quoted FTS5 strings, so operators and punctuation in it
+    # stay literal. The porter tokenizer matches other forms of each word ("grocery" finds
+    # "groceries").
+    return [f'"{word}"' for word in re.findall(r"\w+", text)[:SEARCH_MAX_WORDS]]
+
+def search_expenses(user_id, text, page=1, limit=PAGE_SIZE):
+    # Expenses matching every word in their description or category name, best bm25() score
+    # first (description hits weigh twice a category hit), then newest; `page` is 1-based.
+    # The MATCH is bounded to the user's rowid range, so FTS5 seeks within each word's index
+    # entries. bm25() also counts how many rows of any user contain each word, which reads
+    # that word's whole entry once per query: a common word costs more than a rare one.
+    words = search_words(text)
+    if not words:
+        return [], None
+    lo = user_id * 4294967296
+    ids = db.session.scalars(db.text(
+        "SELECT rowid - :lo FROM expense_fts WHERE expense_fts MATCH :words"
+        " AND rowid BETWEEN :lo AND :lo + 4294967295"
+        " ORDER BY bm25(expense_fts, 2.0, 1.0), rowid DESC LIMIT :limit OFFSET :offset"
+    ), {"words": " ".join(words), "lo": lo, "limit": limit + 1, "offset": (page - 1) * limit}).all()
+    found = {e.id: e for e in Expense.query.filter(Expense.id.in_(ids[:limit]), Expense.user_id == user_id)}
+    return [found[i] for i in ids[:limit] if i in found], page + 1 if len(ids) > limit else None
+
+@app.route("/search")
+@login_required
+def search():
+    # ?q=words[&page=n]: ranked matches as expense table rows (or ?format=json), with the next
+    # page number in X-Next-Cursor like the other row endpoints.
+    page = request.args.get("page", 1, type=int)
+    if not 1 <= page <= SEARCH_MAX_PAGE:
+        abort(400)
+    rows, next_page = search_expenses(current_user.id, request.args.get("q", ""), page)
+    return rows_response(rows, next_page, "_expense_rows.html", "expenses", expense_to_dict)
+
+@app.route("/expenses")
+@login_required
+def list_expenses():
+    return page_response(Expense, "_expense_rows.html", "expenses", expense_to_dict)
+
+@app.route("/incomes")
+@login_required
+def list_incomes():
+    return page_response(Income, "_income_rows.html", "incomes", income_to_dict)
+
+def conditional_on_writes(view):
+    # Answers If-None-Match / If-Modified-Since from the user's write version (one primary-key
+    # read of user_totals) before the view runs, so unchanged polls never touch expense/income.
+    # The tag also carries today's date, since default periods (e.g. /api/trends) end today.
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        state = db.session.get(UserTotals, current_user.id)
+        etag = f"{current_user.id}-{state.version if state else 0}-{date.today():%Y%m%d}"
+        last_modified = state.updated_at.replace(tzinfo=timezone.utc) if state and state.updated_at else None
+        if request.if_none_match:
+            # Weak comparison: gzipped responses carry the tag as W/"..." (see assets.py).
+            not_modified = request.if_none_match.contains_weak(etag)
+        else:
+            not_modified = bool(last_modified and request.if_modified_since
+                                and request.if_modified_since >= last_modified)
+        resp = app.response_class(status=304) if not_modified else app.make_response(view(*args, **kwargs))
+        resp.set_etag(etag)
+        resp.last_modified = last_modified
+        resp.cache_control.private = True
+        resp.cache_control.no_cache = True
+        resp.vary.add("Cookie")
+        return resp
+    return wrapper
+
+@app.route("/api/summary")
+@login_required
+@conditional_on_writes
+def api_summary():
+    start, end = date_range_args()
+    return jsonify(dashboard_summary(current_user.id, start, end))
+
+@app.route("/api/expenses")
+@login_required
+@conditional_on_writes
+def api_expenses():
+    start, end = date_range_args()
+    rows, next_cursor = keyset_page(Expense, current_user.id, request.args.get("before", type=int), start, end)
+    return jsonify(items=[expense_to_dict(e) for e in rows], next_cursor=next_cursor)
+
+def add_months(day, months):
+    year, month = divmod(day.year * 12 + day.month - 1 + months, 12)
+    return day.replace(year=year, month=month + 1, day=1)
+
+@app.route("/api/projection")
+@login_required
+def api_projection():
+    # What-if: the balance over the next ?months= months if spending and income continue at
+    # their average over the last ?lookback= full months, with ?adjust=Category:percent
+    # (repeatable, e.g. adjust=Fun:-50) applied to that category's monthly spend.
+    months = request.args.get("months", 12, type=int)
+    lookback = request.args.get("lookback", 3, type=int)
+    if not 1 <= months <= 120 or not 1 <= lookback <= 24:
+        abort(400)
+    adjustments = {}
+    for item in request.args.getlist("adjust"):
+        category, _, percent = item.rpartition(":")
+        if not category or not percent.lstrip("-").isdigit():
+            abort(400)
+        adjustments[category] = int(percent)
+    this_month = date.today().replace(day=1)
+    income, _, spent = dashboard_totals(current_user.id, add_months(this_month, -lookback), this_month - timedelta(days=1))
+    if not adjustments.keys() <= spent.keys():
+        abort(400)
+    monthly_income = divide_cents(income, lookback)
+    monthly_spend = scale_cents([divide_cents(cents, lookback) for cents in spent.values()],
+                                [adjustments.get(cat, 0) for cat in spent])
+    total_income, total_spent, _ = dashboard_totals(current_user.id)
+    balances = project_balances(total_income - total_spent, monthly_income, monthly_spend, months)
+    return jsonify(
+        months=[add_months(this_month, i).strftime("%Y-%m") for i in range(months)],
+        monthly_income=dollars(monthly_income),
+        monthly_spending={cat: dollars(cents) for cat, cents in zip(spent, monthly_spend)},
+        adjustments=adjustments,
+        balances=[dollars(cents) for cents in balances],
+    )
+
+TREND_BUCKETS = {
+    # bucket: (default span in buckets, default rolling-average window)
+    "day": (90, 7),
+    "week": (52, 4),
+    "month": (24, 3),
+}
+MAX_TREND_BUCKETS = 2000
+
+def bucket_start(bucket, day):
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+def bucket_labels(bucket, start, end):
+    labels, day = [], bucket_start(bucket, start)
+    while day <= end and len(labels) <= MAX_TREND_BUCKETS:
+        labels.append(day.strftime("%Y-%m") if bucket == "month" else day.isoformat())
+        day = add_months(day, 1) if bucket == "month" else day + timedelta(days=7 if bucket == "week" else 1)
+    return labels
+
+def trend_query(user_id, bucket, start, end):
+    # Spend per (bucket, category) from the trigger-maintained buckets: months straight from
+    # monthly_category_total, days and weeks (Monday-based) from daily_category_total, so the
+    # row count depends on the span and category count, never on the number of expenses.
+    if bucket == "month":
+        table, column = MonthlyCategoryTotal, MonthlyCategoryTotal.month
+        key, bounds = column, (start.strftime("%Y-%m"), end.strftime("%Y-%m"))
+    else:
+        table, column = DailyCategoryTotal, DailyCategoryTotal.day
+        key = func.date(column) if bucket == "day" else func.date(column, "weekday 0", "-6 days")
+        bounds = (start, end)
+    return (select(key, Category.name, func.sum(table.total_cents))
+            .join(Category, Category.id == table.category_id)
+            .where(Category.user_id == user_id, column.between(*bounds))
+            .group_by(key, Category.id))
+
+@app.route("/api/trends")
+@login_required
+@conditional_on_writes
+def api_trends():
+    # ?bucket=day|week|month (default week) over ?month= or ?from=&to= (default: the last
+    # TREND_BUCKETS[bucket][0] buckets up to today), optionally ?category=Name. Series are
+    # positional against `labels` to keep the payload small; `rolling_average` is the trailing
+    # ?window= bucket mean of `total`.
+    bucket = request.args.get("bucket", "week")
+    if bucket not in TREND_BUCKETS:
+        abort(400)
+    span, window = TREND_BUCKETS[bucket]
+    window = request.args.get("window", window, type=int)
+    start, end = date_range_args()
+    end = end or date.today()
+    if start is None:
+        start = (add_months(end, 1 - span) if bucket == "month"
+                 else bucket_start(bucket, end) - timedelta(days=(span - 1) * (7 if bucket == "week" else 1)))
+    labels = bucket_labels(bucket, start, end)
+    if start > end or not 1 <= window <= 366 or len(labels) > MAX_TREND_BUCKETS:
+        abort(400)
+    names = category_names(current_user.id)
+    category = request.args.get("category")
+    if category is not None:
+        if category not in names:
+            abort(400)
+        names = [category]
+    index = {label: i for i, label in enumerate(labels)}
+    series = {name: [0] * len(labels) for name in names}
+    for label, name, cents in db.session.execute(trend_query(current_user.id, bucket, start, end)):
+        if name in series and label in index:
+            series[name][index[label]] = cents
+    total = [sum(column) for column in zip(*series.values())] if series else [0] * len(labels)
+    rolling, running = [], 0
+    for i, cents in enumerate(total):
+        running += cents - (total[i - window] if i >= window else 0)
+        rolling.append(dollars(divide_cents(running, min(i + 1, window))))
+    return jsonify(
+        bucket=bucket,
+        labels=labels,
+        series={name: [dollars(cents) for cents in values] for name, values in series.items()},
+        total=[dollars(cents) for cents in total],
+        rolling_average=rolling,
+        window=window,
+    )
+
+def month_arg(value):
+    try:
+        return datetime.strptime(value, "%Y-%m").strftime("%Y-%m")
+    except (TypeError, ValueError):
+        abort(400)
+
+def budget_status_query(month, user_id=None):
+    # Each budgeted category's limit in `month` (the latest budget row at or before it; SQLite
+    # returns the bare limit_cents column from the row that has MAX(month)) next to the month's
+    # spend from monthly_category_total. No per-user loop: without user_id it covers everyone.
+    latest = (select(Budget.category_id, Budget.limit_cents, func.max(Budget.month))
+              .where(Budget.month <= month)
+              .group_by(Budget.category_id))
+    if user_id is not None:
+        latest = latest.join(Category, Category.id == Budget.category_id).where(Category.user_id == user_id)
+    latest = latest.subquery()
+    return (select(Category.user_id, User.username, Category.name, latest.c.limit_cents,
+                   func.coalesce(MonthlyCategoryTotal.total_cents, 0))
+            .select_from(latest)
+            .join(Category, Category.id == latest.c.category_id)
+            .join(User, User.id == Category.user_id)
+            .outerjoin(MonthlyCategoryTotal, and_(MonthlyCategoryTotal.category_id == latest.c.category_id,
+                                                  MonthlyCategoryTotal.month == month))
+            .where(latest.c.limit_cents.is_not(None))
+            .order_by(Category.user_id, Category.id))
+
+def evaluate_budgets(month, user_id=None):
+    users = {}
+    for uid, username, category, limit_cents, spent_cents in db.session.execute(budget_status_query(month, user_id)):
+        user = users.setdefault(uid, {"user_id": uid, "username": username, "budgets": []})
+        user["budgets"].append({
+            "category": category,
+            "limit": dollars(limit_cents),
+            "spent": dollars(spent_cents),
+            "remaining": dollars(limit_cents - spent_cents),
+            "over_budget": spent_cents > limit_cents,
+        })
+    return list(users.values())
+
+@app.route("/api/budgets", methods=["GET", "POST"])
+@login_required
+def api_budgets():
+    # GET ?month=YYYY-MM (default: this month). POST {"category", "limit", "month"} sets the
+    # category's limit from that month on; an empty limit removes it.
+    if request.method == "POST":
+        data = request.get_json(silent=True) or request.form.to_dict()
+        month = month_arg(data.get("month") or date.today().strftime("%Y-%m"))
+        budget_category_id = category_id_for(current_user.id, data.get("category"))
+        limit = data.get("limit")
+        try:
+            limit_cents = None if limit in (None, "") else parse_cents(limit)
+        except ValueError:
+            abort(400)
+        if limit_cents is not None and limit_cents < 0:
+            abort(400)
+        db.session.merge(Budget(category_id=budget_category_id, month=month, limit_cents=limit_cents))
+        db.session.commit()
+    else:
+        month = month_arg(request.args.get("month") or date.today().strftime("%Y-%m"))
+    statuses = evaluate_budgets(month, current_user.id)
+    budgets = statuses[0]["budgets"] if statuses else []
+    return jsonify(month=month, budgets=budgets, over_budget=[b["category"] for b in budgets if b["over_budget"]])
+
+def import_expenses(user_id, rows, default_category=None, batch_size=IMPORT_BATCH_SIZE):
+    # rows are (line, fields, error) from importers; inserted in batches of batch_size, one
+    # transaction and one executemany per batch. Only the first IMPORT_MAX_ERRORS errors are kept.
+    names = dict(db.session.execute(select(Category.id, Category.name).where(Category.user_id == user_id)).all())
+    categories = {name.lower(): cid for cid, name in names.items()}
+    report = {"inserted": 0, "error_count": 0, "errors": []}
+    imported_cents = dict.fromkeys(names, 0)
+    started = time.perf_counter()
+    batch = []
+
+    def flush():
+        db.session.execute(insert(Expense), batch)
+        db.session.commit()
+        dashboard_cache.invalidate(user_id)
+        report["inserted"] += len(batch)
+        batch_totals = sum_by_key([row["category_id"] for row in batch], [row["amount_cents"] for row in batch], names)
+        for cid, cents in batch_totals.items():
+            imported_cents[cid] += cents
+        batch.clear()
+
+    for line, fields, error in rows:
+        if fields is not None:
+            name = fields.pop("category") or default_category
+            cid = categories.get((name or "").lower())
+            if cid is None:
+                error = f"unknown category {name!r}" if name else "missing category"
+        if error:
+            report["error_count"] += 1
+            if len(report["errors"]) < IMPORT_MAX_ERRORS:
+                report["errors"].append({"line": line, "error": error})
+            continue
+        batch.append({**fields, "category_id": cid, "user_id": user_id})
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    report["totals_by_category"] = {names[cid]: dollars(cents) for cid, cents in imported_cents.items()}
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    report["rows_per_sec"] = round(report["inserted"] / report["seconds"]) if report["seconds"] else report["inserted"]
+    return report
+
+def statement_rows(stream, fmt):
+    return iter_ofx(stream) if fmt in ("ofx", "qfx") else iter_csv(stream)
+
+@app.route("/import", methods=["POST"])
+@login_required
+def import_upload():
+    upload = request.files.get("file")
+    if upload is None:
+        abort(400)
+    fmt = request.form.get("format") or os.path.splitext(upload.filename or "")[1].lstrip(".").lower()
+    stream = io.TextIOWrapper(upload.stream, encoding="utf-8-sig", errors="replace", newline="")
+    report = import_expenses(current_user.id, statement_rows(stream, fmt), request.form.get("category"))
+    return jsonify(report)
+
+def export_rows(user_id, start=None, end=None, category=None):
+    # Plain column tuples (no ORM objects) streamed off the cursor EXPORT_CHUNK_ROWS at a time.
+    expenses = (select(Expense.id, Expense.date, Category.name, Expense.amount_cents, Expense.description)
+                .join(Category, Category.id == Expense.category_id)
+                .where(Expense.user_id == user_id, *in_period(Expense, start, end))
+                .order_by(Expense.id))
+    sources = [("expense", expenses.where(Category.name == category) if category else expenses)]
+    if not category:
+        sources.append(("income", select(Income.id, Income.date, null(), Income.amount_cents, null())
+                        .where(Income.user_id == user_id, *in_period(Income, start, end))
+                        .order_by(Income.id)))
+    for kind, query in sources:
+        result = db.session.execute(query.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+        for partition in result.partitions():
+            yield [(kind, row_id, day.isoformat() if day else None, cat, dollars(cents), desc)
+                   for row_id, day, cat, cents, desc in partition]
+
+def export_response(render_chunk, mimetype, filename):
+    start, end = date_range_args()
+    chunks = export_rows(current_user.id, start, end, request.args.get("category"))
+
+    def generate():
+        yield render_chunk(None)
+        for chunk in chunks:
+            yield render_chunk(chunk)
+
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+def csv_chunk(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if rows is None:
+        writer.writerow(EXPORT_FIELDS)
+    else:
+        writer.writerows(rows)
+    return buffer.getvalue()
+
+def jsonl_chunk(rows):
+    return "".join(json.dumps(dict(zip(EXPORT_FIELDS, row))) + "\n" for row in rows or ())
+
+@app.route("/export.csv")
+@login_required
+def export_csv():
+    return export_response(csv_chunk, "text/csv", "budget-export.csv")
+
+@app.route("/export.jsonl")
+@login_required
+def export_jsonl():
+    return export_response(jsonl_chunk, "application/x-ndjson", "budget-export.jsonl")
 
 @app.route("/add", methods=["POST"])
 @login_required
 def add_expense():
-    category = request.form["category"]
-    amount = float(request.form["amount"])
+    expense_category_id = category_id_for(current_user.id, request.form["category"])
+    amount_cents = parse_cents(request.form["amount"])
     description = request.form.get("description", "")
-    date = datetime.now().strftime("%m-%d-%Y")
-    new_expense = Expense(category=category, amount=amount, description=description, date=date, user_id=current_user.id)
-    db.session.add(new_expense)
-    db.session.commit()
+    date = datetime.now().date()
+    commit_write(insert(Expense).values(category_id=expense_category_id, amount_cents=amount_cents,
+                                        description=description, date=date, user_id=current_user.id))
+    dashboard_cache.invalidate(current_user.id)
     return redirect(url_for("home"))
 
 @app.route("/delete/<int:expense_id>")
@@ -459,6 +1201,7 @@ def delete_expense(expense_id):
         return "Unauthorized", 403
     db.session.delete(expense)
     db.session.commit()
+    dashboard_cache.invalidate(current_user.id)
     return redirect(url_for("home"))
 
 @app.route("/edit/<int:expense_id>", methods=["GET", "POST"])
@@ -468,106 +1211,330 @@ def edit_expense(expense_id):
     if expense.user_id != current_user.id:
         return "Unauthorized", 403
     if request.method == "POST":
-        expense.category = request.form["category"]
-        expense.amount = float(request.form["amount"])
-        expense.description = request.form.get("description", "")
-        expense.date = datetime.now().strftime("%m-%d-%Y")
-        db.session.commit()
+        commit_write(update(Expense).where(Expense.id == expense.id).values(
+            category_id=category_id_for(current_user.id, request.form["category"]),
+            amount_cents=parse_cents(request.form["amount"]),
+            description=request.form.get("description", ""),
+            date=datetime.now().date(),
+            # An edited row is the user's own, no longer its rule's occurrence on that date: left
+            # attached, its new date could collide with the rule's row for today (the unique
+            # index) or take the slot of one not yet materialized.
+            recurring_rule_id=None,
+        ))
+        dashboard_cache.invalidate(current_user.id)
         return redirect(url_for("home"))
-    html = """
-    <html><head>
-        <title>Edit Expense</title>
-        <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;700&display=swap" rel="stylesheet">
-        <style>
-            body { background: #232529; color: #e2e4ea; font-family: 'Inter', Arial, sans-serif; display:flex; justify-content:center; align-items:center; height:100vh; }
-            .card { background: #28292c; border-radius: 16px; padding: 2.2rem; min-width: 340px; }
-            label { color: #ffd95a; font-size: 1.1rem;}
-            .input-dark { background: #18191b; color: #fff; border: 1.5px solid #444ce7; border-radius: 10px; padding: 0.65rem 1.1rem; font-size: 1.06rem; margin-bottom: .7rem; width: 90%; }
-            .btn-main { background: #444ce7; color: #fff; border: none; padding: 0.7rem 1.4rem; border-radius: 8px; font-size: 1.14rem; cursor: pointer; margin-top: 10px;}
-        </style>
-    </head><body>
-    <form class="card" method="POST">
-        <h2>Edit Expense</h2>
-        <label>Category:</label><br>
-        <select name="category" class="input-dark" required>
-            {% for cat in categories %}
-            <option value="{{cat}}" {% if expense.category == cat %}selected{% endif %}>{{cat}}</option>
-            {% endfor %}
-        </select><br>
-        <label>Amount:</label><br>
-        <input name="amount" class="input-dark" type="number" step="0.01" min="0" value="{{expense.amount}}" required autocomplete="off"><br>
-        <label>Description:</label><br>
-        <input name="description" class="input-dark" type="text" maxlength="100" value="{{expense.description or ''}}"><br>
-        <button type="submit" class="btn-main">Save</button>
-        <a href="/" class="btn-main" style="background:#232529;color:#ffd95a;margin-left:12px;">Cancel</a>
-    </form>
-    </body></html>
-    """
-    return render_template_string(html, expense=expense, categories=CATEGORIES)
+    return render_template("edit_expense.html", expense=expense, categories=category_names(current_user.id))
 
 @app.route("/add_income", methods=["POST"])
 @login_required
 def add_income():
-    amount = float(request.form["amount"])
-    date = datetime.now().strftime("%m-%d-%Y")
-    new_income = Income(amount=amount, date=date, user_id=current_user.id)
-    db.session.add(new_income)
-    db.session.commit()
+    amount_cents = parse_cents(request.form["amount"])
+    date = datetime.now().date()
+    commit_write(insert(Income).values(amount_cents=amount_cents, date=date, user_id=current_user.id))
+    dashboard_cache.invalidate(current_user.id)
     return redirect(url_for("home"))
 
 @app.route("/reset_income")
 @login_required
 def reset_income():
-    incomes = Income.query.filter_by(user_id=current_user.id).all()
-    for i in incomes:
-        db.session.delete(i)
+    delete_incomes(current_user.id)
+    return redirect(url_for("home"))
+
+# Set-based bulk operations: each is a single UPDATE/DELETE in one transaction and returns
+# the number of rows it touched. Nothing is loaded into the session.
+def delete_incomes(user_id):
+    count = Income.query.filter_by(user_id=user_id).delete(synchronize_session=False)
     db.session.commit()
+    dashboard_cache.invalidate(user_id)
+    return count
+
+def expense_selection(user_id, ids=None, category=None, start=None, end=None):
+    query = Expense.query.filter(Expense.user_id == user_id, *in_period(Expense, start, end))
+    if ids is not None:
+        query = query.filter(Expense.id.in_(ids))
+    if category:
+        query = query.filter(Expense.category_id == category_id_for(user_id, category))
+    return query
+
+def delete_expenses(user_id, ids=None, category=None, start=None, end=None):
+    count = expense_selection(user_id, ids, category, start, end).delete(synchronize_session=False)
+    db.session.commit()
+    dashboard_cache.invalidate(user_id)
+    return count
+
+def recategorize_expenses(user_id, new_category, ids=None, category=None, start=None, end=None):
+    new_category_id = category_id_for(user_id, new_category)
+    count = (expense_selection(user_id, ids, category, start, end)
+             .update({Expense.category_id: new_category_id}, synchronize_session=False))
+    db.session.commit()
+    dashboard_cache.invalidate(user_id)
+    return count
+
+def bulk_selection_args():
+    # JSON body (or form) with any of: ids, category, month / from / to.
+    data = request.get_json(silent=True) or request.form.to_dict()
+    ids = data.get("ids")
+    if ids is not None:
+        if not isinstance(ids, list) or len(ids) > MAX_BULK_IDS:
+            abort(400)
+        try:
+            ids = [int(i) for i in ids]
+        except (TypeError, ValueError):
+            abort(400)
+    start, end = date_range_args(data)
+    selection = {"ids": ids, "category": data.get("category"), "start": start, "end": end}
+    # Refuse an empty selection rather than silently applying it to the whole history.
+    if not any(v is not None and v != "" for v in selection.values()):
+        abort(400)
+    return data, selection
+
+@app.route("/api/expenses/delete", methods=["POST"])
+@login_required
+def api_delete_expenses():
+    _, selection = bulk_selection_args()
+    return jsonify(affected=delete_expenses(current_user.id, **selection))
+
+@app.route("/api/expenses/recategorize", methods=["POST"])
+@login_required
+def api_recategorize_expenses():
+    data, selection = bulk_selection_args()
+    new_category = data.get("new_category")
+    return jsonify(affected=recategorize_expenses(current_user.id, new_category, **selection))
+
+@app.route("/api/incomes/delete", methods=["POST"])
+@login_required
+def api_delete_incomes():
+    return jsonify(affected=delete_incomes(current_user.id))
+
+def category_name_arg(data):
+    name = (data.get("name") or "").strip()
+    if not name or len(name) > 50:
+        abort(400)
+    return name
+
+def save_category(category, name):
+    # Renaming touches only the category row; expenses, totals and budgets refer to its id.
+    if db.session.scalar(select(Category.id).where(Category.user_id == current_user.id, Category.name == name,
+                                                   Category.id != category.id)):
+        abort(409)
+    category.name = name
+    db.session.add(category)
+    db.session.commit()
+    dashboard_cache.invalidate(current_user.id)
+    return category
+
+@app.route("/add_category", methods=["POST"])
+@login_required
+def add_category():
+    save_category(Category(user_id=current_user.id), category_name_arg(request.form))
     return redirect(url_for("home"))
 
+@app.route("/api/categories", methods=["GET", "POST"])
+@login_required
+def api_categories():
+    if request.method == "POST":
+        data = request.get_json(silent=True) or request.form.to_dict()
+        save_category(Category(user_id=current_user.id), category_name_arg(data))
+    categories = Category.query.filter_by(user_id=current_user.id).order_by(Category.id)
+    return jsonify(items=[{"id": c.id, "name": c.name} for c in categories])
+
+@app.route("/api/categories/<int:category_id>/rename", methods=["POST"])
+@login_required
+def api_rename_category(category_id):
+    category = db.session.get(Category, category_id)
+    if category is None or category.user_id != current_user.id:
+        abort(404)
+    data = request.get_json(silent=True) or request.form.to_dict()
+    save_category(category, category_name_arg(data))
+    return jsonify(id=category.id, name=category.name)
+
+def occurrence(start, every, unit, n):
+    # Monthly schedules keep start's day of month, clamped in shorter months (Jan 31 -> Feb 28 -> Mar 31).
+    if unit == "month":
+        first = add_months(start, every * n)
+        return first.replace(day=min(start.day, calendar.monthrange(first.year, first.month)[1]))
+    return start + timedelta(days=every * n * (7 if unit == "week" else 1))
+
+def materialize_recurring(today=None, user_id=None, batch_size=RECURRING_BATCH_SIZE):
+    # Inserts every due occurrence (next_date <= today), including periods missed while nothing
+    # ran, for all users in one transaction: rules are read in id-keyed batches and each batch's
+    # rows go in as one executemany per table. BEGIN IMMEDIATE serializes concurrent runs (the
+    # scheduler thread of each worker, cron), and next_date advances in the same transaction,
+    # so a rerun finds nothing due; the unique (recurring_rule_id, date) indexes additionally
+    # make inserting an occurrence twice a no-op.
+    today = today or date.today()
+    started = time.perf_counter()
+    rule = RecurringRule.__table__
+    report = {"rules": 0, "expenses": 0, "incomes": 0}
+    users = set()
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        last_id = 0
+        while True:
+            query = select(rule).where(rule.c.next_date <= today, rule.c.id > last_id).order_by(rule.c.id).limit(batch_size)
+            if user_id is not None:
+                query = query.where(rule.c.user_id == user_id)
+            rules = conn.execute(query).all()
+            if not rules:
+                break
+            rows = {"expense": [], "income": []}
+            progress = []
+            for r in rules:
+                n, day = r.occurrences, r.next_date
+                while day is not None and day <= today:
+                    row = {"amount_cents": r.amount_cents, "date": day, "user_id": r.user_id, "recurring_rule_id": r.id}
+                    if r.kind == "expense":
+                        row.update(category_id=r.category_id, description=r.description)
+                    rows[r.kind].append(row)
+                    n += 1
+                    day = occurrence(r.start_date, r.every, r.unit, n)
+                    if r.end_date is not None and day > r.end_date:
+                        day = None
+                progress.append({"rule_id": r.id, "n": n, "next": day})
+                users.add(r.user_id)
+            for kind, model in (("expense", Expense), ("income", Income)):
+                if rows[kind]:
+                    report[kind + "s"] += conn.execute(sqlite_insert(model).on_conflict_do_nothing(), rows[kind]).rowcount
+            conn.execute(update(rule).where(rule.c.id == bindparam("rule_id"))
+                         .values(occurrences=bindparam("n"), next_date=bindparam("next")), progress)
+            report["rules"] += len(rules)
+            last_id = rules[-1].id
+    for uid in users:
+        dashboard_cache.invalidate(uid)
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    return report
+
+def start_recurring_scheduler(interval):
+    def run():
+        while True:
+            with app.app_context():
+                try:
+                    report = materialize_recurring()
+                    if report["expenses"] or report["incomes"]:
+                        app.logger.info("Materialized recurring transactions: %s", report)
+                except Exception:
+                    app.logger.exception("Recurring scheduler run failed")
+            time.sleep(interval)
+    threading.Thread(target=run, name="recurring-scheduler", daemon=True).start()
+
+def rule_to_dict(rule):
+    return {
+        "id": rule.id,
+        "kind": rule.kind,
+        "category": rule.category.name if rule.category_id else None,
+        "amount": dollars(rule.amount_cents),
+        "description": rule.description,
+        "every": rule.every,
+        "unit": rule.unit,
+        "start": rule.start_date.isoformat(),
+        "end": rule.end_date.isoformat() if rule.end_date else None,
+        "next": rule.next_date.isoformat() if rule.next_date else None,
+    }
+
+@app.route("/api/recurring", methods=["GET", "POST"])
+@login_required
+def api_recurring():
+    # POST {"kind": "expense"|"income", "category" (expenses), "amount", "description",
+    # "every", "unit": "day"|"week"|"month", "start", "end"}; occurrences already due,
+    # from `start` up to today, are inserted straight away, so `start` may be at most
+    # RECURRING_MAX_BACKFILL_DAYS in the past.
+    if request.method == "POST":
+        data = request.get_json(silent=True) or request.form.to_dict()
+        kind = data.get("kind", "expense")
+        unit = data.get("unit", "month")
+        try:
+            amount_cents = parse_cents(data.get("amount"))
+            every = int(data.get("every", 1))
+            start = datetime.strptime(data["start"], "%Y-%m-%d").date() if data.get("start") else date.today()
+            end = datetime.strptime(data["end"], "%Y-%m-%d").date() if data.get("end") else None
+        except (TypeError, ValueError):
+            abort(400)
+        if kind not in ("expense", "income") or unit not in RECURRING_UNITS or amount_cents <= 0 or not 1 <= every <= 366:
+            abort(400)
+        if start < date.today() - timedelta(days=RECURRING_MAX_BACKFILL_DAYS):
+            abort(400)
+        rule = RecurringRule(
+            user_id=current_user.id,
+            kind=kind,
+            category_id=category_id_for(current_user.id, data.get("category")) if kind == "expense" else None,
+            amount_cents=amount_cents,
+            description=(data.get("description") or "")[:100],
+            every=every,
+            unit=unit,
+            start_date=start,
+            end_date=end,
+            occurrences=0,
+            next_date=start if end is None or start <= end else None,
+        )
+        db.session.add(rule)
+        db.session.commit()
+        materialize_recurring(user_id=current_user.id)
+        db.session.refresh(rule)
+        return jsonify(rule_to_dict(rule)), 201
+    rules = RecurringRule.query.filter_by(user_id=current_user.id).order_by(RecurringRule.id)
+    return jsonify(items=[rule_to_dict(rule) for rule in rules])
+
+@app.route("/api/recurring/<int:rule_id>/delete", methods=["POST"])
+@login_required
+def api_delete_recurring(rule_id):
+    # Stops the schedule; transactions it already created stay, detached from the rule so a
+    # reused rule id can't collide with them.
+    rule = db.session.get(RecurringRule, rule_id)
+    if rule is None or rule.user_id != current_user.id:
+        abort(404)
+    for model in (Expense, Income):
+        model.query.filter_by(recurring_rule_id=rule_id).update({"recurring_rule_id": None}, synchronize_session=False)
+    db.session.delete(rule)
+    db.session.commit()
+    dashboard_cache.invalidate(current_user.id)
+    return jsonify(deleted=rule_id)
+
+password_hasher = PasswordHasher(PASSWORD_HASH_METHOD, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+ip_throttle = LoginThrottle(LOGIN_ATTEMPTS_PER_MINUTE_IP)
+username_throttle = LoginThrottle(LOGIN_ATTEMPTS_PER_MINUTE_USER)
+
+def throttled(template, username):
+    # A 429 re-render of the form once this address or username is out of attempts. Checked
+    # before any hashing, so a flood of attempts costs a dictionary lookup each.
+    wait = max(ip_throttle.retry_after(request.remote_addr), username_throttle.retry_after(username))
+    if not wait:
+        return None
+    seconds = math.ceil(wait)
+    resp = app.make_response((render_template(template, error=f"Too many attempts. Try again in {seconds} seconds."), 429))
+    resp.headers["Retry-After"] = str(seconds)
+    return resp
+
+@app.errorhandler(HasherBusy)
+def hasher_busy(exc):
+    return Response("Too many sign-ins in progress, please try again.", 503, {"Retry-After": "1"}, mimetype="text/plain")
+
 @app.route("/login", methods=["GET", "POST"])
 def login():
     error = None
     if request.method == "POST":
         username = request.form["username"]
         password = request.form["password"]
+        refused = throttled("login.html", username)
+        if refused:
+            return refused
         user = User.query.filter_by(username=username).first()
-        if user and check_password_hash(user.password, password):
+        # A missing user is checked against a dummy hash, so timing doesn't tell which usernames exist.
+        ok, rehash = password_hasher.verify(user.password if user else None, password)
+        if ok:
+            if rehash:
+                # The stored hash predates PASSWORD_HASH_METHOD; replace it while the password is at
+                # hand. The old one still verifies, so a busy pool just defers this to a later login.
+                try:
+                    user.password = password_hasher.hash(password)
+                except HasherBusy:
+                    pass
+                else:
+                    db.session.commit()
+                    user_cache.pop(user.id)
             login_user(user)
             return redirect(url_for("home"))
         error = "Incorrect username or password."
-    return render_template_string("""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Login</title>
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;700&display=swap" rel="stylesheet">
-        <style>
-            body { background: #232529; color: #e2e4ea; font-family: 'Inter', Arial, sans-serif; margin: 0; height: 100vh; display: flex; align-items: center; justify-content: center;}
-            .login-box { background: #28292c; border-radius: 16px; box-shadow: 0 4px 32px rgba(0,0,0,.16); padding: 2.5rem 2rem; min-width: 350px; max-width: 95vw;}
-            h2 { font-size: 2.1rem; margin-bottom: 1.7rem; font-weight: 700;}
-            .err { color: #e2564a; margin-bottom: 18px; }
-            input { background: #18191b; color: #fff; border: 1.5px solid #444ce7; border-radius: 10px; padding: 0.65rem 1.1rem; margin-bottom: 1.3rem; font-size: 1.05rem; width: 45%; outline: none; margin-right: 12px; transition: border .22s;}
-            input:focus { border: 1.5px solid #44d964; }
-            button { background: #444ce7; color: #fff; border: none; padding: 0.7rem 1.4rem; border-radius: 8px; font-size: 1.1rem; cursor: pointer; margin-top: .5rem;}
-            a { color: #8f97ff; text-decoration: underline;}
-            .reg-link { margin-top: 1.3rem; }
-            .forgot-link { margin-top: 0.9rem; font-size: 1rem;}
-        </style>
-    </head>
-    <body>
-        <form method="post" class="login-box">
-            <h2>Login</h2>
-            {% if error %}<div class="err">{{error}}</div>{% endif %}
-            <input name="username" placeholder="Username" required>
-            <input name="password" placeholder="Password" type="password" required>
-            <button type="submit">Login</button>
-            <div class="reg-link">No account? <a href='/register'>Register</a></div>
-            <div class="forgot-link"><a href='/forgot_password'>Forgot password?</a></div>
-        </form>
-    </body>
-    </html>
-    """, error=error)
+    return render_template("login.html", error=error)
 
 @app.route("/register", methods=["GET", "POST"])
 def register():
@@ -575,46 +1542,20 @@ def register():
     if request.method == "POST":
         username = request.form["username"]
         password = request.form["password"]
+        refused = throttled("register.html", username)
+        if refused:
+            return refused
         if User.query.filter_by(username=username).first():
             error = "Username already taken."
         else:
-            hashed_password = generate_password_hash(password, method="pbkdf2:sha256")
-            user = User(username=username, password=hashed_password)
+            user = User(username=username, password=password_hasher.hash(password))
             db.session.add(user)
+            db.session.flush()
+            add_default_categories(user.id)
             db.session.commit()
             login_user(user)
             return redirect(url_for("home"))
-    return render_template_string("""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Register</title>
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;700&display=swap" rel="stylesheet">
-        <style>
-            body { background: #232529; color: #e2e4ea; font-family: 'Inter', Arial, sans-serif; margin: 0; height: 100vh; display: flex; align-items: center; justify-content: center;}
-            .login-box { background: #28292c; border-radius: 16px; box-shadow: 0 4px 32px rgba(0,0,0,.16); padding: 2.5rem 2rem; min-width: 350px; max-width: 95vw;}
-            h2 { font-size: 2.1rem; margin-bottom: 1.7rem; font-weight: 700;}
-            .err { color: #e2564a; margin-bottom: 18px; }
-            input { background: #18191b; color: #fff; border: 1.5px solid #444ce7; border-radius: 10px; padding: 0.65rem 1.1rem; margin-bottom: 1.3rem; font-size: 1.05rem; width: 45%; outline: none; margin-right: 12px; transition: border .22s;}
-            input:focus { border: 1.5px solid #44d964; }
-            button { background: #444ce7; color: #fff; border: none; padding: 0.7rem 1.4rem; border-radius: 8px; font-size: 1.1rem; cursor: pointer; margin-top: .5rem;}
-            a { color: #8f97ff; text-decoration: underline;}
-            .reg-link { margin-top: 1.3rem; }
-        </style>
-    </head>
-    <body>
-        <form method="post" class="login-box">
-            <h2>Register</h2>
-            {% if error %}<div class="err">{{error}}</div>{% endif %}
-            <input name="username" placeholder="Username" required>
-            <input name="password" placeholder="Password" type="password" required>
-            <button type="submit">Register</button>
-            <div class="reg-link">Already have an account? <a href='/login'>Login</a></div>
-        </form>
-    </body>
-    </html>
-    """, error=error)
+    return render_template("register.html", error=error)
 
 @app.route("/reset_password", methods=["GET", "POST"])
 @login_required
@@ -629,42 +1570,14 @@ def reset_password():
         elif len(pw1) < 4:
             error = "Password too short."
         else:
-            current_user.password = generate_password_hash(pw1, method="pbkdf2:sha256")
+            refused = throttled("reset_password.html", current_user.username)
+            if refused:
+                return refused
+            current_user.password = password_hasher.hash(pw1)
             db.session.commit()
+            user_cache.pop(current_user.id)
             success = "Password updated successfully!"
-    html = """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Reset Password</title>
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;700&display=swap" rel="stylesheet">
-        <style>
-            body { background: #232529; color: #e2e4ea; font-family: 'Inter', Arial, sans-serif; margin: 0; height: 100vh; display: flex; align-items: center; justify-content: center;}
-            .reset-box { background: #28292c; border-radius: 16px; box-shadow: 0 4px 32px rgba(0,0,0,.16); padding: 2.5rem 2rem; min-width: 350px; max-width: 95vw;}
-            h2 { font-size: 2.1rem; margin-bottom: 1.7rem; font-weight: 700;}
-            .err { color: #e2564a; margin-bottom: 18px; }
-            .success { color: #44d964; margin-bottom: 18px;}
-            input { background: #18191b; color: #fff; border: 1.5px solid #444ce7; border-radius: 10px; padding: 0.65rem 1.1rem; margin-bottom: 1.3rem; font-size: 1.05rem; width: 94%; outline: none; margin-right: 12px; transition: border .22s;}
-            input:focus { border: 1.5px solid #44d964; }
-            button { background: #444ce7; color: #fff; border: none; padding: 0.7rem 1.4rem; border-radius: 8px; font-size: 1.1rem; cursor: pointer; margin-top: .5rem;}
-            a { color: #8f97ff; text-decoration: underline;}
-        </style>
-    </head>
-    <body>
-        <form method="post" class="reset-box">
-            <h2>Reset Password</h2>
-            {% if error %}<div class="err">{{error}}</div>{% endif %}
-            {% if success %}<div class="success">{{success}}</div>{% endif %}
-            <input name="password" placeholder="New Password" type="password" required>
-            <input name="confirm_password" placeholder="Confirm New Password" type="password" required>
-            <button type="submit">Update Password</button>
-            <div style="margin-top: 1.2rem;"><a href="/">Back to Dashboard</a></div>
-        </form>
-    </body>
-    </html>
-    """
-    return render_template_string(html, error=error, success=success)
+    return render_template("reset_password.html", error=error, success=success)
 
 @app.route("/forgot_password", methods=["GET", "POST"])
 def forgot_password():
@@ -674,6 +1587,9 @@ def forgot_password():
         username = request.form["username"]
         pw1 = request.form["password"]
         pw2 = request.form["confirm_password"]
+        refused = throttled("forgot_password.html", username)
+        if refused:
+            return refused
         user = User.query.filter_by(username=username).first()
         if not user:
             error = "Username not found."
@@ -682,43 +1598,11 @@ def forgot_password():
         elif len(pw1) < 4:
             error = "Password too short."
         else:
-            user.password = generate_password_hash(pw1, method="pbkdf2:sha256")
+            user.password = password_hasher.hash(pw1)
             db.session.commit()
+            user_cache.pop(user.id)
             success = "Password updated! You can now log in."
-    html = """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Forgot Password</title>
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;700&display=swap" rel="stylesheet">
-        <style>
-            body { background: #232529; color: #e2e4ea; font-family: 'Inter', Arial, sans-serif; margin: 0; height: 100vh; display: flex; align-items: center; justify-content: center;}
-            .reset-box { background: #28292c; border-radius: 16px; box-shadow: 0 4px 32px rgba(0,0,0,.16); padding: 2.5rem 2rem; min-width: 350px; max-width: 95vw;}
-            h2 { font-size: 2.1rem; margin-bottom: 1.7rem; font-weight: 700;}
-            .err { color: #e2564a; margin-bottom: 18px; }
-            .success { color: #44d964; margin-bottom: 18px;}
-            input { background: #18191b; color: #fff; border: 1.5px solid #444ce7; border-radius: 10px; padding: 0.65rem 1.1rem; margin-bottom: 1.3rem; font-size: 1.05rem; width: 94%; outline: none; margin-right: 12px; transition: border .22s;}
-            input:focus { border: 1.5px solid #44d964; }
-            button { background: #444ce7; color: #fff; border: none; padding: 0.7rem 1.4rem; border-radius: 8px; font-size: 1.1rem; cursor: pointer; margin-top: .5rem;}
-            a { color: #8f97ff; text-decoration: underline;}
-        </style>
-    </head>
-    <body>
-        <form method="post" class="reset-box">
-            <h2>Forgot Password</h2>
-            {% if error %}<div class="err">{{error}}</div>{% endif %}
-            {% if success %}<div class="success">{{success}}</div>{% endif %}
-            <input name="username" placeholder="Your Username" required>
-            <input name="password" placeholder="New Password" type="password" required>
-            <input name="confirm_password" placeholder="Confirm New Password" type="password" required>
-            <button type="submit">Reset Password</button>
-            <div style="margin-top: 1.2rem;"><a href="/login">Back to Login</a></div>
-        </form>
-    </body>
-    </html>
-    """
-    return render_template_string(html, error=error, success=success)
+    return render_template("forgot_password.html", error=error, success=success)
 
 @app.route("/logout")
 @login_required
@@ -726,7 +1610,153 @@ def logout():
     logout_user()
     return redirect(url_for("login"))
 
-import os
+def query_plans():
+    # EXPLAIN QUERY PLAN steps of each dashboard query, by name; see check-query-plans.
+    return explain(db, {
+        "running totals": running_totals_query(1),
+        "dashboard totals": dashboard_totals_query(1),
+        "date range totals": dashboard_totals_query(1, date(2026, 1, 5), date(2026, 1, 20)),
+        "monthly totals": monthly_totals_query(1, "2025-11", "2026-01"),
+        "expense page": keyset_query(Expense, 1, before=1000).statement,
+        "income page": keyset_query(Income, 1, before=1000).statement,
+        "budget status": budget_status_query("2026-01", 1),
+        "weekly trend": trend_query(1, "week", date(2025, 1, 1), date(2026, 1, 31)),
+        "monthly trend": trend_query(1, "month", date(2025, 1, 1), date(2026, 1, 31)),
+    })
+
+init_query_plans(app, query_plans)
+
+def summary_drift(conn):
+    # (table, key values, stored cents, recomputed cents) for every summary row that disagrees
+    # with the raw rows, including rows missing on either side.
+    drift = []
+    for table, keys, column, query in SUMMARIES:
+        key_list = ", ".join(keys)
+        rows = conn.exec_driver_sql(
+            f"SELECT {key_list}, SUM(stored), SUM(expected) FROM ("
+            f"SELECT {key_list}, {column} AS stored, 0 AS expected FROM {table}"
+            f" UNION ALL SELECT {key_list}, 0, total FROM ({query})"
+            f") GROUP BY {key_list} HAVING SUM(stored) != SUM(expected) ORDER BY {key_list}")
+        drift.extend((table, dict(zip(keys, row[:-2])), row[-2], row[-1]) for row in rows)
+    return drift
+
+def rebuild_summaries(conn):
+    # Zero every summary row, then upsert the recomputed totals; user_totals keeps its other
+    # columns. Every user's write version is bumped so ETags and cached pages are refreshed.
+    for table, keys, column, query in SUMMARIES:
+        conn.exec_driver_sql(f"UPDATE {table} SET {column} = 0")
+        conn.exec_driver_sql(f"INSERT INTO {table} ({', '.join(keys)}, {column}) SELECT * FROM ({query}) WHERE true"
+                             f" ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {column} = excluded.{column}")
+    conn.exec_driver_sql("UPDATE user_totals SET version = version + 1, updated_at = CURRENT_TIMESTAMP")
+
+@app.cli.command("check-totals")
+@click.option("--rebuild", is_flag=True, help="Recompute the summaries from the raw rows.")
+def check_totals(rebuild):
+    """Compare the running totals with the expense/income rows; fail if any have drifted."""
+    with db.engine.begin() as conn:
+        # IMMEDIATE so no write lands between the comparison and the rebuild.
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        drift = summary_drift(conn)
+        for table, key, stored, expected in drift:
+            where = ", ".join(f"{name}={value}" for name, value in key.items())
+            click.echo(f"{table} {where}: stored {dollars(stored):.2f}, expected {dollars(expected):.2f}"
+                       f" (off by {dollars(stored - expected):.2f})")
+        if drift and rebuild:
+            rebuild_summaries(conn)
+    if drift:
+        raise click.ClickException(f"{len(drift)} summary row(s) drifted" + ("; rebuilt" if rebuild else ""))
+    click.echo("running totals match the expense and income rows")
+
+@app.cli.command("rebuild-search-index")
+def rebuild_search_index():
+    """Repopulate the search index from the expense and category tables."""
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        for table, ddl, fill in zip(("expense_fts",), SEARCH_DDL, SEARCH_FILL):
+            conn.exec_driver_sql(ddl)
+            conn.exec_driver_sql(f"DELETE FROM {table}")
+            count = conn.exec_driver_sql(fill).rowcount
+            conn.exec_driver_sql(f"INSERT INTO {table} ({table}) VALUES ('optimize')")
+            click.echo(f"{table}: indexed {count} rows")
+
+@app.cli.command("import-expenses")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--user", "username", required=True, help="Username to import into.")
+@click.option("--format", "fmt", type=click.Choice(["csv", "ofx", "qfx"]), help="Defaults to the file extension.")
+@click.option("--category", help="Category for rows without one (OFX has none).")
+def import_expenses_command(path, username, fmt, category):
+    """Bulk-import expenses from a CSV or OFX statement."""
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.ClickException(f"no such user {username!r}")
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    with open(path, encoding="utf-8-sig", errors="replace", newline="") as stream:
+        report = import_expenses(user.id, statement_rows(stream, fmt), category)
+    for error in report["errors"]:
+        click.echo(f"line {error['line']}: {error['error']}", err=True)
+    click.echo(f"inserted {report['inserted']} rows, {report['error_count']} errors, "
+               f"{report['seconds']}s ({report['rows_per_sec']} rows/sec)")
+
+def process_gauges():
+    gauges = {f"user_cache_{name}": value for name, value in user_cache.stats().items()}
+    if hasattr(dashboard_cache, "stats"):
+        gauges.update((f"dashboard_cache_{name}", value) for name, value in dashboard_cache.stats().items())
+    if write_queue is not None:
+        gauges.update((f"write_queue_{name}", value) for name, value in write_queue.stats().items())
+    gauges.update((f"password_{name}", value) for name, value in password_hasher.stats().items())
+    gauges["login_throttled"] = ip_throttle.rejected + username_throttle.rejected
+    return gauges
+
+# Off unless METRICS_ENABLED is set; see instrumentation.py.
+init_instrumentation(app, gauges=[process_gauges])
+# Registered after instrumentation so its after_request hook runs first and the metrics
+# count compressed bytes; see assets.py.
+init_assets(app, compress_level=COMPRESS_LEVEL, min_size=COMPRESS_MIN_BYTES)
+
+@app.cli.command("build-assets")
+def build_assets_command():
+    """Write precompressed .gz/.br static files."""
+    for path in build_assets(app.static_folder):
+        click.echo(os.path.relpath(path, app.static_folder))
+
+@app.cli.command("budget-alerts")
+@click.option("--month", help="YYYY-MM; defaults to the current month.")
+def budget_alerts(month):
+    """List every user's over-budget categories for a month, evaluated in one query."""
+    try:
+        month = datetime.strptime(month, "%Y-%m").strftime("%Y-%m") if month else date.today().strftime("%Y-%m")
+    except ValueError:
+        raise click.BadParameter("expected YYYY-MM", param_hint="--month")
+    alerts = 0
+    users = 0
+    for user in evaluate_budgets(month):
+        over = [b for b in user["budgets"] if b["over_budget"]]
+        users += bool(over)
+        for budget in over:
+            alerts += 1
+            click.echo(f"{user['username']}\t{budget['category']}\tspent {budget['spent']:.2f} of {budget['limit']:.2f}")
+    click.echo(f"{month}: {alerts} over-budget categories across {users} users", err=True)
+
+@app.cli.command("materialize-recurring")
+@click.option("--date", "today", help="YYYY-MM-DD to materialize up to; defaults to today.")
+def materialize_recurring_command(today):
+    """Insert every due recurring expense and income, catching up missed periods."""
+    try:
+        today = datetime.strptime(today, "%Y-%m-%d").date() if today else None
+    except ValueError:
+        raise click.BadParameter("expected YYYY-MM-DD", param_hint="--date")
+    report = materialize_recurring(today)
+    click.echo(f"{report['rules']} due rules: inserted {report['expenses']} expenses and "
+               f"{report['incomes']} incomes in {report['seconds']}s")
+
+if RECURRING_INTERVAL:
+    start_recurring_scheduler(RECURRING_INTERVAL)
+
+# Compile every template once at startup; Jinja keeps the compiled code cached
+# for the life of the process instead of re-parsing on each request.
+for template_name in app.jinja_env.list_templates():
+    app.jinja_env.get_template(template_name)
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 10000))
     app.run(host="0.0.0.0", port=port)
@@ -0,0 +1,230 @@
+"""Caches for user records and rendered pages."""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire ``ttl`` seconds after being set.
+
+    ``hits`` and ``misses`` count ``get`` calls; an expired entry counts as a miss.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return entry[1] if entry is not None else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+class PageCache:
+    """Per-user cache of rendered pages; the interface every backend implements.
+
+    Entries are bytes stored under ``(user_id, key)``. Callers put the user's
+    data version into ``key``, read from the database that every process and
+    command writes through, so a write anywhere makes older pages unreachable.
+    ``invalidate(user_id)`` only frees the space of the user's entries.
+    """
+
+    def get(self, user_id, key):
+        raise NotImplementedError
+
+    def set(self, user_id, key, value):
+        raise NotImplementedError
+
+    def invalidate(self, user_id):
+        raise NotImplementedError
+
+
+class NullPageCache(PageCache):
+    def get(self, user_id, key):
+        return None
+
+    def set(self, user_id, key, value):
+        pass
+
+    def invalidate(self, user_id):
+        pass
+
+
+class MemoryPageCache(PageCache):
+    """In-process LRU bounded by the total size of the stored pages."""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, key):
+        with self._lock:
+            value = self._entries.get((user_id, key))
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((user_id, key))
+            self.hits += 1
+            return value
+
+    def set(self, user_id, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop((user_id, key), None)
+            self.size += len(value) - (len(old) if old is not None else 0)
+            self._entries[(user_id, key)] = value
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            for entry in [entry for entry in self._entries if entry[0] == user_id]:
+                self.size -= len(self._entries.pop(entry))
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.size, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+class SQLitePageCache(PageCache):
+    """Page cache in a local SQLite file, shared by every worker process on the host.
+
+    A stand-in for a networked store such as Redis or memcached: the same four
+    operations, with eviction of the least recently used pages once the file
+    holds more than ``max_bytes`` of them. Triggers keep the byte and entry
+    totals in the one-row ``usage`` table, so a store reads one row to decide
+    whether to evict instead of summing every page.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS page (user_id INTEGER NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL,"
+        " used_at REAL NOT NULL, PRIMARY KEY (user_id, key))",
+        "CREATE INDEX IF NOT EXISTS ix_page_used_at ON page (used_at)",
+        "CREATE TABLE IF NOT EXISTS usage (id INTEGER PRIMARY KEY CHECK (id = 1), bytes INTEGER NOT NULL,"
+        " entries INTEGER NOT NULL)",
+        # Counted once, when the file is first given a usage row; the triggers keep it current.
+        "INSERT OR IGNORE INTO usage (id, bytes, entries) SELECT 1, coalesce(SUM(length(value)), 0), COUNT(*)"
+        " FROM page",
+        "CREATE TRIGGER IF NOT EXISTS page_usage_insert AFTER INSERT ON page BEGIN"
+        " UPDATE usage SET bytes = bytes + length(NEW.value), entries = entries + 1; END",
+        "CREATE TRIGGER IF NOT EXISTS page_usage_delete AFTER DELETE ON page BEGIN"
+        " UPDATE usage SET bytes = bytes - length(OLD.value), entries = entries - 1; END",
+        "CREATE TRIGGER IF NOT EXISTS page_usage_update AFTER UPDATE OF value ON page BEGIN"
+        " UPDATE usage SET bytes = bytes + length(NEW.value) - length(OLD.value); END",
+    )
+
+    def __init__(self, path, max_bytes=128 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._connect = lambda: sqlite3.connect(path, timeout=5, isolation_level=None)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("BEGIN IMMEDIATE")
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            conn.execute("COMMIT")
+
+    @property
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            conn.execute("PRAGMA synchronous=OFF")
+        return conn
+
+    def get(self, user_id, key):
+        row = self._conn.execute("UPDATE page SET used_at = ? WHERE user_id = ? AND key = ? RETURNING value",
+                                 (time.time(), user_id, key)).fetchone()
+        return row[0] if row else None
+
+    def set(self, user_id, key, value):
+        conn = self._conn
+        # An upsert rather than INSERT OR REPLACE: the rows REPLACE deletes do not fire delete triggers.
+        conn.execute("INSERT INTO page (user_id, key, value, used_at) VALUES (?, ?, ?, ?)"
+                     " ON CONFLICT (user_id, key) DO UPDATE SET value = excluded.value, used_at = excluded.used_at",
+                     (user_id, key, value, time.time()))
+        size, entries = conn.execute("SELECT bytes, entries FROM usage").fetchone()
+        if size > self.max_bytes:
+            # Drop the oldest tenth at a time rather than checking after every row.
+            conn.execute("DELETE FROM page WHERE rowid IN (SELECT rowid FROM page ORDER BY used_at LIMIT ?)",
+                         (max(1, entries // 10),))
+
+    def invalidate(self, user_id):
+        self._conn.execute("DELETE FROM page WHERE user_id = ?", (user_id,))
+
+    def stats(self):
+        size, entries = self._conn.execute("SELECT bytes, entries FROM usage").fetchone()
+        return {"entries": entries, "bytes": size, "max_bytes": self.max_bytes}
+
+
+def source_fingerprint(paths, skip_suffixes=(".pyc", ".gz", ".br")):
+    """Short hash of the names and contents of the files under ``paths`` (files or directories).
+
+    Put into page cache keys, it retires pages rendered by a previous deploy: the
+    shared cache outlives the processes, and their code and templates may differ.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        files = [path] if os.path.isfile(path) else sorted(
+            os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+        for name in files:
+            if name.endswith(skip_suffixes) or "__pycache__" in name:
+                continue
+            digest.update(os.path.relpath(name, os.path.dirname(path)).encode() + b"\0")
+            with open(name, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def page_cache_from_url(url, max_bytes):
+    """``memory`` (default), ``sqlite:///path/to/cache.db`` or ``off``."""
+    if url in ("", "memory"):
+        return MemoryPageCache(max_bytes)
+    if url == "off":
+        return NullPageCache()
+    if url.startswith("sqlite:///"):
+        return SQLitePageCache(url[len("sqlite:///"):], max_bytes)
+    raise ValueError(f"unsupported page cache {url!r}")
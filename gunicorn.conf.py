@@ -0,0 +1,32 @@
+# Gunicorn settings for the production server (see Procfile).
+#
+# SQLite allows one writer at a time, so a few processes with several threads
+# each beat many single-threaded processes: threads share a connection pool
+# and WAL lets their reads proceed while one of them holds the write lock.
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+max_requests = 2000
+max_requests_jitter = 200
+accesslog = "-"
+
+
+def on_starting(server):
+    # Write the .gz/.br variants of static/ once per deploy, in the master before any worker
+    # starts, so static files are never compressed per request. Only missing or outdated
+    # variants are written, so a restart with unchanged files costs a directory walk.
+    from assets import build_assets
+
+    folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+    try:
+        written = build_assets(folder)
+    except OSError as exc:
+        server.log.warning("build-assets failed, serving static files uncompressed: %s", exc)
+    else:
+        server.log.info("build-assets wrote %d precompressed file(s)", len(written))
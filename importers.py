@@ -0,0 +1,94 @@
+"""Streaming parsers for bank/statement files used by the bulk expense import.
+
+Each parser reads its input incrementally and yields ``(line, fields, error)``
+tuples, one per transaction, so an import of any size runs in constant memory.
+``fields`` holds ``date``, ``amount_cents``, ``description`` and ``category`` (which
+may be ``None`` when the source has no category column); ``error`` is a
+message when the row could not be parsed.
+"""
+import csv
+import re
+from datetime import datetime
+
+from money import parse_cents
+
+DATE_FORMATS = ("%Y-%m-%d", "%m-%d-%Y", "%m/%d/%Y")
+
+
+def parse_date(value):
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt).date()
+        except ValueError:
+            pass
+    raise ValueError(f"unrecognised date {value!r}")
+
+
+def parse_amount(value):
+    cents = parse_cents(value)
+    if cents <= 0:
+        raise ValueError(f"amount must be positive, got {value!r}")
+    return cents
+
+
+def iter_csv(stream):
+    """Rows of a CSV with a header of date, category, amount and optional description."""
+    reader = csv.DictReader(stream)
+    fields = {name.strip().lower() for name in reader.fieldnames or ()}
+    missing = {"date", "amount"} - fields
+    if missing:
+        yield 1, None, f"missing column(s): {', '.join(sorted(missing))}"
+        return
+    for row in reader:
+        row = {(k or "").strip().lower(): (v or "") for k, v in row.items()}
+        try:
+            yield reader.line_num, {
+                "date": parse_date(row["date"]),
+                "amount_cents": parse_amount(row["amount"]),
+                "description": row.get("description", "").strip()[:100],
+                "category": row.get("category", "").strip() or None,
+            }, None
+        except ValueError as exc:
+            yield reader.line_num, None, str(exc)
+
+
+STMTTRN = re.compile(r"<STMTTRN>(.*?)</STMTTRN>", re.S | re.I)
+OFX_FIELD = re.compile(r"<(\w+)>([^<\r\n]*)")
+
+
+def iter_ofx(stream, chunk_size=64 * 1024):
+    """Debit transactions (<STMTTRN> with a negative TRNAMT) of an OFX/QFX file.
+
+    Works on both SGML (unclosed tags) and XML OFX. Only the text after the
+    last complete transaction is kept between chunks. ``line`` is the
+    1-based transaction number; credits are reported as skipped.
+    """
+    buffer = ""
+    number = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        buffer += chunk
+        end = 0
+        for match in STMTTRN.finditer(buffer):
+            number += 1
+            end = match.end()
+            tags = {k.upper(): v.strip() for k, v in OFX_FIELD.findall(match.group(1))}
+            try:
+                cents = parse_cents(tags["TRNAMT"])
+                if cents >= 0:
+                    raise ValueError("credit transaction skipped")
+                yield number, {
+                    "date": datetime.strptime(tags["DTPOSTED"][:8], "%Y%m%d").date(),
+                    "amount_cents": -cents,
+                    "description": (tags.get("NAME") or tags.get("MEMO") or "")[:100],
+                    "category": None,
+                }, None
+            except KeyError as exc:
+                yield number, None, f"missing {exc.args[0]}"
+            except ValueError as exc:
+                yield number, None, str(exc)
+        # Keep only a possibly incomplete transaction for the next chunk.
+        start = buffer.upper().find("<STMTTRN>", end)
+        buffer = buffer[start:] if start != -1 else buffer[-len("<STMTTRN>"):]
+        if not chunk:
+            return
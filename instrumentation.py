@@ -0,0 +1,199 @@
+"""Opt-in request instrumentation shared by both app variants.
+
+``init_instrumentation(app)`` records, per route: wall time (as a histogram),
+SQL statement count and time (SQLAlchemy cursor events), template render time
+(Flask's template signals) and response size, and serves them at ``/metrics``
+in the Prometheus text format. With ``PROFILE_SLOWEST`` > 0 it also runs
+requests under cProfile and keeps ``.prof`` dumps of the slowest N in
+``PROFILE_DIR`` (open them with ``python -m pstats`` or snakeviz).
+
+Nothing is hooked unless the app enables it, so the default cost is zero.
+``/metrics`` is not behind the login; keep it off the public internet (e.g.
+only route it from the scraper's network).
+"""
+import cProfile
+import heapq
+import os
+import threading
+import time
+from collections import defaultdict
+
+from flask import Response, before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class RouteStats:
+    __slots__ = ("count", "seconds", "buckets", "sql_statements", "sql_seconds", "template_seconds",
+                 "response_bytes", "statuses")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.response_bytes = 0
+        self.statuses = defaultdict(int)
+
+
+class Metrics:
+    def __init__(self, profile_slowest=0, profile_dir="profiles"):
+        self.routes = defaultdict(RouteStats)
+        self.gauges = []
+        self.profile_slowest = profile_slowest
+        self.profile_dir = profile_dir
+        self._slowest = []  # min-heap of (seconds, path) of the kept profile dumps
+        self._profiler_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    def observe(self, route, seconds, status, sql_statements, sql_seconds, template_seconds, response_bytes):
+        with self._lock:
+            stats = self.routes[route]
+            stats.count += 1
+            stats.seconds += seconds
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    stats.buckets[i] += 1
+            stats.sql_statements += sql_statements
+            stats.sql_seconds += sql_seconds
+            stats.template_seconds += template_seconds
+            stats.response_bytes += response_bytes
+            stats.statuses[status] += 1
+
+    def keep_profile(self, profiler, seconds, route):
+        with self._lock:
+            if len(self._slowest) >= self.profile_slowest and seconds <= self._slowest[0][0]:
+                return
+            os.makedirs(self.profile_dir, exist_ok=True)
+            path = os.path.join(self.profile_dir, f"{seconds * 1000:09.1f}ms-{route}-{time.time_ns()}.prof")
+            profiler.dump_stats(path)
+            heapq.heappush(self._slowest, (seconds, path))
+            if len(self._slowest) > self.profile_slowest:
+                _, evicted = heapq.heappop(self._slowest)
+                try:
+                    os.remove(evicted)
+                except OSError:
+                    pass
+
+    def render(self):
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+
+        with self._lock:
+            routes = sorted(self.routes.items())
+            buckets = []
+            for route, stats in routes:
+                for bound, n in zip(LATENCY_BUCKETS, stats.buckets):
+                    buckets.append(f'budget_request_duration_seconds_bucket{{route="{route}",le="{bound}"}} {n}')
+                buckets.append(f'budget_request_duration_seconds_bucket{{route="{route}",le="+Inf"}} {stats.count}')
+                buckets.append(f'budget_request_duration_seconds_sum{{route="{route}"}} {stats.seconds}')
+                buckets.append(f'budget_request_duration_seconds_count{{route="{route}"}} {stats.count}')
+            family("budget_request_duration_seconds", "histogram", "Request wall time.", buckets)
+            family("budget_requests_total", "counter", "Requests by route and status code.", [
+                f'budget_requests_total{{route="{route}",status="{status}"}} {n}'
+                for route, stats in routes for status, n in sorted(stats.statuses.items())
+            ])
+            for name, attr, help_text in (
+                ("budget_sql_statements_total", "sql_statements", "SQL statements executed."),
+                ("budget_sql_seconds_total", "sql_seconds", "Time spent executing SQL."),
+                ("budget_template_render_seconds_total", "template_seconds", "Time spent rendering templates."),
+                ("budget_response_bytes_total", "response_bytes", "Response body bytes (streamed bodies excluded)."),
+            ):
+                family(name, "counter", help_text,
+                       [f'{name}{{route="{route}"}} {getattr(stats, attr)}' for route, stats in routes])
+        for gauge in self.gauges:
+            for name, value in gauge().items():
+                family(f"budget_{name}", "gauge", name.replace("_", " ") + ".", [f"budget_{name} {value}"])
+        return "\n".join(lines) + "\n"
+
+
+def _sql_start(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and "_metrics_sql" in g:
+        conn.info.setdefault("_metrics_started", []).append(time.perf_counter())
+
+
+def _sql_end(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("_metrics_started")
+    if started and has_request_context() and "_metrics_sql" in g:
+        g._metrics_sql[0] += 1
+        g._metrics_sql[1] += time.perf_counter() - started.pop()
+
+
+def _template_start(app, template, context, **extra):
+    if has_request_context() and "_metrics_sql" in g:
+        g._metrics_template_started = time.perf_counter()
+
+
+def _template_end(app, template, context, **extra):
+    if has_request_context() and "_metrics_template_started" in g:
+        g._metrics_template += time.perf_counter() - g.pop("_metrics_template_started")
+
+
+def init_instrumentation(app, gauges=()):
+    """Instrument ``app`` if ``METRICS_ENABLED`` is set in its config or the environment.
+
+    ``gauges`` are callables returning ``{name: number}``, exported as
+    ``budget_<name>`` gauges (cache sizes, hit counters and the like).
+    Returns the Metrics instance, or None when instrumentation is off.
+    """
+    enabled = app.config.get("METRICS_ENABLED", os.environ.get("METRICS_ENABLED", ""))
+    if str(enabled).lower() not in ("1", "true", "yes", "on"):
+        return None
+    metrics = Metrics(int(app.config.get("PROFILE_SLOWEST", os.environ.get("PROFILE_SLOWEST", 0))),
+                      app.config.get("PROFILE_DIR", os.environ.get("PROFILE_DIR", "profiles")))
+    metrics.gauges.extend(gauges)
+    app.extensions["metrics"] = metrics
+
+    if not event.contains(Engine, "before_cursor_execute", _sql_start):
+        event.listen(Engine, "before_cursor_execute", _sql_start)
+        event.listen(Engine, "after_cursor_execute", _sql_end)
+    before_render_template.connect(_template_start, app)
+    template_rendered.connect(_template_end, app)
+
+    @app.before_request
+    def start_request():
+        g._metrics_started = time.perf_counter()
+        g._metrics_sql = [0, 0.0]
+        g._metrics_template = 0.0
+        # cProfile can only follow one thread at a time; concurrent requests go unprofiled.
+        if metrics.profile_slowest and metrics._profiler_lock.acquire(blocking=False):
+            g._metrics_profiler = cProfile.Profile()
+            g._metrics_profiler.enable()
+
+    @app.after_request
+    def record_request(response):
+        if "_metrics_started" not in g:
+            return response
+        seconds = time.perf_counter() - g._metrics_started
+        route = request.endpoint or "unmatched"
+        profiler = g.pop("_metrics_profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            metrics._profiler_lock.release()
+            metrics.keep_profile(profiler, seconds, route)
+        size = 0 if response.is_streamed else response.calculate_content_length() or 0
+        metrics.observe(route, seconds, response.status_code, g._metrics_sql[0], g._metrics_sql[1],
+                        g._metrics_template, size)
+        return response
+
+    @app.teardown_request
+    def stop_profiler(exc):
+        # after_request doesn't run when the view raises.
+        profiler = g.pop("_metrics_profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            metrics._profiler_lock.release()
+
+    @app.route("/metrics")
+    def metrics_endpoint():
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+    return metrics
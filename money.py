@@ -0,0 +1,83 @@
+"""Money as integer cents, plus exact aggregation over columns of amounts.
+
+Amounts are stored and summed as integer minor units so totals never drift;
+``dollars`` is only applied at the edges (templates, JSON, exports). The
+reductions below are for data already in memory -- an import batch, a
+what-if projection -- where SQL aggregation isn't available. They use NumPy
+when it is installed and fall back to plain Python otherwise; both give the
+same integer results.
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+try:
+    import numpy as np
+except ImportError:  # optional: only speeds up the reductions
+    np = None
+
+CENT = Decimal("0.01")
+
+
+def parse_cents(value):
+    """Cents from user text such as ``"12.5"``, ``"$1,024.99"`` or ``"-3"``."""
+    try:
+        amount = Decimal(str(value).strip().replace("$", "").replace(",", ""))
+    except InvalidOperation:
+        raise ValueError(f"invalid amount {value!r}") from None
+    if not amount.is_finite():
+        raise ValueError(f"invalid amount {value!r}")
+    return int(amount.quantize(CENT, rounding=ROUND_HALF_UP) * 100)
+
+
+def dollars(cents):
+    return cents / 100 if cents else 0
+
+
+def sum_by_key(keys, cents, labels=None):
+    """Exact per-key totals of two parallel columns, as ``{key: cents}``.
+
+    ``labels`` fixes the keys (and their order) in the result, with zero for
+    keys that don't occur; keys outside ``labels`` are ignored.
+    """
+    keys = list(keys)
+    labels = list(dict.fromkeys(keys)) if labels is None else list(labels)
+    index = {label: i for i, label in enumerate(labels)}
+    if np is not None:
+        codes = np.fromiter((index.get(k, -1) for k in keys), dtype=np.int64, count=len(keys))
+        values = np.asarray(cents, dtype=np.int64)
+        known = codes >= 0
+        totals = np.zeros(len(labels), dtype=np.int64)
+        np.add.at(totals, codes[known], values[known])
+        return dict(zip(labels, totals.tolist()))
+    totals = dict.fromkeys(labels, 0)
+    for key, amount in zip(keys, cents):
+        if key in index:
+            totals[key] += amount
+    return totals
+
+
+def scale_cents(cents, percents):
+    """Each amount changed by a whole-number percentage, rounded to the nearest cent."""
+    if np is not None:
+        scaled = np.asarray(cents, dtype=np.int64) * (100 + np.asarray(percents, dtype=np.int64))
+        return divide_cents(scaled, 100).tolist()
+    return [divide_cents(amount * (100 + pct), 100) for amount, pct in zip(cents, percents)]
+
+
+def divide_cents(numerator, denominator):
+    """Integer division rounded half away from zero; works on ints and int64 arrays."""
+    if np is not None and isinstance(numerator, np.ndarray):
+        return np.sign(numerator) * ((np.abs(numerator) + denominator // 2) // denominator)
+    sign = -1 if numerator < 0 else 1
+    return sign * ((abs(numerator) + denominator // 2) // denominator)
+
+
+def project_balances(start_cents, monthly_income_cents, monthly_spend_cents, months):
+    """Balance at the end of each of the next ``months`` months.
+
+    ``monthly_spend_cents`` is one monthly amount per category; the result is
+    ``months`` integers, the running balance after each month's income and spend.
+    """
+    net = monthly_income_cents - sum(monthly_spend_cents)
+    if np is not None:
+        return (start_cents + net * np.arange(1, months + 1, dtype=np.int64)).tolist()
+    return [start_cents + net * month for month in range(1, months + 1)]
@@ -0,0 +1,163 @@
+"""Password hashing off the request threads, plus login throttling.
+
+Password KDFs are slow on purpose (pbkdf2:sha256 at werkzeug's default
+1,000,000 iterations is ~0.4 s of CPU). Run in request threads, a burst of
+logins occupies every server thread and core, and dashboard requests queue
+behind them. ``PasswordHasher`` runs the KDF in a small process pool instead:
+
+- At most ``workers`` hashes run at once per server process.
+- The pool processes run at a lower CPU priority (``nice``).
+- At most ``max_pending`` requests use or wait for the pool. Past that, ``hash``/``verify``
+  raise ``HasherBusy`` at once. A request waiting on the pool still holds its server
+  thread, so keeping this below the thread count leaves threads for other pages.
+
+``verify`` also reports whether a stored hash was made with other parameters
+than the configured ``method``, so the caller can store a fresh hash while it
+has the plain password (rehash on login). Given no stored hash (no such
+account), it checks the password against a dummy hash of the same method, so
+a login takes as long whether or not the username exists.
+
+``LoginThrottle`` is a token bucket per key (client IP, username). It rejects
+attempts before any hashing happens, so a flood costs a dictionary lookup
+per request. Both are per server process. With N gunicorn workers, the
+effective limits are up to N times the configured ones.
+"""
+import multiprocessing
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    """``max_pending`` requests are already using or waiting for the hashing pool."""
+
+
+def canonical_method(method):
+    """``method`` with werkzeug's defaults spelled out, as it appears in a stored hash."""
+    name, *args = method.split(":")
+    if name == "pbkdf2" and len(args) <= 2:
+        hash_name = args[0] if args else "sha256"
+        iterations = int(args[1]) if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{iterations}"
+    if name == "scrypt" and len(args) in (0, 3):
+        n, r, p = map(int, args) if args else (2 ** 15, 8, 1)
+        return f"scrypt:{n}:{r}:{p}"
+    raise ValueError(f"unsupported password hash method {method!r}")
+
+
+def _lower_priority(nice):
+    if nice and hasattr(os, "nice"):
+        os.nice(nice)
+
+
+class PasswordHasher:
+    def __init__(self, method="pbkdf2:sha256", workers=1, max_pending=4, nice=10):
+        self.method = canonical_method(method)
+        self.workers = workers
+        self.nice = nice
+        # The pool's children are not forked from the server process; see _executor().
+        self.start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self.hashed = 0
+        self.verified = 0
+        self.busy = 0
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._dummy = None
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, stored, password):
+        """(matches, needs_rehash) for a stored hash and a candidate password.
+
+        A ``stored`` of None never matches, after the same work as a real check.
+        """
+        if stored is None:
+            if self._dummy is None:
+                self._dummy = self.hash(secrets.token_urlsafe())
+            self._run(check_password_hash, self._dummy, password)
+            return False, False
+        ok = self._run(check_password_hash, stored, password)
+        return ok, ok and self.needs_rehash(stored)
+
+    def needs_rehash(self, stored):
+        return stored.split("$", 1)[0] != self.method
+
+    def stats(self):
+        return {"hashed": self.hashed, "verified": self.verified, "busy": self.busy}
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def _run(self, fn, *args):
+        if fn is generate_password_hash:
+            self.hashed += 1
+        else:
+            self.verified += 1
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            self.busy += 1
+            raise HasherBusy()
+        try:
+            return self._executor().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def _executor(self):
+        # Created on first use, in the server worker process. The children are not forked from
+        # it: it runs request threads (and maybe the write queue and scheduler), and a forked
+        # child could inherit a lock one of them holds and deadlock. A forkserver starts them
+        # from a fresh single-threaded process; where there is none, they are spawned.
+        with self._pool_lock:
+            if self._pool is None:
+                context = multiprocessing.get_context(self.start_method)
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=context,
+                                                 initializer=_lower_priority, initargs=(self.nice,))
+            return self._pool
+
+
+class LoginThrottle:
+    """Token buckets of ``per_minute`` attempts (burst of the same size) per key.
+
+    ``per_minute`` of 0 disables the throttle. At most ``maxsize`` buckets are kept,
+    least recently used dropped first; a dropped bucket is simply full again.
+    """
+
+    def __init__(self, per_minute, maxsize=10_000, clock=time.monotonic):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.maxsize = maxsize
+        self.clock = clock
+        self.rejected = 0
+        self._buckets = OrderedDict()  # key -> (tokens, last refill time)
+        self._lock = threading.Lock()
+
+    def retry_after(self, key):
+        """Take one attempt for ``key``: 0 if allowed, else seconds until one is available."""
+        if not self.capacity:
+            return 0
+        now = self.clock()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - last) * self.rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0
+            else:
+                self._buckets[key] = (tokens, now)
+                self.rejected += 1
+                wait = (1 - tokens) / self.rate
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return wait
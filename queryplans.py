@@ -0,0 +1,45 @@
+"""Query plan checks shared by both app variants.
+
+Each app lists its dashboard queries in a ``query_plans()`` function that
+returns ``explain(db, {name: statement})``. ``init_query_plans(app, query_plans)``
+registers ``flask check-query-plans``, which prints every plan and fails if
+any step scans a table or index instead of searching one.
+"""
+import click
+
+
+def explain(db, queries):
+    """EXPLAIN QUERY PLAN steps of each SQLAlchemy statement in ``queries``, by name."""
+    plans = {}
+    for name, query in queries.items():
+        sql = str(query.compile(db.engine, compile_kwargs={"literal_binds": True}))
+        plans[name] = [row[-1] for row in db.session.execute(db.text("EXPLAIN QUERY PLAN " + sql))]
+    return plans
+
+
+def plan_scans(plan):
+    """The steps of a plan that scan a table or index.
+
+    Scanning a subquery the plan materialized ("MATERIALIZE anon_1" ... "SCAN anon_1")
+    only walks rows an index search already produced, so those are left out.
+    """
+    materialized = {detail.split()[1] for detail in plan if detail.startswith("MATERIALIZE ")}
+    return [detail for detail in plan if detail.startswith("SCAN ") and detail.split()[1] not in materialized]
+
+
+def init_query_plans(app, query_plans):
+    """Register ``check-query-plans`` on ``app`` for the plans ``query_plans()`` returns."""
+
+    @app.cli.command("check-query-plans")
+    def check_query_plans():
+        """Fail if any dashboard query is planned as a table scan instead of an index search."""
+        scans = 0
+        for name, plan in query_plans().items():
+            click.echo(f"{name}:")
+            for detail in plan:
+                click.echo(f"    {detail}")
+            scans += len(plan_scans(plan))
+        if scans:
+            raise click.ClickException(f"{scans} dashboard query step(s) fall back to a scan")
+
+    return check_query_plans
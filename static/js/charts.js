@@ -0,0 +1,127 @@
+// Small SVG bar and pie charts, drawn from this file alone so the dashboard needs no third-party
+// script or outside network. Each call draws into an empty element and returns {update(options)}
+// to redraw it with new options.
+//   Charts.bar(el, {labels, series: [{label, data, color}], stacked, line: {label, data, color}})
+//   Charts.pie(el, {labels, data, colors})
+const Charts = (function() {
+    const SVG = "http://www.w3.org/2000/svg";
+    const WIDTH = 600, HEIGHT = 230, TEXT = '#e2e4ea', GRID = '#3a3d45';
+
+    function node(tag, attrs, parent) {
+        const el = document.createElementNS(SVG, tag);
+        Object.keys(attrs).forEach(function(name) { el.setAttribute(name, attrs[name]); });
+        if (parent) { parent.appendChild(el); }
+        return el;
+    }
+    function tip(el, text) {
+        node('title', {}, el).textContent = text;
+    }
+    function canvas(el) {
+        el.textContent = '';
+        return node('svg', {viewBox: '0 0 ' + WIDTH + ' ' + HEIGHT, width: '100%', role: 'img'}, el);
+    }
+    function legend(el, entries) {
+        const box = document.createElement('div');
+        box.style.cssText = 'display:flex;flex-wrap:wrap;gap:.4rem 1rem;justify-content:center;margin-top:.4rem;color:' + TEXT;
+        entries.forEach(function(entry) {
+            const item = document.createElement('span');
+            const swatch = document.createElement('span');
+            swatch.style.cssText = 'display:inline-block;width:12px;height:12px;margin-right:6px;border-radius:3px;background:' + entry.color;
+            item.appendChild(swatch);
+            item.appendChild(document.createTextNode(entry.label));
+            box.appendChild(item);
+        });
+        el.appendChild(box);
+    }
+    // The smallest 1, 2 or 5 times a power of ten at or above `value`, for the axis top
+    function niceMax(value) {
+        if (!(value > 0)) { return 1; }
+        const step = Math.pow(10, Math.floor(Math.log10(value)));
+        return [1, 2, 5, 10].map(function(m) { return m * step; }).find(function(top) { return top >= value; });
+    }
+    function format(value) {
+        return value.toLocaleString('en-US', {maximumFractionDigits: 2});
+    }
+
+    function drawBar(el, o) {
+        const svg = canvas(el);
+        const labels = o.labels, series = o.series || [];
+        const left = 52, right = 8, top = 10, bottom = 26;
+        const plotW = WIDTH - left - right, plotH = HEIGHT - top - bottom;
+        const heights = labels.map(function(_, i) {
+            const values = series.map(function(s) { return s.data[i] || 0; });
+            return o.stacked ? values.reduce(function(a, b) { return a + b; }, 0) : Math.max.apply(null, values.concat(0));
+        });
+        const max = niceMax(Math.max.apply(null, heights.concat(o.line ? o.line.data : [], 0)));
+        const y = function(value) { return top + plotH - value / max * plotH; };
+        for (let g = 0; g <= 4; g++) {
+            const value = max * g / 4;
+            node('line', {x1: left, x2: WIDTH - right, y1: y(value), y2: y(value), stroke: GRID}, svg);
+            node('text', {x: left - 6, y: y(value) + 4, 'text-anchor': 'end', fill: TEXT, 'font-size': 11}, svg)
+                .textContent = format(value);
+        }
+        const band = plotW / Math.max(labels.length, 1);
+        const groups = o.stacked ? 1 : Math.max(series.length, 1);
+        const barW = Math.min(band * 0.7, 52) / groups;
+        const labelEvery = Math.ceil(labels.length / Math.max(1, Math.floor(plotW / 60)));
+        labels.forEach(function(label, i) {
+            const center = left + band * (i + 0.5);
+            let base = 0;
+            series.forEach(function(s, j) {
+                const value = s.data[i] || 0;
+                const x = o.stacked ? center - barW / 2 : center - barW * groups / 2 + barW * j;
+                const from = o.stacked ? base : 0;
+                if (value > 0) {
+                    tip(node('rect', {x: x, y: y(from + value), width: Math.max(barW - 2, 1), rx: o.stacked ? 0 : 6,
+                                      height: y(from) - y(from + value), fill: s.color}, svg),
+                        label + ' ' + s.label + ': ' + format(value));
+                }
+                base += value;
+            });
+            if (i % labelEvery === 0) {
+                node('text', {x: center, y: HEIGHT - 8, 'text-anchor': 'middle', fill: TEXT, 'font-size': 11}, svg)
+                    .textContent = label;
+            }
+        });
+        if (o.line) {
+            const points = o.line.data.map(function(value, i) { return (left + band * (i + 0.5)) + ',' + y(value || 0); });
+            tip(node('polyline', {points: points.join(' '), fill: 'none', stroke: o.line.color, 'stroke-width': 2}, svg),
+                o.line.label);
+        }
+        const entries = series.concat(o.line ? [o.line] : []);
+        if (entries.length > 1) { legend(el, entries); }
+    }
+
+    function drawPie(el, o) {
+        const svg = canvas(el);
+        const total = o.data.reduce(function(a, b) { return a + (b > 0 ? b : 0); }, 0);
+        const cx = WIDTH / 2, cy = HEIGHT / 2, r = HEIGHT / 2 - 8;
+        const color = function(i) { return o.colors[i % o.colors.length]; };
+        if (!total) {
+            node('circle', {cx: cx, cy: cy, r: r, fill: 'none', stroke: GRID}, svg);
+        }
+        let angle = -Math.PI / 2;
+        o.data.forEach(function(value, i) {
+            if (!(value > 0)) { return; }
+            const label = o.labels[i] + ': ' + format(value);
+            if (value === total) {
+                tip(node('circle', {cx: cx, cy: cy, r: r, fill: color(i)}, svg), label);
+                return;
+            }
+            const end = angle + value / total * 2 * Math.PI;
+            const d = ['M', cx, cy, 'L', cx + r * Math.cos(angle), cy + r * Math.sin(angle),
+                       'A', r, r, 0, end - angle > Math.PI ? 1 : 0, 1, cx + r * Math.cos(end), cy + r * Math.sin(end), 'Z'];
+            tip(node('path', {d: d.join(' '), fill: color(i), stroke: '#232529'}, svg), label);
+            angle = end;
+        });
+        legend(el, o.labels.map(function(label, i) { return {label: label, color: color(i)}; }));
+    }
+
+    function chart(draw) {
+        return function(el, options) {
+            draw(el, options);
+            return {update: function(next) { options = next || options; draw(el, options); }};
+        };
+    }
+    return {bar: chart(drawBar), pie: chart(drawPie)};
+})();
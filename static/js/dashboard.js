@@ -0,0 +1,88 @@
+let sidebarOpen = false;
+function toggleSidebar() {
+    sidebarOpen = !sidebarOpen;
+    document.getElementById('sidebar').classList.toggle('open', sidebarOpen);
+}
+// Hide navbar when scrolling down, show when up/top
+let lastScroll = 0;
+window.addEventListener('scroll', function() {
+    let navbar = document.getElementById('navbar');
+    let currScroll = window.scrollY;
+    if (currScroll > lastScroll && currScroll > 60) { navbar.style.top = "-80px"; }
+    else { navbar.style.top = "0"; }
+    lastScroll = currScroll;
+});
+// Charts (static/js/charts.js)
+const chartColors = ['#444ce7','#fb6868','#44d964','#ffd95a','#565af7','#ffe37a'];
+const chartSource = JSON.parse(document.getElementById('chartData').textContent);
+Charts.bar(document.getElementById('barChart'), {
+    labels: chartSource.labels,
+    series: [{label: "Total", data: chartSource.data, color: "#444ce7"}]
+});
+Charts.pie(document.getElementById('pieChart'), {labels: chartSource.labels, data: chartSource.data, colors: chartColors});
+// Spending trend: stacked per-category buckets plus the rolling average, refreshed every minute
+// (the endpoint answers 304 until something changes)
+let trendChart = null;
+function loadTrend() {
+    const box = document.getElementById('trendChart');
+    const url = new URL(box.dataset.url, window.location.href);
+    url.searchParams.set("bucket", document.getElementById('trendBucket').value);
+    fetch(url).then(function(r) { return r.json(); }).then(function(trend) {
+        const options = {
+            labels: trend.labels,
+            stacked: true,
+            series: Object.keys(trend.series).map(function(name, i) {
+                return {label: name, data: trend.series[name], color: chartColors[i % chartColors.length]};
+            }),
+            line: {label: trend.window + "-" + trend.bucket + " average", data: trend.rolling_average, color: '#e2e4ea'}
+        };
+        if (trendChart) { trendChart.update(options); } else { trendChart = Charts.bar(box, options); }
+    });
+}
+if (document.getElementById('trendChart')) {
+    loadTrend();
+    setInterval(loadTrend, 60000);
+}
+// Remove up/down on number inputs (income/expense)
+document.querySelectorAll('input[type=number]').forEach(input => {
+    input.addEventListener('wheel', function(e){ e.preventDefault(); });
+    input.style.appearance = 'textfield';
+});
+// Reset income confirmation
+function confirmResetIncome() {
+    if (confirm("Reset income to $0 and delete all income history?")) {
+        window.location.href = "/reset_income";
+    }
+}
+// Pagination: append the next page of rows, hide the button after the last page. The cursor goes in
+// ?before= (keyset pages) unless the button names another parameter, e.g. search's ?page=
+function loadMore(btn) {
+    const url = new URL(btn.dataset.url, window.location.href);
+    url.searchParams.set(btn.dataset.param || "before", btn.dataset.cursor);
+    fetch(url).then(function(r) {
+        const next = r.headers.get("X-Next-Cursor");
+        return r.text().then(function(rows) {
+            document.getElementById(btn.dataset.table).tBodies[0].insertAdjacentHTML("beforeend", rows);
+            if (next) { btn.dataset.cursor = next; } else { btn.hidden = true; }
+        });
+    });
+}
+// Search: replace the result rows with the first page, keep the header row
+function searchExpenses(form) {
+    const url = new URL(form.action, window.location.href);
+    url.searchParams.set("q", form.elements.q.value);
+    fetch(url).then(function(r) {
+        const next = r.headers.get("X-Next-Cursor");
+        return r.text().then(function(rows) {
+            const table = document.getElementById('searchTable');
+            while (table.rows.length > 1) { table.deleteRow(1); }
+            table.tBodies[0].insertAdjacentHTML("beforeend", rows);
+            table.hidden = false;
+            const more = document.getElementById('searchMore');
+            more.dataset.url = url;
+            more.dataset.cursor = next;
+            more.hidden = !next;
+        });
+    });
+    return false;
+}
@@ -0,0 +1,51 @@
+"""Fixtures for both apps.
+
+Each app reads DATABASE_URL and the other settings at import time and migrates
+its database then, so each is imported once per session against its own
+scratch SQLite file (as benchmarks/_common.py does). Tests push the app context
+they need themselves, since both apps can be loaded in one session.
+"""
+import importlib
+import itertools
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+TEST_ENV = {
+    # Cheap hashes, in the request thread, and no login limits: tests sign in a lot.
+    "PASSWORD_HASH_METHOD": "pbkdf2:sha256:1000",
+    "PASSWORD_HASH_WORKERS": "0",
+    "LOGIN_ATTEMPTS_PER_MINUTE_IP": "0",
+    "LOGIN_ATTEMPTS_PER_MINUTE_USER": "0",
+}
+usernames = (f"user{n}" for n in itertools.count())
+
+
+def load_app(module, db_path):
+    os.environ["DATABASE_URL"] = "sqlite:///" + str(db_path)
+    os.environ.update(TEST_ENV)
+    return importlib.import_module(module)
+
+
+@pytest.fixture(scope="session")
+def web(tmp_path_factory):
+    return load_app("budget_web", tmp_path_factory.mktemp("web") / "budget.db")
+
+
+@pytest.fixture(scope="session")
+def tracker(tmp_path_factory):
+    return load_app("budget_tracker.app", tmp_path_factory.mktemp("tracker") / "budget.db")
+
+
+@pytest.fixture
+def client(web):
+    """A test client signed in as a fresh budget_web user; its id is ``client.user_id``."""
+    client = web.app.test_client()
+    username = next(usernames)
+    client.post("/register", data={"username": username, "password": "secret"})
+    with web.app.app_context():
+        client.user_id = web.User.query.filter_by(username=username).one().id
+    return client
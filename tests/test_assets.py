@@ -0,0 +1,60 @@
+"""Static assets: pages load only files from static/, served under content-hashed URLs."""
+import gzip
+import os
+import re
+import shutil
+import time
+
+import pytest
+
+EXTERNAL = re.compile(r"""(?:src|href)=["']?(?:https?:)?//""")
+
+
+@pytest.mark.parametrize("app_fixture", ["web", "tracker"])
+def test_templates_load_nothing_from_outside(request, app_fixture):
+    folder = os.path.join(request.getfixturevalue(app_fixture).app.root_path, "templates")
+    for name in os.listdir(folder):
+        with open(os.path.join(folder, name)) as f:
+            assert not EXTERNAL.search(f.read()), name
+
+
+def test_chart_script_is_served_under_its_hash(web, client):
+    page = client.get("/").get_data(as_text=True)
+    url = re.search(r'<script src="(/static/js/charts\.[0-9a-f]+\.js)"', page).group(1)
+    resp = client.get(url)
+    assert resp.status_code == 200
+    assert resp.cache_control.immutable
+    assert b"Charts" in resp.get_data()
+
+
+def test_precompressed_variants_are_served_and_refreshed(web, tmp_path):
+    from flask import Flask, url_for
+
+    from assets import build_assets, init_assets
+
+    # A copy of static/, so building variants and editing files leaves the real folder alone.
+    folder = tmp_path / "static"
+    shutil.copytree(web.app.static_folder, folder, ignore=shutil.ignore_patterns("*.gz", "*.br"))
+    app = Flask(__name__, static_folder=str(folder))
+    init_assets(app)
+    assert str(folder / "js" / "charts.js.gz") in build_assets(app.static_folder)
+    assert build_assets(app.static_folder) == []
+
+    client = app.test_client()
+    with app.test_request_context():
+        url = url_for("static", filename="js/charts.js")
+    resp = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert resp.cache_control.immutable
+    assert gzip.decompress(resp.get_data()) == (folder / "js" / "charts.js").read_bytes()
+
+    # An edited file gets a new URL, and its outdated variant is not sent until rebuilt.
+    path = folder / "js" / "charts.js"
+    path.write_text("const Charts = {};\n")
+    os.utime(path, (time.time() + 10, time.time() + 10))
+    with app.test_request_context():
+        edited = url_for("static", filename="js/charts.js")
+    assert edited != url
+    resp = client.get(edited, headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in resp.headers
+    assert resp.get_data() == b"const Charts = {};\n"
@@ -0,0 +1,29 @@
+"""Bulk expense edits refuse a request that selects nothing rather than touching every row."""
+import pytest
+
+
+@pytest.mark.parametrize("path, body", [
+    ("/api/expenses/delete", {}),
+    ("/api/expenses/recategorize", {"new_category": "Bills"}),
+])
+def test_empty_selection_is_refused(client, path, body):
+    for amount in ("1", "2", "3"):
+        client.post("/add", data={"category": "Fun", "amount": amount})
+    assert client.post(path, json=body).status_code == 400
+    assert client.get("/api/summary").get_json()["totals_by_category"]["Fun"] == 6
+
+
+def test_recategorize_selection(client):
+    client.post("/add", data={"category": "Fun", "amount": "4"})
+    client.post("/add", data={"category": "Debt", "amount": "5"})
+    resp = client.post("/api/expenses/recategorize", json={"category": "Fun", "new_category": "Bills"})
+    assert resp.get_json() == {"affected": 1}
+    totals = client.get("/api/summary").get_json()["totals_by_category"]
+    assert (totals["Fun"], totals["Bills"], totals["Debt"]) == (0, 4, 5)
+
+
+@pytest.mark.parametrize("body", [{"from": 5}, {"to": ["2026-01-01"]}, {"month": 202601}])
+def test_non_string_dates_are_refused(client, body):
+    client.post("/add", data={"category": "Fun", "amount": "1"})
+    assert client.post("/api/expenses/delete", json=body).status_code == 400
+    assert client.post("/api/expenses/recategorize", json={**body, "new_category": "Bills"}).status_code == 400
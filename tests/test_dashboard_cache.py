@@ -0,0 +1,84 @@
+"""The cached dashboard follows writes made by other processes (other workers, CLI, cron)."""
+import gzip
+import sqlite3
+from datetime import date
+
+
+def test_write_outside_this_process_refreshes_cached_page(web, client):
+    client.post("/add", data={"category": "Fun", "amount": "5", "description": "first"})
+    assert b"first" in client.get("/").data
+    assert b"first" in client.get("/").data  # now served from the cache
+
+    # What another worker or `flask import-expenses` does: commit through the database
+    # without touching this process's cache.
+    with web.app.app_context(), web.db.engine.begin() as conn:
+        fun = web.category_id_for(client.user_id, "Fun")
+        conn.execute(web.insert(web.Expense).values(category_id=fun, amount_cents=700, description="second",
+                                                    date=date.today(), user_id=client.user_id))
+    page = client.get("/").data
+    assert b"second" in page
+    assert b"$12.00" in page
+
+
+def test_source_fingerprint_changes_with_any_file(tmp_path):
+    from cache import source_fingerprint
+
+    (tmp_path / "templates").mkdir()
+    page = tmp_path / "templates" / "dashboard.html"
+    page.write_text("<p>{{ total }}</p>")
+    (tmp_path / "templates" / "dashboard.html.gz").write_bytes(b"ignored")
+    before = source_fingerprint([str(tmp_path / "templates")])
+    assert source_fingerprint([str(tmp_path / "templates")]) == before
+    (tmp_path / "templates" / "dashboard.html.gz").write_bytes(b"still ignored")
+    assert source_fingerprint([str(tmp_path / "templates")]) == before
+    page.write_text("<p>{{ total }} spent</p>")
+    assert source_fingerprint([str(tmp_path / "templates")]) != before
+
+
+def test_new_deploy_does_not_serve_old_pages(web, client, monkeypatch):
+    from cache import MemoryPageCache
+
+    monkeypatch.setattr(web, "dashboard_cache", MemoryPageCache())
+    client.get("/")
+    client.get("/")
+    assert web.dashboard_cache.stats()["hits"] == 1
+    monkeypatch.setattr(web, "PAGE_FINGERPRINT", "nextdeploy")
+    client.get("/")
+    assert web.dashboard_cache.stats()["misses"] == 2
+
+
+def test_cached_page_is_sent_as_stored_gzip(web, client, monkeypatch):
+    from cache import MemoryPageCache
+
+    monkeypatch.setattr(web, "dashboard_cache", MemoryPageCache())
+    rendered = client.get("/")
+    cached = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert web.dashboard_cache.stats()["hits"] == 1
+    assert cached.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in cached.vary and "Accept-Encoding" in rendered.vary
+    assert gzip.decompress(cached.get_data()) == rendered.get_data()
+    assert client.get("/").get_data() == rendered.get_data()
+
+
+def test_sqlite_page_cache_keeps_its_size_without_rescanning(tmp_path):
+    from cache import SQLitePageCache
+
+    path = tmp_path / "pages.db"
+    cache = SQLitePageCache(str(path), max_bytes=1000)
+    cache.set(1, "a", b"x" * 300)
+    cache.set(1, "a", b"x" * 200)
+    cache.set(2, "b", b"y" * 100)
+    assert cache.stats() == {"entries": 2, "bytes": 300, "max_bytes": 1000}
+    cache.invalidate(1)
+    assert cache.stats()["bytes"] == 100
+
+    for n in range(20):
+        cache.set(3, str(n), b"z" * 100)
+    assert cache.stats()["bytes"] <= 1000
+    assert cache.get(3, "19") == b"z" * 100
+    assert cache.get(2, "b") is None
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT SUM(length(value)), COUNT(*) FROM page").fetchone() == tuple(
+            cache.stats()[name] for name in ("bytes", "entries"))
+    # A second process opening the file picks up the stored totals.
+    assert SQLitePageCache(str(path), max_bytes=1000).stats() == cache.stats()
@@ -0,0 +1,34 @@
+"""Live dashboard streams hand their server thread back and resume where they stopped."""
+from werkzeug.security import generate_password_hash
+
+
+def tracker_client(tracker, username):
+    with tracker.app.app_context():
+        tracker.db.session.add(tracker.User(username=username, password=generate_password_hash("secret",
+                                                                                              "pbkdf2:sha256:1000")))
+        tracker.db.session.commit()
+        user_id = tracker.User.query.filter_by(username=username).one().id
+    client = tracker.app.test_client()
+    client.user_id = user_id
+    client.post("/login", data={"username": username, "password": "secret"})
+    return client
+
+
+def test_stream_ends_with_the_id_to_resume_from(tracker, monkeypatch):
+    monkeypatch.setattr(tracker, "SSE_STREAM_SECONDS", 0.2)
+    client = tracker_client(tracker, "streamer")
+    page = client.get("/").get_data(as_text=True)
+    assert "/shared/js/charts.js" in page
+    assert client.get("/shared/js/charts.js").status_code == 200
+
+    body = client.get("/events").get_data(as_text=True)
+    assert body.startswith("retry: 3000\n\n")
+    position = body.rsplit("id: ", 1)[1].strip()
+    assert position == tracker.broker.last_id()
+    assert tracker.broker.streams(client.user_id) == 0
+
+    # Reconnecting from that id replays nothing and needs no reload.
+    client.post("/add_income", data={"amount": "5"}, headers={"Accept": "application/json"})
+    resumed = client.get("/events", headers={"Last-Event-ID": position}).get_data(as_text=True)
+    assert "event: reload" not in resumed
+    assert resumed.count("event: income") == 1
@@ -0,0 +1,62 @@
+"""The hashing pool runs in separately started processes, never forked from the threaded server."""
+import threading
+import time
+
+import pytest
+
+from passwords import HasherBusy, PasswordHasher
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher("pbkdf2:sha256:1000", workers=1, max_pending=1)
+    yield hasher
+    hasher.close()
+
+
+def test_pool_hashes_and_verifies(hasher):
+    stored = hasher.hash("secret")
+    assert hasher.verify(stored, "secret") == (True, False)
+    assert hasher.verify(stored, "wrong") == (False, False)
+
+
+def test_pool_processes_are_not_forked(hasher):
+    assert hasher.start_method in ("forkserver", "spawn")
+
+
+def test_slow_hash_does_not_hold_up_other_requests():
+    hasher = PasswordHasher("pbkdf2:sha256:500000", workers=1, max_pending=1)
+    try:
+        hasher.hash("warm up the pool")
+        stored = []
+        slow = threading.Thread(target=lambda: stored.append(hasher.hash("secret")))
+        slow.start()
+        while hasher.stats()["hashed"] < 2:
+            time.sleep(0.001)
+        time.sleep(0.05)
+        # Past max_pending a request is refused at once instead of queueing behind the KDF,
+        # and the waiting thread leaves this one free to run.
+        started = time.perf_counter()
+        with pytest.raises(HasherBusy):
+            hasher.hash("other")
+        assert time.perf_counter() - started < 0.1
+        assert slow.is_alive()
+        slow.join()
+        assert hasher.verify(stored[0], "secret")[0]
+        assert hasher.stats()["busy"] == 1
+    finally:
+        hasher.close()
+
+
+def test_unknown_account_is_checked_against_a_dummy_hash(hasher):
+    assert hasher.verify(None, "secret") == (False, False)
+    assert hasher.verify(None, "secret") == (False, False)
+    # The dummy is hashed once, then every unknown account costs one verify like a real one.
+    assert hasher.stats() == {"hashed": 1, "verified": 2, "busy": 0}
+
+
+def test_login_with_unknown_username_still_verifies(web):
+    before = web.password_hasher.stats()["verified"]
+    resp = web.app.test_client().post("/login", data={"username": "nobody-here", "password": "secret"})
+    assert "Incorrect username or password." in resp.get_data(as_text=True)
+    assert web.password_hasher.stats()["verified"] == before + 1
@@ -0,0 +1,21 @@
+"""Every dashboard query must be answered from an index, never a table scan."""
+import pytest
+
+from queryplans import plan_scans
+
+
+@pytest.mark.parametrize("app_fixture", ["web", "tracker"])
+def test_dashboard_queries_use_indexes(request, app_fixture):
+    mod = request.getfixturevalue(app_fixture)
+    with mod.app.app_context():
+        mod.migrate_db()
+        plans = mod.query_plans()
+    assert plans
+    for name, plan in plans.items():
+        assert plan_scans(plan) == [], f"{name}: {plan}"
+
+
+def test_plan_scans_allows_only_materialized_subqueries():
+    plan = ["MATERIALIZE anon_1", "SEARCH budget USING INDEX sqlite_autoindex_budget_1 (category_id=?)",
+            "SCAN anon_1", "SCAN expense", "SCAN anon_2 USING COVERING INDEX ix_expense_user_id"]
+    assert plan_scans(plan) == ["SCAN expense", "SCAN anon_2 USING COVERING INDEX ix_expense_user_id"]
@@ -0,0 +1,61 @@
+"""Recurring rules: editing a materialized occurrence must not clash with the rule's own rows."""
+from datetime import date, timedelta
+
+
+def rule_rows(web, rule_id):
+    with web.app.app_context():
+        return web.Expense.query.filter_by(recurring_rule_id=rule_id).order_by(web.Expense.date).all()
+
+
+def test_edit_materialized_occurrence(web, client):
+    start = date.today() - timedelta(days=2)
+    rule = client.post("/api/recurring", json={"kind": "expense", "category": "Bills", "amount": "10",
+                                               "description": "daily", "every": 1, "unit": "day",
+                                               "start": start.isoformat()}).get_json()
+    rows = rule_rows(web, rule["id"])
+    assert [row.date for row in rows] == [start + timedelta(days=n) for n in range(3)]
+
+    # The edit moves the oldest occurrence to today, where the rule already has a row.
+    resp = client.post(f"/edit/{rows[0].id}", data={"category": "Fun", "amount": "12", "description": "edited"})
+    assert resp.status_code == 302
+    assert [row.date for row in rule_rows(web, rule["id"])] == [start + timedelta(days=n) for n in (1, 2)]
+
+    with web.app.app_context():
+        web.materialize_recurring(today=date.today() + timedelta(days=1))
+    assert [row.date for row in rule_rows(web, rule["id"])] == [start + timedelta(days=n) for n in (1, 2, 3)]
+    totals = client.get("/api/summary").get_json()["totals_by_category"]
+    assert (totals["Bills"], totals["Fun"]) == (30, 12)
+
+
+def test_edited_row_does_not_take_an_unmaterialized_slot(web, client):
+    yesterday = date.today() - timedelta(days=1)
+    with web.app.app_context():
+        rule = web.RecurringRule(user_id=client.user_id, kind="expense", amount_cents=1000, every=1, unit="day",
+                                 category_id=web.category_id_for(client.user_id, "Bills"),
+                                 start_date=yesterday, occurrences=0, next_date=yesterday)
+        web.db.session.add(rule)
+        web.db.session.commit()
+        rule_id = rule.id
+        web.materialize_recurring(today=yesterday)
+    (row,) = rule_rows(web, rule_id)
+
+    # Moved to today, before the rule's occurrence for today has been inserted.
+    assert client.post(f"/edit/{row.id}", data={"category": "Bills", "amount": "10"}).status_code == 302
+    with web.app.app_context():
+        assert web.materialize_recurring(user_id=client.user_id)["expenses"] == 1
+    assert [row.date for row in rule_rows(web, rule_id)] == [date.today()]
+    assert client.get("/api/summary").get_json()["totals_by_category"]["Bills"] == 20
+
+
+def test_start_far_in_the_past_is_rejected(web, client):
+    rule = {"kind": "expense", "category": "Bills", "amount": "10", "every": 1, "unit": "day"}
+    too_old = date.today() - timedelta(days=web.RECURRING_MAX_BACKFILL_DAYS + 1)
+    assert client.post("/api/recurring", json={**rule, "start": "1900-01-01"}).status_code == 400
+    assert client.post("/api/recurring", json={**rule, "start": too_old.isoformat()}).status_code == 400
+    with web.app.app_context():
+        assert web.RecurringRule.query.filter_by(user_id=client.user_id).count() == 0
+
+    oldest = date.today() - timedelta(days=web.RECURRING_MAX_BACKFILL_DAYS)
+    created = client.post("/api/recurring", json={**rule, "start": oldest.isoformat()})
+    assert created.status_code == 201
+    assert len(rule_rows(web, created.get_json()["id"])) == web.RECURRING_MAX_BACKFILL_DAYS + 1
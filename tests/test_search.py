@@ -0,0 +1,31 @@
+"""Search ranks description and category-name matches from the one full-text index."""
+
+
+def search(client, text):
+    return [row["description"] for row in client.get("/search", query_string={"q": text, "format": "json"})
+            .get_json()["items"]]
+
+
+def test_description_matches_rank_above_category_matches(web, client):
+    for category, description in (("Groceries", "corner shop"), ("Fun", "groceries for the party"),
+                                  ("Bills", "power"), ("Groceries", "market groceries")):
+        client.post("/add", data={"category": category, "amount": "5", "description": description})
+
+    assert search(client, "groceries") == ["market groceries", "groceries for the party", "corner shop"]
+    assert search(client, "grocery market") == ["market groceries"]
+    assert search(client, "corner groceries") == ["corner shop"]
+    assert search(client, "nothing") == []
+
+
+def test_renamed_category_is_searchable_under_its_new_name(web, client):
+    client.post("/add", data={"category": "Fun", "amount": "5", "description": "tickets"})
+    with web.app.app_context():
+        category = web.db.session.get(web.Category, web.category_id_for(client.user_id, "Fun"))
+        category.name = "Concerts"
+        web.db.session.commit()
+
+    assert search(client, "concerts") == ["tickets"]
+    assert search(client, "fun") == []
+    runner = web.app.test_cli_runner()
+    assert "expense_fts: indexed" in runner.invoke(args=["rebuild-search-index"]).output
+    assert search(client, "concerts") == ["tickets"]
@@ -0,0 +1,52 @@
+"""Summary tables: check-totals finds and rebuilds drift, and whole months are read from them."""
+from datetime import date
+
+
+def test_check_totals_reports_and_rebuilds_drift(web, client):
+    client.post("/add", data={"category": "Fun", "amount": "12.50", "description": "cinema"})
+    client.post("/add_income", data={"amount": "100"})
+    runner = web.app.test_cli_runner()
+    assert runner.invoke(args=["check-totals"]).exit_code == 0
+
+    with web.app.app_context():
+        fun = web.category_id_for(client.user_id, "Fun")
+        web.db.session.execute(web.db.text("UPDATE category_total SET total_cents = total_cents + 300"
+                                           " WHERE category_id = :id"), {"id": fun})
+        web.db.session.execute(web.db.text("UPDATE user_totals SET income_cents = 0 WHERE user_id = :id"),
+                               {"id": client.user_id})
+        web.db.session.execute(web.db.text("DELETE FROM daily_category_total WHERE category_id = :id"), {"id": fun})
+        web.db.session.commit()
+
+    result = runner.invoke(args=["check-totals"])
+    assert result.exit_code != 0
+    assert f"category_total category_id={fun}: stored 15.50, expected 12.50 (off by 3.00)" in result.output
+    assert f"user_totals user_id={client.user_id}: stored 0.00, expected 100.00" in result.output
+    assert f"daily_category_total category_id={fun}, day=" in result.output
+    assert "3 summary row(s) drifted" in result.output
+
+    result = runner.invoke(args=["check-totals", "--rebuild"])
+    assert result.exit_code != 0
+    assert "rebuilt" in result.output
+    assert runner.invoke(args=["check-totals"]).exit_code == 0
+    assert client.get("/api/summary").get_json()["totals_by_category"]["Fun"] == 12.5
+
+
+def test_whole_month_periods_read_the_monthly_summaries(web, client):
+    with web.app.app_context(), web.db.engine.begin() as conn:
+        fun = web.category_id_for(client.user_id, "Fun")
+        for day, cents in (("2025-12-31", 100), ("2026-01-01", 200), ("2026-01-31", 300), ("2026-02-01", 400)):
+            conn.execute(web.insert(web.Expense).values(category_id=fun, amount_cents=cents, user_id=client.user_id,
+                                                        date=date.fromisoformat(day)))
+            conn.execute(web.insert(web.Income).values(amount_cents=cents * 10, user_id=client.user_id,
+                                                       date=date.fromisoformat(day)))
+    with web.app.app_context():
+        assert not web.whole_months(date(2026, 1, 2), date(2026, 1, 31))
+        for start, end, income, spent in ((date(2026, 1, 1), date(2026, 1, 31), 5000, 500),
+                                          (date(2025, 12, 1), date(2026, 2, 28), 10000, 1000)):
+            assert web.whole_months(start, end)
+            raw = sorted(web.db.session.execute(web.dashboard_totals_query(client.user_id, start, end)), key=str)
+            summary = sorted(web.db.session.execute(
+                web.monthly_totals_query(client.user_id, start.strftime("%Y-%m"), end.strftime("%Y-%m"))), key=str)
+            assert summary == raw
+            assert web.dashboard_totals(client.user_id, start, end)[:2] == (income, spent)
+    assert client.get("/api/summary?month=2026-01").get_json()["total_spent"] == 5
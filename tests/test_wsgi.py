@@ -0,0 +1,10 @@
+"""The production entry point trusts X-Forwarded-For/-Proto from one proxy, but not X-Forwarded-Host."""
+
+
+def test_forwarded_headers(web):
+    import wsgi
+
+    client = wsgi.app.test_client()
+    resp = client.get("/", headers={"X-Forwarded-Proto": "https", "X-Forwarded-Host": "evil.example"})
+    assert resp.status_code == 302
+    assert "evil.example" not in resp.location
@@ -0,0 +1,100 @@
+"""Group commit: funnel small writes from many request threads into shared transactions.
+
+SQLite has one write lock, so concurrent requests that each commit their own
+INSERT queue up behind one another, and under a burst some wait past
+``busy_timeout`` and fail with "database is locked". ``GroupCommitQueue``
+hands every statement to a single writer thread instead. That thread takes
+the write lock once per batch of up to ``max_batch`` statements (or whatever
+arrived within ``max_wait`` seconds of the first) and commits them together.
+``execute`` returns only after that commit, so a request is acknowledged only
+once its write is as durable as a direct commit would make it.
+
+Each statement runs under its own SAVEPOINT, so one failing statement
+(e.g. a constraint violation) only fails its own caller and the rest of the
+batch still commits.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class GroupCommitQueue:
+    def __init__(self, engine, max_batch=64, max_wait=0.002):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.writes = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self._thread.start()
+
+    def submit(self, statement):
+        """Queue a Core statement; the Future resolves to its rowcount once committed."""
+        future = Future()
+        self._queue.put((statement, future))
+        return future
+
+    def execute(self, statement, timeout=None):
+        return self.submit(statement).result(timeout)
+
+    def close(self):
+        """Commit everything already queued, then stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def stats(self):
+        return {"batches": self.batches, "writes": self.writes, "queued": self._queue.qsize()}
+
+    def _run(self):
+        # The writer keeps one connection for its lifetime: requests waiting on it still hold
+        # their own pooled connections, so checking one out per batch could starve the writer.
+        with self.engine.connect() as conn:
+            self._loop(conn)
+
+    def _loop(self, conn):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stopping = False
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit(conn, batch)
+            if stopping:
+                return
+
+    def _commit(self, conn, batch):
+        outcomes = []
+        try:
+            with conn.begin():
+                conn.exec_driver_sql("BEGIN IMMEDIATE")
+                for statement, _ in batch:
+                    savepoint = conn.begin_nested()
+                    try:
+                        outcomes.append((conn.execute(statement).rowcount, None))
+                        savepoint.commit()
+                    except Exception as exc:
+                        savepoint.rollback()
+                        outcomes.append((None, exc))
+        except Exception as exc:
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        self.batches += 1
+        self.writes += len(batch)
+        for (_, future), (rowcount, exc) in zip(batch, outcomes):
+            if exc is None:
+                future.set_result(rowcount)
+            else:
+                future.set_exception(exc)
@@ -0,0 +1,26 @@
+"""Production WSGI entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+``python budget_web.py`` still starts the Werkzeug development server for
+local work.
+
+The app is the module-level one in budget_web.py, wrapped once here. The
+platform router terminates TLS and forwards requests, so ProxyFix trusts the
+X-Forwarded-* headers of that many proxies in front of the app. Each count is
+configurable and should match the proxies that actually set the header.
+X-Forwarded-Host is not trusted by default (PROXY_X_HOST=0): a proxy that
+passes the client's value through would let any request pick the host used
+in url_for() and redirects.
+"""
+import os
+
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from budget_web import app
+
+PROXY_X_FOR = int(os.environ.get("PROXY_X_FOR", 1))
+PROXY_X_PROTO = int(os.environ.get("PROXY_X_PROTO", 1))
+PROXY_X_HOST = int(os.environ.get("PROXY_X_HOST", 0))
+
+app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_X_FOR, x_proto=PROXY_X_PROTO, x_host=PROXY_X_HOST)